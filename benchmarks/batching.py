@@ -0,0 +1,173 @@
+"""
+Frames and socket writes of the room messages, sent one by one and coalesced into tick-based frames.
+
+Runs the player WebSocket endpoint (without the database and the event handlers) in this process,
+connects the players to it, publishes room messages at the given rate and counts the frames the players
+receive and the socket writes of the server (each is a <send> syscall, unless the socket buffer is full):
+
+    python -m benchmarks.batching --rooms 10 --players 10 --rate 60 --tick 0.033
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from typing import Tuple
+
+import aiohttp
+
+from aiohttp import web
+from aiohttp.http_websocket import WebSocketWriter
+
+from fiasco_backend.server.bus import MemoryBus, MemoryHub
+from fiasco_backend.server.websocket import Message, WebSocketHandler
+from fiasco_backend.server.websocket.authorizers import PlayerAuthorizer
+from fiasco_backend.server.websocket.connection_storages import PlayerStorage
+from fiasco_backend.server.websocket.connections import PlayerConnection
+from fiasco_backend.server.websocket.message_senders import PlayerMessageSender
+
+from .timing import print_table
+
+
+class StoringEventListener:
+    """Only keeps the connections and their rooms, as the player event listener does before any message."""
+
+    def __init__(self, storage: PlayerStorage, sender: PlayerMessageSender):
+        self._storage = storage
+        self._sender = sender
+
+    async def __call__(self, message: Message, connection: PlayerConnection):
+        if message.event == WebSocketHandler.EVENT_USER_CONNECTED:
+            self._storage.add_connection(connection)
+            self._sender.acquire_room(connection.room)
+        elif message.event == WebSocketHandler.EVENT_USER_DISCONNECTED:
+            self._storage.remove_connection(connection)
+            self._sender.release_room(connection.room)
+
+
+class WriteCounter:
+    """Counts the socket writes of the WebSocket frames (of the whole process, while counting)."""
+
+    def __init__(self):
+        self.count = 0
+        self._write = None
+
+    def __enter__(self):
+        self._write = WebSocketWriter._write
+
+        def write(writer, data):
+            self.count += 1
+            return self._write(writer, data)
+
+        WebSocketWriter._write = write
+
+        return self
+
+    def __exit__(self, *args):
+        WebSocketWriter._write = self._write
+
+
+async def receive(ws: aiohttp.ClientWebSocketResponse, counts: list, i: int):
+    async for msg in ws:
+        if msg.type == aiohttp.WSMsgType.TEXT:
+            counts[i] += 1
+
+
+async def run(rooms: int, players: int, rate: int, duration: float, tick: float, port: int) -> Tuple[int, int, float]:
+    """Get the frames received by the players, the socket writes and the CPU time."""
+
+    storage = PlayerStorage()
+    bus = MemoryBus(hub=MemoryHub())
+    await bus.start()
+    sender = PlayerMessageSender(storage, batch_tick=tick, bus=bus)
+
+    handler = WebSocketHandler(authorizer=PlayerAuthorizer(), event_listeners=(StoringEventListener(storage, sender), ))
+    app = web.Application()
+    app.add_routes([web.get("/", handler)])
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host="127.0.0.1", port=port).start()
+
+    batch = 1 if tick else 0
+    counts = [0] * (rooms * players)
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        sockets = await asyncio.gather(*(
+            session.ws_connect(f"http://127.0.0.1:{port}/?room=room-{i % rooms}&player=player-{i}&batch={batch}")
+            for i in range(rooms * players)
+        ))
+        while storage.connections_count < rooms * players:
+            await asyncio.sleep(0.01)
+
+        receivers = [asyncio.ensure_future(receive(ws, counts, i)) for i, ws in enumerate(sockets)]
+
+        with WriteCounter() as writes:
+            started_at = time.process_time()
+
+            for i in range(int(rate * duration)):
+                for room in range(rooms):
+                    await sender.send_message(
+                        message=Message(event="move-element", data={"element_id": "a", "coordinates": [i, i]}),
+                        sender=f"player-{room}",
+                        room=f"room-{room}",
+                        volatile=True
+                    )
+                await asyncio.sleep(1 / rate)
+
+            await asyncio.sleep(tick + 0.2)  # The last batches are sent and received
+
+            cpu_time = time.process_time() - started_at
+
+        for ws in sockets:
+            await ws.close()
+        await asyncio.gather(*receivers)
+
+    await runner.cleanup()
+    await bus.stop()
+
+    return sum(counts), writes.count, cpu_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the frames and writes of the single and batched messages")
+    parser.add_argument("--rooms", dest="rooms", type=int, default=10, help="rooms")
+    parser.add_argument("--players", dest="players", type=int, default=10, help="players per room")
+    parser.add_argument("--rate", dest="rate", type=int, default=60, help="messages per second per room")
+    parser.add_argument("--duration", dest="duration", type=float, default=3, help="seconds to publish the messages")
+    parser.add_argument("--tick", dest="tick", type=float, default=0.033, help="batch tick (in seconds)")
+    parser.add_argument("--port", dest="port", type=int, default=3998, help="port of the benchmarked server")
+    args = parser.parse_args()
+
+    messages = int(args.rate * args.duration) * args.rooms * args.players  # Received by all the players
+
+    rows = []
+    for name, tick in (("single messages", 0), (f"batched ({args.tick} s tick)", args.tick)):
+        frames, writes, cpu_time = asyncio.run(run(
+            rooms=args.rooms,
+            players=args.players,
+            rate=args.rate,
+            duration=args.duration,
+            tick=tick,
+            port=args.port
+        ))
+        rows.append((
+            name,
+            frames,
+            f"{frames / args.duration:,.0f}",
+            f"{writes / args.duration:,.0f}",
+            f"{messages / frames:.1f}",
+            f"{cpu_time:.2f} s",
+        ))
+
+    print(
+        f"{args.rooms} rooms x {args.players} players, {args.rate} messages/s per room for {args.duration} s "
+        f"({messages} messages received)"
+    )
+    print_table(("", "frames", "frames/s", "writes/s", "messages per frame", "CPU (server and clients)"), rows)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
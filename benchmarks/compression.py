@@ -0,0 +1,210 @@
+"""
+Bytes on the wire and CPU time of the outgoing messages with and without permessage-deflate.
+
+Sends the messages through <WebSocketResponse.send_payload> (aiohttp frame writers on a transport counting
+the bytes) of a connection per stream, so the deflate context is kept between the messages, as it is on a
+connection. First each message kind is sent by the compression level, then the stream of a room
+(its <$initial> message and the moves of its players, a batch per tick) by the <ws_compress_threshold>:
+
+    python -m benchmarks.compression --levels 1 6 9 --thresholds 0 256 1024 4096
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+import zlib
+
+from typing import Any, Dict, List, Sequence, Tuple
+
+from aiohttp.http_websocket import WebSocketWriter
+
+from fiasco_backend import config
+from fiasco_backend.server.websocket.base.codecs import JsonCodec
+from fiasco_backend.server.websocket.base.response import WebSocketResponse
+
+from .timing import format_time, print_table
+from .wire_formats import make_initial
+
+ROOM_SIZES = (  # Elements, players
+    (10, 2),
+    (100, 6),
+    (1000, 20),
+)
+STREAM_MESSAGES = 200
+
+
+class CountingTransport:
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data: bytes):
+        self.size += len(data)
+
+    def is_closing(self) -> bool:
+        return False
+
+
+class NoopProtocol:
+
+    async def _drain_helper(self):
+        pass
+
+
+def make_response(level: int) -> Tuple[WebSocketResponse, CountingTransport]:
+    """Response writing to a counting transport, set up as <WebSocketResponse.prepare> does (<level> 0 for none)."""
+
+    transport = CountingTransport()
+    response = WebSocketResponse()
+    response._writer = WebSocketWriter(
+        NoopProtocol(),
+        transport,
+        compress=config.ws_compress_window_bits if level else 0
+    )
+    if level:
+        response._writer._compressobj = zlib.compressobj(level=level, wbits=-config.ws_compress_window_bits)
+        response._plain_writer = WebSocketWriter(NoopProtocol(), transport)
+
+    return response, transport
+
+
+def make_move(rng: random.Random, elements: int, players: int, seq: int) -> Dict[str, Any]:
+    """<upsert-element> message of a dragged element, as broadcast to the room."""
+
+    x, y = rng.randrange(4000), rng.randrange(4000)
+
+    return {
+        "event": "upsert-element",
+        "data": {
+            "element_id": f"2a5f3c1e-6b7d-4e8f-9a0b-{rng.randrange(elements):012d}",
+            "room": "room-1",
+            "coordinates": [x, y, x + 60, y + 80],
+        },
+        "sender": f"player-{rng.randrange(players)}",
+        "target": "room",
+        "seq": seq,
+    }
+
+
+def make_stream(elements: int, players: int, batch: int, count: int = STREAM_MESSAGES) -> List[Any]:
+    """Payloads of <count> frames, each of <batch> moves (a single message if 1)."""
+
+    rng = random.Random(elements)
+    codec = JsonCodec()
+
+    payloads = []
+    for i in range(count):
+        moves = [make_move(rng, elements, players, seq=i * batch + j) for j in range(batch)]
+        payloads.append(codec.encode(moves[0] if batch == 1 else moves))
+
+    return payloads
+
+
+def send(payloads: Sequence[Any], level: int, repeat: int = 5) -> Tuple[int, float]:
+    """Bytes written and the best CPU time (in seconds) of sending the payloads on a new connection."""
+
+    async def run() -> Tuple[int, float]:
+        response, transport = make_response(level)
+
+        started_at = time.process_time()
+        for payload in payloads:
+            await response.send_payload(payload)
+
+        return transport.size, time.process_time() - started_at
+
+    results = [asyncio.run(run()) for _ in range(repeat + 1)][1:]  # The first one warms up
+
+    return results[0][0], min(seconds for _, seconds in results)
+
+
+def measure_levels(levels: Sequence[int]):
+    """Bytes and CPU time per message of each kind, all of them compressed (no threshold) by the level."""
+
+    codec = JsonCodec()
+    kinds = [  # Name, payloads, repeat
+        ("upsert-element", make_stream(elements=100, players=6, batch=1), 5),
+        ("batch of 6 moves", make_stream(elements=100, players=6, batch=6), 5),
+        ("batch of 20 moves", make_stream(elements=1000, players=20, batch=20), 5),
+    ]
+    for elements, _ in ROOM_SIZES:  # The first message of a connection, so sent on a new one each time
+        kinds.append((f"$initial ({elements} elements)", [codec.encode(make_initial(elements))], 20))
+
+    config.ws_compress_threshold = 0
+
+    rows = []
+    for name, payloads, repeat in kinds:
+        count = len(payloads)
+        plain_size, plain_time = send(payloads, level=0, repeat=repeat)
+        rows.append((name, len(payloads[0]), "off", plain_size // count, format_time(plain_time / count), "", ""))
+
+        for level in levels:
+            size, seconds = send(payloads, level=level, repeat=repeat)
+            saved = (plain_size - size) / count
+            extra = (seconds - plain_time) / count
+            rows.append((
+                "",
+                "",
+                level,
+                size // count,
+                format_time(seconds / count),
+                f"{saved * count / plain_size:.0%}",
+                f"{saved / 1024 / (extra * 1000):.0f}",
+            ))
+
+    print("Per message, each compressed (a stream of them on a connection)")
+    print_table(("", "payload B", "level", "wire B", "CPU", "saved", "KB saved/ms CPU"), rows)
+
+
+def measure_thresholds(level: int, thresholds: Sequence[int]):
+    """Bytes and CPU time of the room streams (the $initial message and the moves) by the threshold."""
+
+    codec = JsonCodec()
+
+    rows = []
+    for elements, players in ROOM_SIZES:
+        initial = codec.encode(make_initial(elements))
+        for batch in (1, players):
+            payloads = [initial, *make_stream(elements, players, batch=batch)]
+
+            config.ws_compress_threshold = 0
+            plain_size, plain_time = send(payloads, level=0)
+            row = [f"{elements} elements, {'batches' if batch > 1 else 'messages'}", f"{plain_size / 1024:.1f} KB"]
+            row.append(format_time(plain_time))
+
+            for threshold in thresholds:
+                config.ws_compress_threshold = threshold
+                size, seconds = send(payloads, level=level)
+                row.append(f"{size / 1024:.1f} KB / {format_time(seconds)}")
+
+            rows.append(row)
+
+    print(f"$initial + {STREAM_MESSAGES} frames of moves on a connection, level {level}")
+    print_table(
+        ("room stream", "off", "off CPU", *(f"threshold {threshold}" for threshold in thresholds)),
+        rows
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the wire size and CPU time of the message compression")
+    parser.add_argument("--levels", dest="levels", type=int, nargs="+", default=[1, 6, 9], help="compression levels")
+    parser.add_argument(
+        "--thresholds",
+        dest="thresholds",
+        type=int,
+        nargs="+",
+        default=[0, 256, 1024, 4096],
+        help="compression thresholds (in bytes)"
+    )
+    args = parser.parse_args()
+
+    measure_levels(args.levels)
+    print()
+    measure_thresholds(level=config.ws_compress_level, thresholds=args.thresholds)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
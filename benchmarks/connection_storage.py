@@ -0,0 +1,141 @@
+"""
+Player connection storage operations at scale.
+
+Adds, looks up, iterates by room and removes the connections, with <PlayerStorage> (indexed by room, player
+and connection ID) and the storage it replaced (lists of the connections by room and player):
+
+    python -m benchmarks.connection_storage --connections 100000 --rooms 10000
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List
+
+from fiasco_backend.server.websocket.base.codecs import JsonCodec
+from fiasco_backend.server.websocket.connection_storages import PlayerStorage
+from fiasco_backend.server.websocket.connections import PlayerConnection
+
+from .timing import format_time, print_table
+
+
+class LegacyPlayerStorage:
+    """The storage as it was before the indexes (the connections listed by room and player)."""
+
+    def __init__(self):
+        self._storage: Dict[str, Dict[str, List[PlayerConnection]]] = defaultdict(lambda: defaultdict(list))
+
+    def add_connection(self, connection: PlayerConnection):
+        self._storage[connection.room][connection.player].append(connection)
+
+    def remove_connection(self, connection: PlayerConnection):
+        self._storage[connection.room][connection.player].remove(connection)
+
+        if not self.is_room_online(room=connection.room):
+            del self._storage[connection.room]
+        elif not self.is_player_online(room=connection.room, player=connection.player):
+            del self._storage[connection.room][connection.player]
+
+    def is_room_online(self, room: str) -> bool:
+        return room in self._storage and bool(sum(len(self._storage[room][p]) for p in self._storage[room]))
+
+    def is_player_online(self, room: str, player: str) -> bool:
+        return player in self._storage[room] and bool(len(self._storage[room][player]))
+
+    def get_room_connections(self, room: str) -> Iterable[PlayerConnection]:
+        for player, connections in self._storage[room].items():
+            for connection in connections:
+                yield connection
+
+
+class FakeResponse:
+    closed = False
+    codec = JsonCodec()
+
+
+def make_connections(count: int, rooms: int, players: int) -> List[PlayerConnection]:
+    """Connections spread over the rooms, <players> per room (so a player may have several of them)."""
+
+    return [
+        PlayerConnection(ws=FakeResponse(), room=f"room-{i % rooms}", player=f"player-{i // rooms % players}")
+        for i in range(count)
+    ]
+
+
+def timed(func: Callable[[], None], count: int) -> float:
+    """Time (in seconds) per operation of the <count> operations done by the <func> call."""
+
+    started_at = time.perf_counter()
+    func()
+
+    return (time.perf_counter() - started_at) / count
+
+
+def run(storage_class, connections: List[PlayerConnection], rooms: int) -> dict:
+    storage = storage_class()
+    room_names = [f"room-{i}" for i in range(rooms)]
+
+    def add():
+        for connection in connections:
+            storage.add_connection(connection)
+
+    def check_online():
+        for connection in connections:
+            storage.is_player_online(room=connection.room, player=connection.player)
+            storage.is_room_online(room=connection.room)
+
+    def iterate_rooms():
+        for room in room_names:
+            for _ in storage.get_room_connections(room=room):
+                pass
+
+    def remove():
+        for connection in connections:
+            storage.remove_connection(connection)
+
+    gc.collect()
+    tracemalloc.start()
+    add()
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    remove()
+
+    results = {"memory": memory / len(connections)}  # Of the storage only, the connections exist already
+    results["add"] = timed(add, len(connections))  # Not traced, as tracing slows it down
+    results["online checks"] = timed(check_online, len(connections))
+    results["room iteration"] = timed(iterate_rooms, rooms)
+    results["remove"] = timed(remove, len(connections))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the player connection storages at scale")
+    parser.add_argument("-n", "--connections", dest="connections", type=int, default=100000, help="connections")
+    parser.add_argument("--rooms", dest="rooms", type=int, default=10000, help="rooms")
+    parser.add_argument("--players", dest="players", type=int, default=5, help="players per room")
+    args = parser.parse_args()
+
+    connections = make_connections(args.connections, rooms=args.rooms, players=args.players)
+
+    before = run(LegacyPlayerStorage, connections, rooms=args.rooms)
+    after = run(PlayerStorage, connections, rooms=args.rooms)
+
+    rows = [
+        (operation, format_time(before[operation]), format_time(after[operation]))
+        for operation in ("add", "online checks", "room iteration", "remove")
+    ]
+    rows.append(("memory per connection", f"{before['memory']:.0f} B", f"{after['memory']:.0f} B"))
+
+    print(f"{args.connections} connections in {args.rooms} rooms, {args.players} players per room")
+    print_table(("per operation", "before", "after"), rows)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Event dispatch cost per message.
+
+Dispatches a message to a no-op handler through <WSEventListener> (singleton handlers, precompiled table),
+with and without a pass-through middleware, and as it was done before it (a handler created per message,
+looked up by the event or the default one):
+
+    python -m benchmarks.dispatch
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+
+from fiasco_backend.server.event_handlers import BaseEventHandler, EventContext
+from fiasco_backend.server.websocket import Message, WebSocketConnection
+from fiasco_backend.server.ws_event_listeners import Handle, WSEventListener
+
+from .timing import format_time, measure_async, print_table
+
+EVENT_DEFAULT = WSEventListener.EVENT_DEFAULT
+
+
+class NoopEventHandler(BaseEventHandler):
+
+    async def handle(self, context: EventContext):
+        pass
+
+
+class LegacyNoopEventHandler:
+    """Handler created per message, as the handlers were before the singleton ones."""
+
+    def __init__(
+        self,
+        admin_message_sender,
+        player_message_sender,
+        admin_connection_storage,
+        player_connection_storage,
+        message: Message,
+        connection: WebSocketConnection
+    ):
+        self.admin_message_sender = admin_message_sender
+        self.player_message_sender = player_message_sender
+
+        self.admin_connection_storage = admin_connection_storage
+        self.player_connection_storage = player_connection_storage
+
+        self.message = message
+        self.connection = connection
+
+    async def handle(self):
+        pass
+
+
+class LegacyWSEventListener:
+    """The listener as it was before the precompiled table."""
+
+    def __init__(self, event_handlers):
+        self.event_handlers = event_handlers
+        self.admin_message_sender = None
+        self.player_message_sender = None
+        self.admin_connection_storage = None
+        self.player_connection_storage = None
+
+    async def __call__(self, message: Message, connection: WebSocketConnection):
+        if message.event in self.event_handlers:
+            handler_cls = self.event_handlers[message.event]
+        elif EVENT_DEFAULT in self.event_handlers:
+            handler_cls = self.event_handlers[EVENT_DEFAULT]
+        else:
+            logging.debug(
+                f"Event <{message.event}> received by "
+                f"{connection.__class__.__name__}(ws={connection.ws}, params={connection.params})"
+            )
+            return
+
+        await handler_cls(
+            admin_message_sender=self.admin_message_sender,
+            player_message_sender=self.player_message_sender,
+            admin_connection_storage=self.admin_connection_storage,
+            player_connection_storage=self.player_connection_storage,
+            connection=connection,
+            message=message
+        ).handle()
+
+
+async def pass_through(context: EventContext, handle: Handle):
+    return await handle(context)
+
+
+def make_listener(**kwargs) -> WSEventListener:
+    return WSEventListener(
+        event_handlers={EVENT_DEFAULT: NoopEventHandler, "upsert-element": NoopEventHandler},
+        admin_message_sender=None,
+        player_message_sender=None,
+        admin_connection_storage=None,
+        player_connection_storage=None,
+        **kwargs
+    )
+
+
+async def run(number: int):
+    connection = object()
+
+    listeners = (
+        ("handler per message", LegacyWSEventListener(
+            event_handlers={EVENT_DEFAULT: LegacyNoopEventHandler, "upsert-element": LegacyNoopEventHandler}
+        )),
+        ("singleton handlers", make_listener()),
+        ("singleton handlers + 1 middleware", make_listener(middlewares=(pass_through, ))),
+    )
+
+    rows = []
+    for name, listener in listeners:
+        times = []
+        for event in ("upsert-element", "unknown-event"):  # The latter goes to the default handler
+            message = Message(event=event, data={})
+            times.append(await measure_async(lambda: listener(message=message, connection=connection), number=number))
+        rows.append((name, *(format_time(t) for t in times)))
+
+    print_table(("", "handled event", "default handler"), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the event dispatch cost")
+    parser.add_argument("-n", "--number", dest="number", type=int, default=100000, help="messages per run")
+    args = parser.parse_args()
+
+    asyncio.run(run(number=args.number))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
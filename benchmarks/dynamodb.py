@@ -0,0 +1,178 @@
+"""
+DynamoDB call cost with the shared pooled resource and with a resource created per call.
+
+Runs a stub DynamoDB endpoint in this process (answering every call right away, optionally after
+a simulated round trip), so the client-side setup cost (session, resource, table, TCP connection)
+is measured without AWS:
+
+    python -m benchmarks.dynamodb --calls 200 --concurrency 1 10 --latency 0.002
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from typing import Any, Awaitable, Callable, Dict, Set
+
+import aioboto3
+
+from aiohttp import web
+
+from fiasco_backend import config
+from fiasco_backend.db.dynamodb import dynamodb
+from fiasco_backend.db.element import ELEMENTS_TABLE_NAME, build_update_params, get_element, update_element
+
+from .timing import format_time, print_table
+
+ITEM = {
+    "element_id": {"S": "a"},
+    "room": {"S": "room-1"},
+    "player": {"S": "player-1"},
+    "coordinates": {"L": [{"N": "120"}, {"N": "340"}]},
+}
+RESPONSES = {
+    "GetItem": {"Item": ITEM},
+    "UpdateItem": {},
+}
+ELEMENT = {"element_id": "a", "room": "room-1", "coordinates": [120, 340]}
+
+
+class StubEndpoint:
+    """DynamoDB JSON protocol endpoint answering with canned responses; counts the TCP connections opened."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.transports: Set[asyncio.Transport] = set()  # Kept, so their IDs are not reused
+
+    async def __call__(self, request: web.Request):
+        self.transports.add(request.transport)
+        await request.read()
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        operation = request.headers["X-Amz-Target"].split(".")[-1]
+
+        return web.Response(
+            body=json.dumps(RESPONSES[operation]).encode(),
+            headers={"Content-Type": "application/x-amz-json-1.0"}
+        )
+
+
+async def legacy_get_element(element_id: str, room: str):
+    """Get the element with a resource created per call, as it was done before the shared one."""
+
+    session = aioboto3.Session()
+    async with session.resource(
+        "dynamodb",
+        region_name=config.aws_region,
+        endpoint_url=config.dynamodb_endpoint_url,
+        aws_access_key_id=config.aws_access_key_id,
+        aws_secret_access_key=config.aws_secret_access_key,
+        aws_session_token=config.aws_session_token
+    ) as dynamo_resource:
+        table = await dynamo_resource.Table(ELEMENTS_TABLE_NAME)
+
+        return (await table.get_item(Key={"element_id": element_id, "room": room})).get("Item", None)
+
+
+async def legacy_update_element(element_data: Dict[str, Any]):
+    session = aioboto3.Session()
+    async with session.resource(
+        "dynamodb",
+        region_name=config.aws_region,
+        endpoint_url=config.dynamodb_endpoint_url,
+        aws_access_key_id=config.aws_access_key_id,
+        aws_secret_access_key=config.aws_secret_access_key,
+        aws_session_token=config.aws_session_token
+    ) as dynamo_resource:
+        table = await dynamo_resource.Table(ELEMENTS_TABLE_NAME)
+        await table.update_item(**build_update_params(element_data))
+
+    return True
+
+
+async def measure_calls(call: Callable[[], Awaitable], calls: int, concurrency: int) -> float:
+    """Time (in seconds) per call of <calls> calls, <concurrency> of them at a time."""
+
+    started_at = time.perf_counter()
+    for _ in range(0, calls, concurrency):
+        await asyncio.gather(*(call() for _ in range(concurrency)))
+
+    return (time.perf_counter() - started_at) / calls
+
+
+async def run(calls: int, concurrencies, latency: float, port: int):
+    endpoint = StubEndpoint(latency=latency)
+    app = web.Application()
+    app.add_routes([web.post("/", endpoint)])
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host="127.0.0.1", port=port).start()
+
+    config.aws_region = "us-east-1"
+    config.aws_access_key_id = "stub"
+    config.aws_secret_access_key = "stub"
+    config.dynamodb_endpoint_url = f"http://127.0.0.1:{port}"
+
+    operations = (
+        ("get_element", lambda: legacy_get_element("a", "room-1"), lambda: get_element("a", "room-1")),
+        ("update_element", lambda: legacy_update_element(ELEMENT), lambda: update_element(ELEMENT)),
+    )
+
+    rows = []
+    for concurrency in concurrencies:
+        for name, before, after in operations:
+            assert await before() and await after()  # Warm up (e.g. the shared resource is opened)
+
+            times = []
+            connections = []
+            for call in (before, after):
+                endpoint.transports.clear()
+                times.append(await measure_calls(call, calls=calls, concurrency=concurrency))
+                connections.append(len(endpoint.transports))
+
+            rows.append((
+                name,
+                concurrency,
+                format_time(times[0]),
+                format_time(times[1]),
+                f"{times[0] / times[1]:.1f}x",
+                f"{connections[0]} -> {connections[1]}",
+            ))
+
+    await dynamodb.close()
+    await runner.cleanup()
+
+    print(f"{calls} calls, stub endpoint latency {latency * 1000:.1f} ms")
+    print_table(
+        ("", "concurrency", "resource per call", "shared resource", "speedup", "TCP connections"),
+        rows
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the DynamoDB calls with the shared and per-call resources")
+    parser.add_argument("-n", "--calls", dest="calls", type=int, default=200, help="calls per operation")
+    parser.add_argument(
+        "--concurrency",
+        dest="concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 10],
+        help="calls at a time"
+    )
+    parser.add_argument("--latency", dest="latency", type=float, default=0, help="stub response delay (in seconds)")
+    parser.add_argument("--port", dest="port", type=int, default=3996, help="port of the stub endpoint")
+    args = parser.parse_args()
+
+    asyncio.run(run(calls=args.calls, concurrencies=args.concurrency, latency=args.latency, port=args.port))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Element update queue operations and memory per pending element.
+
+Compares <ElementUpdateQueue> (the dirty set of the pending data dicts) with the queue it replaced,
+which marked the elements in-flight by a key in their data and merged each change through the queue:
+
+    python -m benchmarks.element_queue
+"""
+
+import argparse
+import gc
+import logging
+import sys
+import time
+import tracemalloc
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from fiasco_backend.db.element import ElementUpdateQueue
+
+from .timing import format_time, print_table
+
+
+class LegacyElementUpdateQueue:
+    """The queue as it was before the dirty set (its flush took, got and dropped the elements by timestamp)."""
+
+    PROCESSING_KEY = "__processing__"
+
+    def __init__(self):
+        self._element_queue: Dict[str, Tuple[Optional[Dict[str, Any]], Optional[float]]] = {}
+
+    def put(self, element_data: Dict[str, Any]):
+        logging.debug("Data into update queue #%s", element_data)
+
+        element_id = element_data["element_id"]
+        element_data[self.PROCESSING_KEY] = False
+        if self.exists(element_id):
+            if self.get(element_id)[0] is None:  # Skip, if deleted
+                logging.debug("Skipping element update #%s", element_id)
+                return
+
+            stored_element_data, _ = self.get(element_id=element_id)
+            element_data = {
+                **stored_element_data,
+                **element_data,
+            }
+
+        self._element_queue[element_id] = (element_data, time.time())
+
+        logging.debug("Element in queue %s, %s", *self._element_queue[element_id])
+
+    def get(self, element_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[float]]:
+        element, timestamp = self._element_queue[element_id]
+        if element is None:  # Deleted
+            return element, timestamp
+
+        processing = element.pop(self.PROCESSING_KEY)
+
+        logging.debug("Element selected from update queue %s", element)
+
+        try:
+            return element, timestamp
+        finally:
+            element[self.PROCESSING_KEY] = processing
+
+    def exists(self, element_id: str) -> bool:
+        return element_id in self._element_queue
+
+    def delete(self, element_id: str):
+        self._element_queue[element_id] = (None, time.time())
+
+    def drop(self, element_id: str, timestamp: Optional[float] = None):
+        if timestamp is not None and self._element_queue.get(element_id, (None, None))[1] != timestamp:
+            return
+
+        self._element_queue.pop(element_id, None)
+
+    def element_ids(self) -> List[str]:
+        return list(self._element_queue)
+
+    def __len__(self):
+        return len(self._element_queue)
+
+
+def make_elements(count: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "element_id": f"element-{i}",
+            "room": f"room-{i % 100}",
+            "player": "player-1",
+            "type": "card",
+            "coordinates": [i, i, i + 60, i + 80],
+            "styles": {"z-index": i},
+        }
+        for i in range(count)
+    ]
+
+
+def make_moves(count: int) -> List[Dict[str, Any]]:
+    return [
+        {"element_id": f"element-{i}", "room": f"room-{i % 100}", "coordinates": [i + 1, i + 1, i + 61, i + 81]}
+        for i in range(count)
+    ]
+
+
+def flush_legacy(queue: LegacyElementUpdateQueue):
+    pending = []
+    for element_id in queue.element_ids():
+        element_data, timestamp = queue.get(element_id)
+        if element_data is None:
+            queue.drop(element_id=element_id, timestamp=timestamp)
+            continue
+
+        pending.append((element_data, timestamp))
+
+    for element_data, timestamp in pending:
+        queue.drop(element_id=element_data["element_id"], timestamp=timestamp)
+
+
+def flush(queue: ElementUpdateQueue):
+    for element_data in queue.take_dirty():
+        queue.complete(element_data["element_id"], element_data)
+
+
+def run(queue_class, flush_queue, count: int, updates: int) -> Tuple[float, float, int]:
+    """Get the time per put, the flush time per element and the memory per pending element."""
+
+    elements = make_elements(count)
+    moves = [make_moves(count) for _ in range(updates)]
+    queue = queue_class()
+
+    gc.collect()
+    tracemalloc.start()
+    traced_before, _ = tracemalloc.get_traced_memory()
+
+    for element_data in elements:
+        queue.put(element_data)
+
+    traced_after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started_at = time.perf_counter()
+    for batch in moves:
+        for element_data in batch:
+            queue.put(element_data)
+    put_time = (time.perf_counter() - started_at) / (count * updates)
+
+    started_at = time.perf_counter()
+    flush_queue(queue)
+    flush_time = (time.perf_counter() - started_at) / count
+
+    assert not len(queue)
+
+    return put_time, flush_time, (traced_after - traced_before) // count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the element update queues")
+    parser.add_argument("-n", "--elements", dest="elements", type=int, default=100000, help="pending elements")
+    parser.add_argument("--updates", dest="updates", type=int, default=3, help="updates per pending element")
+    args = parser.parse_args()
+
+    rows = []
+    for name, queue_class, flush_queue in (
+        ("before", LegacyElementUpdateQueue, flush_legacy),
+        ("after", ElementUpdateQueue, flush),
+    ):
+        put_time, flush_time, memory = run(queue_class, flush_queue, count=args.elements, updates=args.updates)
+        rows.append((
+            name,
+            f"{1 / put_time:,.0f}",
+            format_time(put_time),
+            f"{1 / flush_time:,.0f}",
+            f"{memory} B",
+        ))
+
+    print(f"{args.elements} pending elements, {args.updates} updates each")
+    print_table(("", "puts/s", "per put", "flushed/s", "per pending element"), rows)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Broadcast (fan-out) cost by room size.
+
+Enqueues an element update to all the connections of a room, serializing it once per fan-out (<send_data>)
+and, as it was done before, once per connection; the sockets are not involved, so it's the cost
+on the room's task only:
+
+    python -m benchmarks.fanout --sizes 1 10 100 1000
+"""
+
+import argparse
+import sys
+import time
+
+from typing import Callable, List
+
+from fiasco_backend import config
+from fiasco_backend.server.websocket import WebSocketConnection
+from fiasco_backend.server.websocket.base.codecs import JsonCodec
+from fiasco_backend.server.websocket.message_senders.message_sending import send_data
+from fiasco_backend.utils.json_encoders import JSON_ENCODERS, json_dumps
+
+from .timing import format_time, print_table
+
+MESSAGE = {  # A dragged element, as broadcast to the room
+    "event": "upsert-element",
+    "data": {
+        "element_id": "2a5f3c1e-6b7d-4e8f-9a0b-1c2d3e4f5a6b",
+        "room": "room-1",
+        "coordinates": [120, 340, 180, 420],
+    },
+    "sender": "player-1",
+    "target": "room",
+    "seq": 1042,
+}
+MESSAGES_PER_RUN = 10000  # Messages x connections, to time the small rooms as well
+
+
+class FakeResponse:
+    """Open websocket of the JSON protocol; the queued messages are never sent."""
+
+    closed = False
+    codec = JsonCodec()
+
+
+def make_connections(count: int) -> List[WebSocketConnection]:
+    return [WebSocketConnection(ws=FakeResponse()) for _ in range(count)]
+
+
+def send_per_connection(data, connections: List[WebSocketConnection]):
+    for connection in connections:
+        if connection.ws.closed:
+            continue
+
+        connection.send(json_dumps(data))
+
+
+def measure_fanout(send: Callable, size: int, repeat: int = 5) -> float:
+    """Best time (in seconds) to enqueue a message to <size> connections."""
+
+    messages = max(1, MESSAGES_PER_RUN // size)
+
+    best = float("inf")
+    for _ in range(repeat):
+        connections = make_connections(size)  # Fresh (empty) queues
+
+        started_at = time.perf_counter()
+        for _ in range(messages):
+            send(MESSAGE, connections)
+        best = min(best, time.perf_counter() - started_at)
+
+    return best / messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the broadcast cost by room size")
+    parser.add_argument("--sizes", dest="sizes", type=int, nargs="+", default=[1, 10, 100, 1000], help="room sizes")
+    parser.add_argument("--json-encoder", dest="json_encoder", default=config.json_encoder, choices=JSON_ENCODERS)
+    args = parser.parse_args()
+
+    config.json_encoder = args.json_encoder
+    config.outbound_queue_max_length = sys.maxsize  # Nothing is sent, so nothing should be dropped either
+    config.outbound_queue_max_bytes = sys.maxsize
+
+    rows = []
+    for size in args.sizes:
+        before = measure_fanout(send_per_connection, size)
+        after = measure_fanout(lambda data, connections: send_data(data=data, connections=connections), size)
+        rows.append((
+            size,
+            format_time(before),
+            format_time(after),
+            format_time(after / size),
+            f"{before / after:.1f}x",
+        ))
+
+    print(f"JSON encoder: {args.json_encoder}")
+    print_table(("connections", "encoded per connection", "encoded once", "per connection", "speedup"), rows)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Overhead of the metrics on the hot paths.
+
+Times the metric updates themselves, the event dispatch with and without <observe_event> and the fan-out
+(<send_data>) with and without its histograms:
+
+    python -m benchmarks.metrics_overhead
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from functools import partial
+from typing import Tuple
+
+from fiasco_backend.server.event_handlers import EventContext
+from fiasco_backend.server.event_metrics import observe_event
+from fiasco_backend.server.websocket import Message
+from fiasco_backend.server.websocket.base.codecs import JsonCodec
+from fiasco_backend.server.websocket.message_senders import message_sending
+from fiasco_backend.utils.metrics import Counter, Histogram
+
+from .timing import format_time, measure, measure_async, print_table
+
+DATA = {
+    "event": "upsert-element",
+    "data": {"element_id": "a", "coordinates": [1, 2]},
+    "sender": "player-1",
+    "target": "room",
+}
+
+
+class FakeResponse:
+    closed = False
+    codec = JsonCodec()
+
+
+class FakeConnection:
+    """Connection dropping the messages, so only the fan-out itself is timed."""
+
+    ws = FakeResponse()
+
+    def send(self, payload, volatile: bool = False) -> bool:
+        return True
+
+
+class NoopHistogram:
+
+    def observe(self, value: float, labels=()):
+        pass
+
+
+async def handle(context: EventContext):
+    pass
+
+
+def measure_send_data(connections: int, number: int, repeat: int = 5) -> Tuple[float, float]:
+    """Get the <send_data> time without and with the metrics, measured in turns (so drifts affect both alike)."""
+
+    fake_connections = [FakeConnection() for _ in range(connections)]
+    metrics = (message_sending.FANOUT_LATENCY, message_sending.FANOUT_SIZE)
+
+    def send():
+        message_sending.send_data(data=DATA, connections=fake_connections)
+
+    without_metrics = with_metrics = float("inf")
+    for _ in range(repeat):
+        message_sending.FANOUT_LATENCY = message_sending.FANOUT_SIZE = NoopHistogram()
+        try:
+            without_metrics = min(without_metrics, measure(send, number=number, repeat=1))
+        finally:
+            message_sending.FANOUT_LATENCY, message_sending.FANOUT_SIZE = metrics
+
+        with_metrics = min(with_metrics, measure(send, number=number, repeat=1))
+
+    return without_metrics, with_metrics
+
+
+async def measure_dispatch(handle, number: int) -> float:
+    message = Message(event="upsert-element", data={})
+
+    return await measure_async(lambda: handle(EventContext(message=message, connection=None)), number=number)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the metrics overhead")
+    parser.add_argument("-n", "--number", dest="number", type=int, default=100000, help="calls per run")
+    args = parser.parse_args()
+
+    counter = Counter("counter", "Benchmarked counter", labels=("event", ))
+    histogram = Histogram("histogram", "Benchmarked histogram", labels=("event", ))
+
+    print_table(("metric update", "time"), (
+        ("Counter.inc", format_time(measure(lambda: counter.inc(("a", )), number=args.number))),
+        ("Histogram.observe", format_time(measure(lambda: histogram.observe(0.0003, ("a", )), number=args.number))),
+        ("time.perf_counter", format_time(measure(time.perf_counter, number=args.number))),
+    ))
+    print()
+
+    rows = [(
+        "dispatch (no-op handler)",
+        format_time(asyncio.run(measure_dispatch(handle, number=args.number))),
+        format_time(asyncio.run(measure_dispatch(partial(observe_event, handle=handle), number=args.number))),
+    )]
+    for connections in (1, 100):
+        without_metrics, with_metrics = measure_send_data(connections, number=max(1, args.number // 10))
+        rows.append((
+            f"send_data to {connections} connection{'s' if connections > 1 else ''}",
+            format_time(without_metrics),
+            format_time(with_metrics),
+        ))
+
+    print_table(("", "without metrics", "with metrics"), rows)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
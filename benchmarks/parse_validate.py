@@ -0,0 +1,67 @@
+"""
+Parsing and validation cost of the inbound messages and the upserted elements.
+
+Compares the fast paths (<Message.from_str>, <load_element>) with the schema instantiated per call,
+as it was done before them:
+
+    python -m benchmarks.parse_validate
+"""
+
+import argparse
+import json
+import sys
+
+from fiasco_backend.db.element import ElementSchema, load_element
+from fiasco_backend.server.websocket import Message
+from fiasco_backend.server.websocket.base.message import MessageSchema
+
+from .timing import format_time, measure, print_table
+
+ELEMENT = {
+    "element_id": "2a5f3c1e-6b7d-4e8f-9a0b-1c2d3e4f5a6b",
+    "room": "room-1",
+    "player": "player-1",
+    "type": "card",
+    "coordinates": [120, 340, 180, 420],
+    "styles": {"z-index": 3, "rotate": 90},
+}
+MESSAGE = json.dumps({"event": "upsert-element", "data": ELEMENT})
+INVALID_ELEMENT = {**ELEMENT, "coordinates": [120.5, 340, 180, 420]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the message and element validation paths")
+    parser.add_argument("-n", "--number", dest="number", type=int, default=20000, help="calls per run")
+    args = parser.parse_args()
+
+    cases = (
+        (
+            "message",
+            lambda: Message(**MessageSchema().loads(MESSAGE)),
+            lambda: Message.from_str(MESSAGE),
+        ),
+        (
+            "element",
+            lambda: ElementSchema().load(dict(ELEMENT)),
+            lambda: load_element(dict(ELEMENT)),
+        ),
+        (
+            "element (float coordinates, schema fallback)",
+            lambda: ElementSchema().load(dict(INVALID_ELEMENT)),
+            lambda: load_element(dict(INVALID_ELEMENT)),
+        ),
+    )
+
+    rows = []
+    for name, before, after in cases:
+        before_time = measure(before, number=args.number)
+        after_time = measure(after, number=args.number)
+        rows.append((name, format_time(before_time), format_time(after_time), f"{before_time / after_time:.1f}x"))
+
+    print_table(("", "schema per call", "fast path", "speedup"), rows)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+Timing helpers of the benchmarks.
+
+The benchmarks are run from the repository root, e.g.:
+
+    python -m benchmarks.parse_validate
+"""
+
+import time
+
+from typing import Any, Callable, Iterable, Tuple
+
+
+def measure(func: Callable[[], Any], number: int, repeat: int = 5) -> float:
+    """Best time (in seconds) of a <func> call out of <repeat> runs of <number> calls."""
+
+    best = float("inf")
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - started_at)
+
+    return best / number
+
+
+async def measure_async(func: Callable[[], Any], number: int, repeat: int = 5) -> float:
+    """Best time (in seconds) of an awaited <func> call out of <repeat> runs of <number> calls."""
+
+    best = float("inf")
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        for _ in range(number):
+            await func()
+        best = min(best, time.perf_counter() - started_at)
+
+    return best / number
+
+
+def print_table(header: Tuple[str, ...], rows: Iterable[Tuple[Any, ...]]):
+    rows = [tuple(str(value) for value in row) for row in rows]
+    widths = [max(len(value) for value in column) for column in zip(header, *rows)]
+
+    for row in (header, *rows):  # Names on the left, values on the right
+        print("  ".join(
+            value.ljust(width) if i == 0 else value.rjust(width) for i, (value, width) in enumerate(zip(row, widths))
+        ))
+
+
+def format_time(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.2f} µs"
+
+    return f"{seconds * 1e3:.2f} ms"
@@ -0,0 +1,110 @@
+"""
+Wire size and encoding/decoding time of the messages by codec (negotiated subprotocol).
+
+Measures the <$initial> message of a room (elements as read from DynamoDB, i.e. with <Decimal> numbers)
+and an <upsert-element> broadcast; the sizes are given as sent with and without permessage-deflate
+(the messages below <ws_compress_threshold> are sent uncompressed anyway):
+
+    python -m benchmarks.wire_formats --elements 200
+"""
+
+import argparse
+import sys
+import zlib
+
+from decimal import Decimal
+from typing import Any, Dict
+
+from fiasco_backend import config
+from fiasco_backend.server.websocket.base.codecs import CODECS
+
+from .timing import format_time, measure, print_table
+
+
+def make_element(i: int) -> Dict[str, Any]:
+    return {
+        "element_id": f"2a5f3c1e-6b7d-4e8f-9a0b-{i:012d}",
+        "room": "room-1",
+        "player": f"player-{i % 6}",
+        "type": "card",
+        "coordinates": [Decimal(i * 10), Decimal(i * 5), Decimal(i * 10 + 60), Decimal(i * 5 + 80)],
+        "styles": {"z-index": Decimal(i), "rotate": Decimal(90), "color": "#a83232"},
+    }
+
+
+def make_initial(elements: int) -> Dict[str, Any]:
+    return {
+        "event": "$initial",
+        "data": {
+            "players": {f"player-{i}": {"online": i % 2 == 0} for i in range(6)},
+            "seq": 1042,
+            "epoch": "5f0c2e7a9b1d4c36",
+            "version": 2210,
+            "elements": {f"2a5f3c1e-6b7d-4e8f-9a0b-{i:012d}": make_element(i) for i in range(elements)},
+        },
+        "sender": "server",
+        "target": "direct",
+    }
+
+
+def make_upsert() -> Dict[str, Any]:
+    """<upsert-element> message of a dragged element, as broadcast to the room."""
+
+    return {
+        "event": "upsert-element",
+        "data": {
+            "element_id": make_element(7)["element_id"],
+            "room": "room-1",
+            "coordinates": [120, 340, 180, 420],
+        },
+        "sender": "player-1",
+        "target": "room",
+        "seq": 1042,
+    }
+
+
+def deflate(payload) -> int:
+    """Size of the payload compressed as a permessage-deflate frame of a fresh connection."""
+
+    if isinstance(payload, str):
+        payload = payload.encode()
+
+    compressobj = zlib.compressobj(level=config.ws_compress_level, wbits=-config.ws_compress_window_bits)
+    compressed = compressobj.compress(payload) + compressobj.flush(zlib.Z_SYNC_FLUSH)
+
+    return len(compressed) - 4  # Without the trailing empty block, as sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the wire size and CPU time of the codecs")
+    parser.add_argument("--elements", dest="elements", type=int, default=200, help="elements of the room")
+    parser.add_argument("-n", "--number", dest="number", type=int, default=200, help="calls per run of $initial")
+    args = parser.parse_args()
+
+    messages = (
+        (f"$initial ({args.elements} elements)", make_initial(args.elements), args.number),
+        ("upsert-element", make_upsert(), args.number * 50),
+    )
+
+    rows = []
+    for message_name, data, number in messages:
+        for codec in CODECS.values():
+            payload = codec.encode(data)
+            size = len(payload if isinstance(payload, bytes) else payload.encode())
+
+            rows.append((
+                message_name,
+                codec.name,
+                f"{size} B",
+                f"{deflate(payload)} B",
+                format_time(measure(lambda: codec.encode(data), number=number)),
+                format_time(measure(lambda: codec.decode(payload), number=number)),
+            ))
+
+    print_table(("", "codec", "size", "deflated", "encode", "decode"), rows)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
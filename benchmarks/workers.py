@@ -0,0 +1,224 @@
+"""
+Message throughput by number of the worker processes (see <run_workers>).
+
+Runs the workers (with the room affinity proxying and the socket bus, but without the database:
+a room event is only broadcast to the room) and client processes; each player sends an event and waits
+for its own broadcast before sending the next one, so the throughput is bound by the server:
+
+    python -m benchmarks.workers --workers 1 2 4 --rooms 100 --players 5 --clients 4
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from dataclasses import asdict
+from typing import List
+
+import aiohttp
+
+from aiohttp import web
+
+from fiasco_backend import config
+from fiasco_backend.server import bus
+from fiasco_backend.server.room_actors import RoomEventListener, room_actors
+from fiasco_backend.server.websocket import Message, WebSocketHandler
+from fiasco_backend.server.websocket.authorizers import PlayerAuthorizer
+from fiasco_backend.server.websocket.connection_storages import PlayerStorage
+from fiasco_backend.server.websocket.connections import PlayerConnection
+from fiasco_backend.server.websocket.message_senders import PlayerMessageSender
+from fiasco_backend.server.workers import RoomAffinityHandler, get_worker_socket_path, run_workers
+
+from .timing import print_table
+
+CONNECT_TIMEOUT = 30  # Seconds, for the workers to start
+
+
+class BroadcastEventListener:
+    """Broadcasts the player events to their rooms, instead of handling them."""
+
+    def __init__(self, storage: PlayerStorage, sender: PlayerMessageSender):
+        self._storage = storage
+        self._sender = sender
+
+    async def __call__(self, message: Message, connection: PlayerConnection):
+        if message.event == WebSocketHandler.EVENT_USER_CONNECTED:
+            self._storage.add_connection(connection)
+            self._sender.acquire_room(connection.room)
+        elif message.event == WebSocketHandler.EVENT_USER_DISCONNECTED:
+            self._storage.remove_connection(connection)
+            self._sender.release_room(connection.room)
+        else:
+            await self._sender.send_message(message=message, sender=connection.player, room=connection.room)
+
+
+def run_worker(config_values: dict, worker: int):
+    config.load_from_dict(config_values)
+    config.bus = "socket"  # The hub runs in the master process
+    config.bus_hub = False
+
+    storage = PlayerStorage()
+    sender = PlayerMessageSender(storage)
+    handler = RoomAffinityHandler(
+        handler=WebSocketHandler(
+            authorizer=PlayerAuthorizer(),
+            event_listeners=(RoomEventListener(listener=BroadcastEventListener(storage, sender)), )
+        ),
+        worker=worker,
+        workers=config.workers
+    )
+
+    app = web.Application()
+    app.on_startup.append(bus.on_startup)
+    app.on_cleanup.append(room_actors.on_cleanup)
+    app.on_cleanup.append(handler.on_cleanup)
+    app.on_cleanup.append(bus.on_cleanup)
+    app.add_routes([web.get("/", handler)])
+
+    web.run_app(
+        app,
+        host=config.server_host,
+        port=config.server_port,
+        path=get_worker_socket_path(worker),
+        reuse_port=True,
+        access_log=None,
+        print=None
+    )
+
+
+def run_master(config_values: dict):
+    config.load_from_dict(config_values)
+
+    run_workers(target=run_worker, workers=config.workers)
+
+
+def run_clients(url: str, players: List[int], rooms: int, duration: float, start, results):
+    asyncio.run(_run_clients(url=url, players=players, rooms=rooms, duration=duration, start=start, results=results))
+
+
+async def _run_clients(url: str, players: List[int], rooms: int, duration: float, start, results):
+    counts = {"sent": 0, "received": 0}
+
+    async def play(ws: aiohttp.ClientWebSocketResponse, player: str, stop_at: float):
+        while time.monotonic() < stop_at:
+            await ws.send_str('{"event": "move-element", "data": {"coordinates": [1, 2]}}')
+            counts["sent"] += 1
+
+            async for msg in ws:  # Till own message is broadcast back
+                counts["received"] += 1
+                if f'"sender": "{player}"' in msg.data:
+                    break
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        sockets = []
+        for i in players:
+            sockets.append(await connect(session, f"{url}?room=room-{i % rooms}&player=player-{i}"))
+
+        await asyncio.get_running_loop().run_in_executor(None, start.wait)
+        stop_at = time.monotonic() + duration
+
+        await asyncio.gather(*(play(ws, f"player-{i}", stop_at) for i, ws in zip(players, sockets)))
+
+        for ws in sockets:
+            await ws.close()
+
+    results.put(counts)
+
+
+async def connect(session: aiohttp.ClientSession, url: str) -> aiohttp.ClientWebSocketResponse:
+    """Connect once the workers listen."""
+
+    started_at = time.monotonic()
+    while True:
+        try:
+            return await session.ws_connect(url)
+        except aiohttp.ClientError:
+            if time.monotonic() - started_at > CONNECT_TIMEOUT:
+                raise
+
+            await asyncio.sleep(0.1)
+
+
+def run(workers: int, rooms: int, players: int, clients: int, duration: float, port: int) -> dict:
+    context = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as directory:
+        config.workers = workers
+        config.server_host = "127.0.0.1"
+        config.server_port = port
+        config.bus_socket_path = os.path.join(directory, "bus.sock")
+        config.worker_socket_path = os.path.join(directory, "worker-{worker}.sock")
+
+        master = context.Process(target=run_master, args=(asdict(config), ))
+        master.start()
+
+        start = context.Event()
+        results = context.Queue()
+        all_players = list(range(rooms * players))
+        processes = [
+            context.Process(
+                target=run_clients,
+                args=(f"http://127.0.0.1:{port}/", all_players[i::clients], rooms, duration, start, results)
+            )
+            for i in range(clients)
+        ]
+        for process in processes:
+            process.start()
+
+        time.sleep(1)  # Connections are opened; the ones not yet are opened during the run anyway
+        start.set()
+
+        counts = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        master.terminate()
+        master.join()
+
+    return {
+        "sent": sum(count["sent"] for count in counts),
+        "received": sum(count["received"] for count in counts),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the message throughput by number of the workers")
+    parser.add_argument("--workers", dest="workers", type=int, nargs="+", default=[1, 2, 4], help="worker counts")
+    parser.add_argument("--rooms", dest="rooms", type=int, default=100, help="rooms")
+    parser.add_argument("--players", dest="players", type=int, default=5, help="players per room")
+    parser.add_argument("--clients", dest="clients", type=int, default=4, help="client processes")
+    parser.add_argument("--duration", dest="duration", type=float, default=10, help="seconds to send the events")
+    parser.add_argument("--port", dest="port", type=int, default=3997, help="port of the benchmarked server")
+    args = parser.parse_args()
+
+    rows = []
+    for workers in args.workers:
+        counts = run(
+            workers=workers,
+            rooms=args.rooms,
+            players=args.players,
+            clients=args.clients,
+            duration=args.duration,
+            port=args.port
+        )
+        rows.append((
+            workers,
+            f"{counts['sent'] / args.duration:,.0f}",
+            f"{counts['received'] / args.duration:,.0f}",
+        ))
+
+    print(
+        f"{args.rooms} rooms x {args.players} players, {args.clients} client processes, {os.cpu_count()} CPUs "
+        "(the clients take some of them)"
+    )
+    print_table(("workers", "events/s", "messages received/s"), rows)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
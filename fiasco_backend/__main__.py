@@ -2,81 +2,25 @@
 
 import argparse
 import asyncio
-import logging
 import sys
 
 from aiohttp import web
 
 from fiasco_backend import config
-from fiasco_backend.server.event_handlers import (
-    DefaultAdminEventHandler,
-    DefaultPlayerEventHandler,
-
-    PlayerConnectedHandler,
-    PlayerDisconnectedHandler,
-
-    GetStatisticsHandler,
-    UpsertElementHandler,
-    DeleteElementHandler,
-)
-from fiasco_backend.server.routes import healthcheck_handler
-from fiasco_backend.server.websocket import (
-    WebSocketHandler,
-)
-from fiasco_backend.server.websocket.authorizers import (
-    AdminAuthorizer,
-    PlayerAuthorizer,
-)
-from fiasco_backend.server.websocket.connection_storages import (
-    AdminStorage,
-    PlayerStorage,
-)
-from fiasco_backend.server.websocket.message_senders import (
-    AdminMessageSender,
-    PlayerMessageSender,
-)
-from fiasco_backend.server.ws_event_listeners import WSEventListener
-
-
-def init_admin_event_listener(
-    admin_message_sender: AdminMessageSender,
-    player_message_sender: PlayerMessageSender,
-    admin_connection_storage: AdminStorage,
-    player_connection_storage: PlayerStorage
-):
-    return WSEventListener(
-        admin_message_sender=admin_message_sender,
-        player_message_sender=player_message_sender,
-        admin_connection_storage=admin_connection_storage,
-        player_connection_storage=player_connection_storage,
-        event_handlers={
-            WSEventListener.EVENT_DEFAULT: DefaultAdminEventHandler,
-        },
-    )
-
-
-def init_player_event_listener(
-    admin_message_sender: AdminMessageSender,
-    player_message_sender: PlayerMessageSender,
-    admin_connection_storage: AdminStorage,
-    player_connection_storage: PlayerStorage
-):
-    return WSEventListener(
-        admin_message_sender=admin_message_sender,
-        player_message_sender=player_message_sender,
-        admin_connection_storage=admin_connection_storage,
-        player_connection_storage=player_connection_storage,
-        event_handlers={
-            WSEventListener.EVENT_DEFAULT: DefaultPlayerEventHandler,
-
-            WSEventListener.EVENT_USER_CONNECTED: PlayerConnectedHandler,
-            WSEventListener.EVENT_USER_DISCONNECTED: PlayerDisconnectedHandler,
-
-            "get-statistics": GetStatisticsHandler,
-            "upsert-element": UpsertElementHandler,
-            "delete-element": DeleteElementHandler,
-        },
-    )
+from fiasco_backend.app import create_app, run_worker, setup_logging
+from fiasco_backend.server import bus
+from fiasco_backend.server.websocket import OutboundQueue, parse_rate_limit_rule
+from fiasco_backend.server.workers import run_workers
+from fiasco_backend.utils.json_encoders import JSON_ENCODERS
+
+
+def rate_limit_rule(value: str) -> str:
+    try:
+        parse_rate_limit_rule(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+    return value
 
 
 def main():
@@ -99,55 +43,268 @@ def main():
     parser.add_argument(
         "--aws--session-token", dest="aws_session_token", type=str, default=None, help="AWS session token"
     )
-
     parser.add_argument(
-        "--admin-api-key", dest="admin_api_key", type=str, default=None, help="Admin API Key"
+        "--dynamodb-endpoint-url",
+        dest="dynamodb_endpoint_url",
+        type=str,
+        default=config.dynamodb_endpoint_url,
+        help="DynamoDB endpoint URL (e.g. of DynamoDB Local); by default the one of the AWS region"
+    )
+    parser.add_argument(
+        "--dynamodb-max-pool-connections",
+        dest="dynamodb_max_pool_connections",
+        type=int,
+        default=config.dynamodb_max_pool_connections,
+        help="max number of pooled DynamoDB HTTP connections"
+    )
+    parser.add_argument(
+        "--dynamodb-keepalive-timeout",
+        dest="dynamodb_keepalive_timeout",
+        type=float,
+        default=config.dynamodb_keepalive_timeout,
+        help="keep-alive timeout (in seconds) of idle DynamoDB HTTP connections"
+    )
+    parser.add_argument(
+        "--elements-room-index",
+        dest="elements_room_index",
+        type=str,
+        default=config.elements_room_index,
+        help="elements table GSI with the <room> partition key to query the room elements by (scanned if not set)"
     )
 
-    config.load_from_args(parser.parse_args())
+    parser.add_argument(
+        "--element-flush-interval",
+        dest="element_flush_interval",
+        type=float,
+        default=config.element_flush_interval,
+        help="interval (in seconds) of storing the pending element updates"
+    )
+    parser.add_argument(
+        "--element-flush-threshold",
+        dest="element_flush_threshold",
+        type=int,
+        default=config.element_flush_threshold,
+        help="number of the pending element updates to store them before the interval passed"
+    )
+    parser.add_argument(
+        "--element-flush-max-pending",
+        dest="element_flush_max_pending",
+        type=int,
+        default=config.element_flush_max_pending,
+        help="max number of the pending element updates (the updates wait for a flush above it)"
+    )
 
-    if config.debug:
-        logging.basicConfig(level=logging.DEBUG)
-    else:
-        logging.basicConfig(level=logging.INFO)
+    parser.add_argument(
+        "--room-cache-ttl",
+        dest="room_cache_ttl",
+        type=float,
+        default=config.room_cache_ttl,
+        help="time (in seconds) to keep the state of a room without connections in cache"
+    )
+    parser.add_argument(
+        "--room-cache-max-bytes",
+        dest="room_cache_max_bytes",
+        type=int,
+        default=config.room_cache_max_bytes,
+        help="approximate memory ceiling (in bytes) of the room state cache"
+    )
+    parser.add_argument(
+        "--room-cache-max-tombstones",
+        dest="room_cache_max_tombstones",
+        type=int,
+        default=config.room_cache_max_tombstones,
+        help="number of deleted elements to remember per cached room for the incremental initial data"
+    )
 
-    app = web.Application()
+    parser.add_argument(
+        "--json-encoder",
+        dest="json_encoder",
+        type=str,
+        choices=tuple(JSON_ENCODERS),
+        default=config.json_encoder,
+        help="JSON encoder of the outgoing messages"
+    )
 
-    admin_connection_storage = AdminStorage()
-    player_connection_storage = PlayerStorage()
+    parser.add_argument(
+        "--ws-compress-level",
+        dest="ws_compress_level",
+        type=int,
+        choices=range(10),
+        default=config.ws_compress_level,
+        help="permessage-deflate compression level (0 to disable compression)"
+    )
+    parser.add_argument(
+        "--ws-compress-window-bits",
+        dest="ws_compress_window_bits",
+        type=int,
+        choices=range(9, 16),
+        default=config.ws_compress_window_bits,
+        help="max permessage-deflate window bits (less use less memory per connection)"
+    )
+    parser.add_argument(
+        "--ws-compress-threshold",
+        dest="ws_compress_threshold",
+        type=int,
+        default=config.ws_compress_threshold,
+        help="min size (in bytes) of an outgoing message to compress it"
+    )
 
-    admin_message_sender = AdminMessageSender(admin_connection_storage)
-    player_message_sender = PlayerMessageSender(player_connection_storage)
+    parser.add_argument(
+        "--outbound-queue-max-length",
+        dest="outbound_queue_max_length",
+        type=int,
+        default=config.outbound_queue_max_length,
+        help="max number of the pending outgoing messages per connection"
+    )
+    parser.add_argument(
+        "--outbound-queue-max-bytes",
+        dest="outbound_queue_max_bytes",
+        type=int,
+        default=config.outbound_queue_max_bytes,
+        help="max size (in bytes) of the pending outgoing messages per connection"
+    )
+    parser.add_argument(
+        "--outbound-queue-overflow-policy",
+        dest="outbound_queue_overflow_policy",
+        type=str,
+        choices=OutboundQueue.POLICIES,
+        default=config.outbound_queue_overflow_policy,
+        help="slow consumer policy: drop the oldest volatile messages (closing if not enough) or close connection"
+    )
 
-    admin_event_listener = init_admin_event_listener(
-        admin_message_sender=admin_message_sender,
-        player_message_sender=player_message_sender,
-        admin_connection_storage=admin_connection_storage,
-        player_connection_storage=player_connection_storage,
+    parser.add_argument(
+        "--room-batch-tick",
+        dest="room_batch_tick",
+        type=float,
+        default=config.room_batch_tick,
+        help="time (in seconds, e.g. 0.033) to collect room messages into a single frame (0 to disable)"
+    )
+    parser.add_argument(
+        "--room-mailbox-size",
+        dest="room_mailbox_size",
+        type=int,
+        default=config.room_mailbox_size,
+        help="max number of the pending events per room; the connections sending more wait for the room to catch up"
     )
 
-    player_event_listener = init_player_event_listener(
-        admin_message_sender=admin_message_sender,
-        player_message_sender=player_message_sender,
-        admin_connection_storage=admin_connection_storage,
-        player_connection_storage=player_connection_storage,
+    parser.add_argument(
+        "--upsert-conflation-rate",
+        dest="upsert_conflation_rate",
+        type=float,
+        default=config.upsert_conflation_rate,
+        help="max forwarded updates per second per element; the latest state is always delivered (0 to disable)"
+    )
+    parser.add_argument(
+        "--viewport-cell-size",
+        dest="viewport_cell_size",
+        type=int,
+        default=config.viewport_cell_size,
+        help="cell size (in board coordinates) of the grids indexing the element positions and the client viewports"
     )
 
-    admin_websocket_handler = WebSocketHandler(
-        authorizer=AdminAuthorizer(admin_api_key=config.admin_api_key),
-        event_listeners=(admin_event_listener, )
+    parser.add_argument(
+        "--room-event-log-size",
+        dest="room_event_log_size",
+        type=int,
+        default=config.room_event_log_size,
+        help="number of the recent room messages kept for resuming sessions"
+    )
+    parser.add_argument(
+        "--presence-grace-period",
+        dest="presence_grace_period",
+        type=float,
+        default=config.presence_grace_period,
+        help="time (in seconds) to wait for a reconnection before announcing a player disconnected"
+    )
+    parser.add_argument(
+        "--heartbeat-interval",
+        dest="heartbeat_interval",
+        type=float,
+        default=config.heartbeat_interval,
+        help="time (in seconds) of no messages from a client to ping it after (0 to disable)"
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        dest="idle_timeout",
+        type=float,
+        default=config.idle_timeout,
+        help="time (in seconds) of no messages (pongs included) from a client to close its connection after "
+             "(0 to disable)"
+    )
+    parser.add_argument(
+        "--max-message-size",
+        dest="max_message_size",
+        type=int,
+        default=config.max_message_size,
+        help="max size (in bytes) of an incoming message; larger ones close the connection (0 to disable)"
+    )
+    parser.add_argument(
+        "--rate-limit",
+        dest="rate_limits",
+        type=rate_limit_rule,
+        action="append",
+        default=None,
+        help="incoming messages limit <SCOPE>:<EVENT>=<RATE>/<BURST> per connection or room, "
+             "e.g. connection:upsert-element=30/60 (<EVENT> * limits all the events together); "
+             "repeatable, replaces the default limits "
+             f"({' '.join(config.rate_limits)})"
+    )
+    parser.add_argument(
+        "--rate-limit-max-throttled",
+        dest="rate_limit_max_throttled",
+        type=int,
+        default=config.rate_limit_max_throttled,
+        help="number of the messages over the rate limits (restored by one per second) to close connection after"
+    )
+    parser.add_argument(
+        "--bus",
+        dest="bus",
+        type=str,
+        choices=tuple(bus.BUSES),
+        default=config.bus,
+        help="pub/sub bus delivering room messages and presence across the server processes "
+             "(memory - single process, socket - processes connected to a local hub)"
+    )
+    parser.add_argument(
+        "--bus-socket-path",
+        dest="bus_socket_path",
+        type=str,
+        default=config.bus_socket_path,
+        help="Unix socket path of the local bus hub"
+    )
+    parser.add_argument(
+        "--bus-hub",
+        dest="bus_hub",
+        action="store_true",
+        help="run the local bus hub within this process (the other processes connect to it)"
+    )
+    parser.add_argument(
+        "--workers",
+        dest="workers",
+        type=int,
+        default=config.workers,
+        help="number of worker processes sharing the port; rooms are assigned to the workers by consistent hashing"
+    )
+    parser.add_argument(
+        "--worker-socket-path",
+        dest="worker_socket_path",
+        type=str,
+        default=config.worker_socket_path,
+        help="Unix socket path template (with {worker} index) the workers receive the connections of their rooms on"
     )
 
-    player_websocket_handler = WebSocketHandler(
-        authorizer=PlayerAuthorizer(),
-        event_listeners=(player_event_listener, )
+    parser.add_argument(
+        "--admin-api-key", dest="admin_api_key", type=str, default=None, help="Admin API Key"
     )
 
-    app.add_routes([
-        web.get("/", player_websocket_handler),
-        web.get("/adm", admin_websocket_handler),
-        web.get("/_healthcheck", healthcheck_handler),
-    ])
+    config.load_from_args(parser.parse_args())
+
+    setup_logging()
+
+    if config.workers > 1:
+        return run_workers(target=run_worker, workers=config.workers)
+
+    app = create_app()
 
     loop = asyncio.new_event_loop()
     loop.set_debug(config.debug)
@@ -0,0 +1,264 @@
+__all__ = [
+    "create_app",
+    "init_admin_event_listener",
+    "init_metrics",
+    "init_player_event_listener",
+    "run_worker",
+    "setup_logging",
+]
+
+import asyncio
+import logging
+
+from typing import Optional, Sequence
+
+from aiohttp import web
+
+from fiasco_backend import config
+from fiasco_backend.db import dynamodb, element
+from fiasco_backend.server import bus
+from fiasco_backend.server.event_handlers import (
+    DefaultAdminEventHandler,
+    DefaultPlayerEventHandler,
+
+    PlayerConnectedHandler,
+    PlayerDisconnectedHandler,
+
+    GetStatisticsHandler,
+    UpsertElementHandler,
+    DeleteElementHandler,
+    SetViewportHandler,
+)
+from fiasco_backend.server.event_metrics import observe_event
+from fiasco_backend.server.room_actors import RoomActors, RoomEventListener, room_actors
+from fiasco_backend.server.routes import healthcheck_handler, metrics_handler
+from fiasco_backend.server.workers import RoomAffinityHandler, get_worker_socket_path
+from fiasco_backend.server.websocket import RateLimiter, WebSocketHandler, heartbeat_monitor
+from fiasco_backend.server.websocket.authorizers import (
+    AdminAuthorizer,
+    PlayerAuthorizer,
+)
+from fiasco_backend.server.websocket.connection_storages import (
+    AdminStorage,
+    PlayerStorage,
+)
+from fiasco_backend.server.websocket.message_senders import (
+    AdminMessageSender,
+    PlayerMessageSender,
+)
+from fiasco_backend.server.ws_event_listeners import Middleware, WSEventListener
+from fiasco_backend.utils.metrics import metrics
+
+
+def init_admin_event_listener(
+    admin_message_sender: AdminMessageSender,
+    player_message_sender: PlayerMessageSender,
+    admin_connection_storage: AdminStorage,
+    player_connection_storage: PlayerStorage,
+    middlewares: Sequence[Middleware] = ()
+):
+    return WSEventListener(
+        admin_message_sender=admin_message_sender,
+        player_message_sender=player_message_sender,
+        admin_connection_storage=admin_connection_storage,
+        player_connection_storage=player_connection_storage,
+        middlewares=middlewares,
+        event_handlers={
+            WSEventListener.EVENT_DEFAULT: DefaultAdminEventHandler,
+        },
+    )
+
+
+def init_player_event_listener(
+    admin_message_sender: AdminMessageSender,
+    player_message_sender: PlayerMessageSender,
+    admin_connection_storage: AdminStorage,
+    player_connection_storage: PlayerStorage,
+    middlewares: Sequence[Middleware] = ()
+):
+    return WSEventListener(
+        admin_message_sender=admin_message_sender,
+        player_message_sender=player_message_sender,
+        admin_connection_storage=admin_connection_storage,
+        player_connection_storage=player_connection_storage,
+        middlewares=middlewares,
+        event_handlers={
+            WSEventListener.EVENT_DEFAULT: DefaultPlayerEventHandler,
+
+            WSEventListener.EVENT_USER_CONNECTED: PlayerConnectedHandler,
+            WSEventListener.EVENT_USER_DISCONNECTED: PlayerDisconnectedHandler,
+
+            "get-statistics": GetStatisticsHandler,
+            "upsert-element": UpsertElementHandler,
+            "delete-element": DeleteElementHandler,
+            "set-viewport": SetViewportHandler,
+        },
+    )
+
+
+def init_metrics(
+    admin_connection_storage: AdminStorage,
+    player_connection_storage: PlayerStorage,
+    room_actors: RoomActors,
+    rate_limiter: RateLimiter
+):
+    """Register the gauges (and the counters kept by the components) collected on scrape."""
+
+    metrics.gauge("fiasco_rooms", "Rooms having connections", lambda: player_connection_storage.rooms_count)
+    metrics.gauge("fiasco_players", "Players having connections", lambda: player_connection_storage.players_count)
+    metrics.gauge(
+        "fiasco_connections",
+        "Open connections by kind",
+        lambda: {
+            ("player", ): player_connection_storage.connections_count,
+            ("admin", ): admin_connection_storage.connections_count,
+        },
+        labels=("kind", )
+    )
+
+    metrics.gauge(
+        "fiasco_outbound_queue_depth",
+        "Messages waiting in the player connection outbound queues",
+        lambda: player_connection_storage.get_outbound_stats()["depth"]
+    )
+    metrics.gauge(
+        "fiasco_outbound_queue_bytes",
+        "Bytes waiting in the player connection outbound queues",
+        lambda: player_connection_storage.get_outbound_stats()["bytes"]
+    )
+
+    metrics.gauge(
+        "fiasco_room_actors",
+        "Rooms having events (or delayed messages) to handle",
+        lambda: room_actors.actors_count
+    )
+    metrics.gauge(
+        "fiasco_room_mailbox_depth",
+        "Events (and delayed messages) waiting in the room mailboxes",
+        lambda: room_actors.pending_count
+    )
+
+    metrics.callback_counter(
+        "fiasco_throttled_messages_total",
+        "Messages rejected by the rate limits by limited event",
+        lambda: {(event, ): count for event, count in rate_limiter.throttled_count.items()},
+        labels=("event", )
+    )
+    metrics.callback_counter(
+        "fiasco_throttled_disconnections_total",
+        "Connections closed for exceeding the rate limits",
+        lambda: rate_limiter.disconnected_count
+    )
+
+    metrics.callback_counter(
+        "fiasco_pings_total",
+        "Pings sent to quiet connections",
+        lambda: heartbeat_monitor.pings_count
+    )
+    metrics.callback_counter("fiasco_reaped_total", "Idle connections closed", lambda: heartbeat_monitor.reaped_count)
+
+
+def setup_logging():
+    if config.debug:
+        logging.basicConfig(level=logging.DEBUG)
+    else:
+        logging.basicConfig(level=logging.INFO)
+
+
+def create_app(worker: Optional[int] = None) -> web.Application:
+    """
+    :param worker: index of the worker (in multi-worker mode) the app runs in
+    """
+
+    app = web.Application()
+
+    app.on_startup.append(dynamodb.on_startup)
+    app.on_startup.append(element.on_startup)
+    app.on_startup.append(bus.on_startup)
+    # In order: the pending room events may need the bus and DB, the pending elements need the DB
+    app.on_cleanup.append(room_actors.on_cleanup)
+    app.on_cleanup.append(bus.on_cleanup)
+    app.on_cleanup.append(element.on_cleanup)  # Stores the pending elements, so goes before DB closing
+    app.on_cleanup.append(dynamodb.on_cleanup)
+
+    admin_connection_storage = AdminStorage()
+    player_connection_storage = PlayerStorage()
+
+    admin_message_sender = AdminMessageSender(admin_connection_storage)
+    player_message_sender = PlayerMessageSender(player_connection_storage)
+
+    admin_event_listener = init_admin_event_listener(
+        admin_message_sender=admin_message_sender,
+        player_message_sender=player_message_sender,
+        admin_connection_storage=admin_connection_storage,
+        player_connection_storage=player_connection_storage,
+        middlewares=(observe_event, )
+    )
+
+    player_event_listener = init_player_event_listener(
+        admin_message_sender=admin_message_sender,
+        player_message_sender=player_message_sender,
+        admin_connection_storage=admin_connection_storage,
+        player_connection_storage=player_connection_storage,
+        middlewares=(observe_event, )
+    )
+
+    admin_websocket_handler = WebSocketHandler(
+        authorizer=AdminAuthorizer(admin_api_key=config.admin_api_key),
+        event_listeners=(admin_event_listener, )
+    )
+
+    rate_limiter = RateLimiter()
+
+    player_websocket_handler = WebSocketHandler(
+        authorizer=PlayerAuthorizer(),
+        # Room events are handled in order by the room actors; the socket readers only enqueue them
+        event_listeners=(RoomEventListener(listener=player_event_listener), ),
+        rate_limiter=rate_limiter
+    )
+
+    init_metrics(
+        admin_connection_storage=admin_connection_storage,
+        player_connection_storage=player_connection_storage,
+        room_actors=room_actors,
+        rate_limiter=rate_limiter
+    )
+
+    if worker is not None:
+        player_websocket_handler = RoomAffinityHandler(
+            handler=player_websocket_handler,
+            worker=worker,
+            workers=config.workers
+        )
+        app.on_cleanup.append(player_websocket_handler.on_cleanup)
+
+    app.add_routes([
+        web.get("/", player_websocket_handler),
+        web.get("/adm", admin_websocket_handler),
+        web.get("/_healthcheck", healthcheck_handler),
+        web.get("/metrics", metrics_handler),
+    ])
+
+    return app
+
+
+def run_worker(config_values: dict, worker: int):
+    config.load_from_dict(config_values)
+    config.bus = "socket"  # The hub runs in the master process
+    config.bus_hub = False
+
+    setup_logging()
+
+    app = create_app(worker=worker)
+
+    loop = asyncio.new_event_loop()
+    loop.set_debug(config.debug)
+
+    web.run_app(
+        app,
+        host=config.server_host,
+        port=config.server_port,
+        path=get_worker_socket_path(worker),
+        reuse_port=True,
+        loop=loop
+    )
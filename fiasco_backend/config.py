@@ -5,7 +5,7 @@ __all__ = [
 
 from argparse import Namespace
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 
 
 @dataclass
@@ -20,6 +20,50 @@ class Config:
     aws_secret_access_key: Optional[str] = None
     aws_session_token: Optional[str] = None
 
+    dynamodb_endpoint_url: Optional[str] = None
+    dynamodb_max_pool_connections: Optional[int] = 10
+    dynamodb_keepalive_timeout: Optional[float] = 60
+
+    elements_room_index: Optional[str] = None
+
+    element_flush_interval: Optional[float] = 1.6
+    element_flush_threshold: Optional[int] = 500
+    element_flush_max_pending: Optional[int] = 10000
+
+    room_cache_ttl: Optional[float] = 300
+    room_cache_max_bytes: Optional[int] = 256 * 1024 * 1024
+    room_cache_max_tombstones: Optional[int] = 1024
+
+    json_encoder: Optional[str] = "simplejson"
+
+    ws_compress_level: Optional[int] = 1
+    ws_compress_window_bits: Optional[int] = 15
+    ws_compress_threshold: Optional[int] = 1024
+
+    outbound_queue_max_length: Optional[int] = 1000
+    outbound_queue_max_bytes: Optional[int] = 4 * 1024 * 1024
+    outbound_queue_overflow_policy: Optional[str] = "drop-oldest"
+
+    room_batch_tick: Optional[float] = 0
+    room_mailbox_size: Optional[int] = 1000
+
+    upsert_conflation_rate: Optional[float] = 20
+    viewport_cell_size: Optional[int] = 512
+
+    room_event_log_size: Optional[int] = 256
+    presence_grace_period: Optional[float] = 5
+    heartbeat_interval: Optional[float] = 30
+    idle_timeout: Optional[float] = 75
+    max_message_size: Optional[int] = 64 * 1024
+    rate_limits: Optional[Tuple[str, ...]] = ("connection:*=100/200", "room:*=2000/4000")
+    rate_limit_max_throttled: Optional[int] = 10
+    bus: Optional[str] = "memory"
+    bus_socket_path: Optional[str] = "/tmp/fiasco-bus.sock"
+    bus_hub: Optional[bool] = False
+
+    workers: Optional[int] = 1
+    worker_socket_path: Optional[str] = "/tmp/fiasco-worker-{worker}.sock"
+
     admin_api_key: Optional[str] = None
 
     def load_from_args(self, namespace: Namespace):
@@ -33,9 +77,60 @@ class Config:
         self.aws_secret_access_key = namespace.aws_secret_access_key
         self.aws_session_token = namespace.aws_session_token
 
+        self.dynamodb_endpoint_url = namespace.dynamodb_endpoint_url
+        self.dynamodb_max_pool_connections = namespace.dynamodb_max_pool_connections
+        self.dynamodb_keepalive_timeout = namespace.dynamodb_keepalive_timeout
+
+        self.elements_room_index = namespace.elements_room_index
+
+        self.element_flush_interval = namespace.element_flush_interval
+        self.element_flush_threshold = namespace.element_flush_threshold
+        self.element_flush_max_pending = namespace.element_flush_max_pending
+
+        self.room_cache_ttl = namespace.room_cache_ttl
+        self.room_cache_max_bytes = namespace.room_cache_max_bytes
+        self.room_cache_max_tombstones = namespace.room_cache_max_tombstones
+
+        self.json_encoder = namespace.json_encoder
+
+        self.ws_compress_level = namespace.ws_compress_level
+        self.ws_compress_window_bits = namespace.ws_compress_window_bits
+        self.ws_compress_threshold = namespace.ws_compress_threshold
+
+        self.outbound_queue_max_length = namespace.outbound_queue_max_length
+        self.outbound_queue_max_bytes = namespace.outbound_queue_max_bytes
+        self.outbound_queue_overflow_policy = namespace.outbound_queue_overflow_policy
+
+        self.room_batch_tick = namespace.room_batch_tick
+        self.room_mailbox_size = namespace.room_mailbox_size
+
+        self.upsert_conflation_rate = namespace.upsert_conflation_rate
+        self.viewport_cell_size = namespace.viewport_cell_size
+
+        self.room_event_log_size = namespace.room_event_log_size
+        self.presence_grace_period = namespace.presence_grace_period
+        self.heartbeat_interval = namespace.heartbeat_interval
+        self.idle_timeout = namespace.idle_timeout
+        self.max_message_size = namespace.max_message_size
+        if namespace.rate_limits is not None:  # Replace the default ones
+            self.rate_limits = tuple(namespace.rate_limits)
+        self.rate_limit_max_throttled = namespace.rate_limit_max_throttled
+        self.bus = namespace.bus
+        self.bus_socket_path = namespace.bus_socket_path
+        self.bus_hub = namespace.bus_hub
+
+        self.workers = namespace.workers
+        self.worker_socket_path = namespace.worker_socket_path
+
         self.admin_api_key = namespace.admin_api_key
 
         return self
 
+    def load_from_dict(self, values: Dict[str, Any]):
+        for key, value in values.items():
+            setattr(self, key, value)
+
+        return self
+
 
 config = Config()
@@ -0,0 +1,108 @@
+"""
+Shared DynamoDB resource.
+
+The resource (and so its HTTP connection pool) is opened once per process on the application startup
+and is reused by all the database calls till the application cleanup.
+"""
+
+__all__ = [
+    "DynamoDB",
+    "dynamodb",
+    "on_startup",
+    "on_cleanup",
+]
+
+import asyncio
+import logging
+
+from contextlib import AsyncExitStack
+from typing import Any, Dict, Optional
+
+import aioboto3
+
+from aiobotocore.config import AioConfig
+
+from fiasco_backend import config
+
+
+class DynamoDB:
+
+    def __init__(self):
+        self._exit_stack: Optional[AsyncExitStack] = None
+        self._resource = None
+        self._tables: Dict[str, Any] = {}
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._resource is not None
+
+    async def open(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if self.is_open:
+                return
+
+            logging.info(
+                "Opening DynamoDB resource (max_pool_connections=%s, keepalive_timeout=%s)",
+                config.dynamodb_max_pool_connections,
+                config.dynamodb_keepalive_timeout
+            )
+
+            session = aioboto3.Session()
+            exit_stack = AsyncExitStack()
+            self._resource = await exit_stack.enter_async_context(session.resource(
+                "dynamodb",
+                region_name=config.aws_region,
+                endpoint_url=config.dynamodb_endpoint_url,
+                aws_access_key_id=config.aws_access_key_id,
+                aws_secret_access_key=config.aws_secret_access_key,
+                aws_session_token=config.aws_session_token,
+                config=AioConfig(
+                    max_pool_connections=config.dynamodb_max_pool_connections,
+                    connector_args={
+                        "keepalive_timeout": config.dynamodb_keepalive_timeout,
+                    }
+                )
+            ))
+            self._exit_stack = exit_stack
+
+    async def close(self):
+        if not self.is_open:
+            return
+
+        exit_stack = self._exit_stack
+
+        self._exit_stack = None
+        self._resource = None
+        self._tables = {}
+
+        await exit_stack.aclose()
+
+        logging.info("DynamoDB resource closed")
+
+    async def resource(self):
+        if not self.is_open:  # E.g. called outside of the web app
+            await self.open()
+
+        return self._resource
+
+    async def table(self, name: str):
+        if name not in self._tables:
+            resource = await self.resource()
+            self._tables[name] = await resource.Table(name)
+
+        return self._tables[name]
+
+
+dynamodb = DynamoDB()
+
+
+async def on_startup(app):
+    await dynamodb.open()
+
+
+async def on_cleanup(app):
+    await dynamodb.close()
@@ -7,85 +7,431 @@ Database managing functionality.
 import asyncio
 import json
 import logging
+import sys
 import time
 
+from contextlib import contextmanager
 from decimal import Decimal
-from random import randint
 
-from typing import Dict, Any, Tuple, Optional
+from typing import Dict, Any, Tuple, Optional, List, Set
 
-import aioboto3
 import simplejson
 
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
 from marshmallow import Schema, fields, INCLUDE
 
 from fiasco_backend import config
+from fiasco_backend.utils.memory import deep_sizeof
+from fiasco_backend.utils.metrics import metrics
+
+from .dynamodb import dynamodb
 
 
 ELEMENTS_TABLE_NAME = "fiasco-elements"
+ELEMENT_KEY_FIELDS = ("element_id", "room")
+
+DYNAMODB_LATENCY = metrics.histogram(
+    "fiasco_dynamodb_request_seconds",
+    "DynamoDB request latency by operation",
+    labels=("operation", ),
+)
+DYNAMODB_ERRORS = metrics.counter(
+    "fiasco_dynamodb_request_errors_total",
+    "DynamoDB request errors by operation and error code",
+    labels=("operation", "error"),
+    max_series=100,
+)
+
+
+@contextmanager
+def observe_dynamodb(operation: str):
+    """Time the DynamoDB request and count its error, if any (re-raised)."""
+
+    started_at = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        error = e.response.get("Error", {}).get("Code", "") if isinstance(e, ClientError) else ""
+        DYNAMODB_ERRORS.inc((operation, error or e.__class__.__name__))
+        raise
+    finally:
+        DYNAMODB_LATENCY.observe(time.perf_counter() - started_at, (operation, ))
 
 
 class ElementUpdateQueue:
-    PROCESSING_KEY = "__processing__"
+    """
+    Dirty set of the pending (not yet stored) element changes, indexed by element and by room.
+
+    The pending data dicts are kept as they are, with no per-element wrapper: a deleted element is kept as None
+    (its room in <_deleted>) and only the in-flight and the failed elements have entries of their own.
+
+    Data handed back is never mutated: each change replaces the pending data with a new merged dict,
+    so the dict taken is the version of the element stored (the element is unchanged while it's still pending).
+    Data put into the queue is owned by the queue, so it must not be changed by the caller either.
+    """
 
     def __init__(self):
-        self._element_queue: Dict[str, Tuple[Optional[Dict[str, Any]], Optional[float]]] = {}
+        self._elements: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._rooms: Dict[str, Set[str]] = {}
+        self._deleted: Dict[str, str] = {}  # Room by deleted element ID
+        self._in_flight: Dict[str, Dict[str, Any]] = {}  # Data taken by element ID
+        self._failures: Dict[str, Tuple[int, float]] = {}  # Failed attempts and monotonic time to retry after
 
     def put(self, element_data: Dict[str, Any]):
         logging.debug("Data into update queue #%s", element_data)
 
         element_id = element_data["element_id"]
-        element_data[self.PROCESSING_KEY] = False
-        if self.exists(element_id):
-            if self.get(element_id)[0] is None:  # Skip, if deleted
-                logging.debug("Skipping element update #%s", element_id)
-                return
-
-            stored_element_data, _ = self.get(element_id=element_id)
-            element_data = {
-                **stored_element_data,
+
+        if element_id not in self._elements:
+            self._add(element_id, element_data["room"], element_data)
+            return
+
+        pending = self._elements[element_id]
+        if pending is None:
+            logging.debug("Skipping update of deleted element #%s", element_id)
+        else:
+            self._elements[element_id] = {
+                **pending,
                 **element_data,
             }
 
-        self._element_queue[element_id] = (element_data, time.time())
+    def delete(self, element_id: str, room: str):
+        """Mark the element deleted, so it's not updated by pending data anymore."""
 
-        logging.debug("Element in queue %s, %s", *self._element_queue[element_id])
+        if element_id not in self._elements:
+            self._add(element_id, room, None)
+        else:
+            self._elements[element_id] = None
 
-    def get(self, element_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[float]]:
-        element, timestamp = self._element_queue[element_id]
+        self._deleted[element_id] = room
 
-        processing = element.pop(self.PROCESSING_KEY)
+    def get(self, element_id: str) -> Optional[Dict[str, Any]]:
+        """Get pending element data (None if deleted)."""
 
-        logging.debug("Element selected from update queue %s", element)
+        return self._elements[element_id]
 
-        try:
-            return element, timestamp
-        finally:
-            element[self.PROCESSING_KEY] = processing
+    def get_room(self, room: str) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Get pending room elements data (None if deleted) by element ID."""
+
+        return {
+            element_id: self._elements[element_id]
+            for element_id in self._rooms.get(room, ())
+        }
 
     def exists(self, element_id: str) -> bool:
-        return element_id in self._element_queue
+        return element_id in self._elements
+
+    def get_attempts(self, element_id: str) -> int:
+        """Get the number of the failed attempts to store the element."""
+
+        return self._failures.get(element_id, (0, 0.0))[0]
+
+    def take_dirty(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Mark the dirty elements in-flight and return their data.
+
+        Tombstones not being in-flight are dropped, as there is nothing to store for them.
+
+        :param now: monotonic time to skip the failed elements waiting to be retried after it (None to take all)
+        """
+
+        dirty = []
+        for element_id, pending in list(self._elements.items()):
+            if pending is None:
+                if element_id not in self._in_flight:
+                    self._remove(element_id)
+                continue
+
+            if self._in_flight.get(element_id) is pending:  # Not changed since taken
+                continue
+            if now is not None and self._failures.get(element_id, (0, 0.0))[1] > now:
+                continue
+
+            self._in_flight[element_id] = pending
+            dirty.append(pending)
+
+        return dirty
+
+    def complete(self, element_id: str, element_data: Dict[str, Any]):
+        """Drop the stored in-flight element, unless it has been changed since it was taken."""
+
+        self._in_flight.pop(element_id, None)
+
+        if element_id not in self._elements:
+            return
+
+        if self._elements[element_id] is element_data:
+            self._remove(element_id)
+        else:
+            self._failures.pop(element_id, None)
 
-    def is_processing(self, element_id: str):
-        element, _ = self._element_queue[element_id]
-        if element is None:
-            return True
+    def fail(self, element_id: str, element_data: Dict[str, Any], retry_at: float, max_attempts: int) -> bool:
+        """
+        Mark the in-flight element dirty again, to be retried after <retry_at> (monotonic time).
+
+        The element failed <max_attempts> times is dropped, unless it has been changed since it was taken.
+        Return False if dropped.
+        """
+
+        self._in_flight.pop(element_id, None)
+
+        if element_id not in self._elements:
+            return False
+
+        attempts = self.get_attempts(element_id) + 1
+        if self._elements[element_id] is element_data and attempts >= max_attempts:
+            self._remove(element_id)
+            return False
+
+        self._failures[element_id] = (attempts, retry_at)
+
+        return True  # Dirty again (with the changes since taken, if any) or deleted since taken
+
+    def memory_usage(self) -> int:
+        """Approximate memory (in bytes) used by the pending elements."""
+
+        return (
+            sys.getsizeof(self._elements)
+            + sys.getsizeof(self._rooms)
+            + sum(sys.getsizeof(element_ids) for element_ids in self._rooms.values())
+            + sys.getsizeof(self._deleted)
+            + sys.getsizeof(self._in_flight)
+            + sys.getsizeof(self._failures)
+            + sum(deep_sizeof(pending) for pending in self._elements.values() if pending is not None)
+        )
+
+    def __len__(self):
+        return len(self._elements)
+
+    def _add(self, element_id: str, room: str, element_data: Optional[Dict[str, Any]]):
+        self._elements[element_id] = element_data
+
+        if room not in self._rooms:
+            self._rooms[room] = set()
+        self._rooms[room].add(element_id)
+
+    def _remove(self, element_id: str):
+        pending = self._elements.pop(element_id)
+        room = self._deleted.pop(element_id) if pending is None else pending["room"]
+        self._failures.pop(element_id, None)
+
+        element_ids = self._rooms[room]
+        element_ids.discard(element_id)
+        if not element_ids:
+            del self._rooms[room]
+
+
+class ElementFlusher:
+    """
+    Write-behind flusher of the element update queue.
+
+    Single background task per process, that wakes up each <element_flush_interval> seconds
+    (or once the queue reaches <element_flush_threshold> elements) and stores all the pending elements
+    with concurrent attribute-level updates.
+
+    A failed update is retried with the following flushes, backing off exponentially,
+    and dropped after <MAX_ATTEMPTS> attempts.
+    """
+
+    MAX_CONCURRENT_UPDATES = 25
+    MAX_ATTEMPTS = 5
+    RETRY_DELAY = 1.0
+
+    def __init__(self, queue: ElementUpdateQueue):
+        self.queue = queue
+
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flushed: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._full = False
+
+        self.flushes_count = 0
+        self.flushed_elements_count = 0
+        self.failed_elements_count = 0
+        self.retried_elements_count = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+
+    @property
+    def depth(self) -> int:
+        return len(self.queue)
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "flushes_count": self.flushes_count,
+            "flushed_elements_count": self.flushed_elements_count,
+            "failed_elements_count": self.failed_elements_count,
+            "retried_elements_count": self.retried_elements_count,
+            "last_flush_latency": self.last_flush_latency,
+            "max_flush_latency": self.max_flush_latency,
+        }
+
+    async def start(self):
+        if self.is_running:
+            return
+
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._flushed = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
 
-        return element.get(self.PROCESSING_KEY, False)
+    async def stop(self):
+        """Stop the flusher, storing all the pending elements."""
 
-    def process(self, element_id: str):
-        element, _ = self._element_queue[element_id]
-        if element is None:
+        if not self.is_running:
             return
 
-        element[self.PROCESSING_KEY] = True
-        self.put(element)
+        self._stopping = True
+        self._wakeup.set()
+
+        await self._task
+        self._task = None
+
+    async def put(self, element_data: Dict[str, Any]):
+        """Queue the element update, waiting for a flush while the queue is full (so the caller is held back)."""
+
+        if not self.is_running:  # E.g. called outside of the web app
+            await self.start()
+
+        while self.depth >= config.element_flush_max_pending and not self.queue.exists(element_data["element_id"]):
+            if not self._full:  # Once per filling up, not per waiting update
+                self._full = True
+                logging.warning("Element update queue is full (%s elements); updates wait for flush", self.depth)
+
+            self._flushed.clear()
+            self._wakeup.set()
+            await self._flushed.wait()
+
+        self.queue.put(element_data=element_data)
+
+        if self.depth >= config.element_flush_threshold:
+            self._wakeup.set()
+
+    async def _run(self):
+        logging.info("Element flusher started")
+
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=config.element_flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.exception("Error on elements flush", exc_info=e)
 
-    def drop(self, element_id: str):
-        del self._element_queue[element_id]
+        while self.depth:  # Drain; the failed elements are retried right away, till their attempts are over
+            try:
+                await self.flush(retry_now=True)
+            except Exception as e:
+                logging.exception("Error on elements drain; %s elements are not stored", self.depth, exc_info=e)
+                break
+
+        logging.info("Element flusher stopped")
+
+    async def flush(self, retry_now: bool = False):
+        """
+        :param retry_now: whether to retry the failed elements without waiting for their backoff
+        """
+
+        pending = self.queue.take_dirty(now=None if retry_now else time.monotonic())
+        if not pending:
+            if self.depth < config.element_flush_max_pending:  # Otherwise it's full of the ones to be retried
+                self._set_flushed()
+            return
+
+        started_at = time.monotonic()
+
+        logging.info("Updating %s elements", len(pending))
+
+        stored = failed = retried = 0
+        for i in range(0, len(pending), self.MAX_CONCURRENT_UPDATES):
+            chunk = pending[i:i + self.MAX_CONCURRENT_UPDATES]
+            results = await asyncio.gather(*(
+                update_element(element_data) for element_data in chunk
+            ))
+
+            for element_data, result in zip(chunk, results):
+                element_id = element_data["element_id"]
+                if result:
+                    self.queue.complete(element_id=element_id, element_data=element_data)
+                    stored += 1
+                    continue
+
+                attempts = self.queue.get_attempts(element_id) + 1
+                if self.queue.fail(
+                    element_id=element_id,
+                    element_data=element_data,
+                    retry_at=time.monotonic() + self.RETRY_DELAY * 2 ** (attempts - 1),
+                    max_attempts=self.MAX_ATTEMPTS
+                ):
+                    retried += 1
+                else:
+                    logging.error("Element #%s is not stored after %s attempts", element_id, attempts)
+                    failed += 1
+
+        latency = time.monotonic() - started_at
+
+        self.flushes_count += 1
+        self.flushed_elements_count += stored
+        self.failed_elements_count += failed
+        self.retried_elements_count += retried
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+
+        self._set_flushed()
+
+    def _set_flushed(self):
+        """Wake up the updates waiting for a flush."""
+
+        if self._full and self.depth < config.element_flush_max_pending:
+            self._full = False
+            logging.info("Element update queue is not full anymore (%s elements)", self.depth)
+
+        self._flushed.set()
 
 
 element_update_queue = ElementUpdateQueue()
+element_flusher = ElementFlusher(element_update_queue)
+
+metrics.gauge(
+    "fiasco_element_update_queue_depth",
+    "Pending (not yet stored) element changes",
+    lambda: element_flusher.depth,
+)
+metrics.callback_counter(
+    "fiasco_element_flushed_total",
+    "Element changes stored by the flusher",
+    lambda: element_flusher.flushed_elements_count,
+)
+metrics.callback_counter(
+    "fiasco_element_flush_failed_total",
+    "Element changes dropped by the flusher after failing all the attempts",
+    lambda: element_flusher.failed_elements_count,
+)
+metrics.callback_counter(
+    "fiasco_element_flush_retried_total",
+    "Element changes failed to be stored and put back to be retried",
+    lambda: element_flusher.retried_elements_count,
+)
+
+
+async def on_startup(app):
+    await element_flusher.start()
+
+
+async def on_cleanup(app):
+    await element_flusher.stop()
 
 
 class ElementSchema(Schema):
@@ -100,145 +446,173 @@ class ElementSchema(Schema):
         unknown = INCLUDE
 
 
+ELEMENT_SCHEMA = ElementSchema()
+
+
+def load_element(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate the (freshly built) element data, same as <ElementSchema> does.
+
+    Well-formed data skips the schema and is returned as is.
+    """
+
+    if (
+        type(data) is dict
+        and type(data.get("element_id")) is str
+        and type(data.get("room")) is str
+        and type(data.get("player", "")) is str
+        and type(data.get("type", "")) is str
+        and type(data.get("styles", {})) is dict
+        and type(data.get("coordinates", [])) is list
+        and all(type(coordinate) is int for coordinate in data.get("coordinates", ()))
+    ):
+        return data
+
+    return ELEMENT_SCHEMA.load(data)  # Raises the validation error
+
+
 async def get_element(element_id: str, room: str):
-    session = aioboto3.Session()
-    async with session.resource(
-        "dynamodb",
-        region_name=config.aws_region,
-        aws_access_key_id=config.aws_access_key_id,
-        aws_secret_access_key=config.aws_secret_access_key,
-        aws_session_token=config.aws_session_token
-    ) as dynamo_resource:
-        table = await dynamo_resource.Table(ELEMENTS_TABLE_NAME)
+    table = await dynamodb.table(ELEMENTS_TABLE_NAME)
 
-        try:
+    try:
+        with observe_dynamodb("get_item"):
             return (await table.get_item(Key={
                 "element_id": element_id,
                 "room": room,
             })).get("Item", None)
-        except Exception as e:
-            logging.exception("Error on get_item", exc_info=e)
+    except Exception as e:
+        logging.exception("Error on get_item", exc_info=e)
 
 
-async def update_element_task(element_id: str, save_delay_time: float = 1.6):
-    logging.debug("Update Element task started")
-    await asyncio.sleep(save_delay_time * (1 + randint(2, 40) / 10))  # Sleep 2-40% longer...
+def build_update_params(element_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Build UpdateItem parameters setting the changed (non-key) element fields.
 
-    if not element_update_queue.exists(element_id=element_id):
-        logging.debug("Element #%s not found in queue", element_id)
-        return
+    The update is conditional on the element existence, so a deleted element is not recreated.
+    """
 
-    if element_update_queue.is_processing(element_id=element_id):
-        logging.debug("Element #%s is already being processed", element_id)
-        return
+    names = {
+        "#element_id": "element_id",
+    }
+    values = {}
+    assignments = []
+    for i, (field, value) in enumerate(element_data.items()):
+        if field in ELEMENT_KEY_FIELDS:
+            continue
+
+        names[f"#f{i}"] = field
+        values[f":f{i}"] = value
+        assignments.append(f"#f{i} = :f{i}")
+
+    if not assignments:
+        return None
+
+    return {
+        "Key": {field: element_data[field] for field in ELEMENT_KEY_FIELDS},
+        "UpdateExpression": "SET " + ", ".join(assignments),
+        "ConditionExpression": "attribute_exists(#element_id)",
+        "ExpressionAttributeNames": names,
+        "ExpressionAttributeValues": values,
+    }
 
-    element_data, timestamp = element_update_queue.get(element_id)
-    previous_updated_diff = time.time() - timestamp
 
-    if timestamp is None or previous_updated_diff < save_delay_time:
-        logging.debug("Skipping element update; previous_updated_diff=%s < %s", previous_updated_diff, save_delay_time)
-        return
+async def update_element(element_data: Dict[str, Any]) -> bool:
+    """
+    Store the changed element fields; return False on failure.
 
-    element_update_queue.process(element_id=element_id)
+    An update of a missing element succeeds (is skipped) only if the element is known to be deleted.
+    """
 
-    elem = await get_element(
-        element_id=element_data["element_id"],
-        room=element_data["room"]
-    )
+    params = build_update_params(element_data)
+    if params is None:
+        return True
 
-    elem = {
-        **(elem or {}),
-        **element_data,
-    }
-    if "player" not in elem:
-        logging.error("Field 'player' not found in %s", elem)
-        element_update_queue.drop(element_id=element_id)
-        return
-
-    logging.info("Updating element data %s", element_data)
-
-    session = aioboto3.Session()
-    async with session.resource(
-        "dynamodb",
-        region_name=config.aws_region,
-        aws_access_key_id=config.aws_access_key_id,
-        aws_secret_access_key=config.aws_secret_access_key,
-        aws_session_token=config.aws_session_token
-    ) as dynamo_resource:
-        table = await dynamo_resource.Table(ELEMENTS_TABLE_NAME)
+    table = await dynamodb.table(ELEMENTS_TABLE_NAME)
 
-        try:
-            await table.put_item(Item=elem)
-        except Exception as e:
+    try:
+        with observe_dynamodb("update_item"):
+            await table.update_item(**params)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
             logging.exception("Error on element update", exc_info=e)
-        finally:
-            element_update_queue.drop(element_id=element_id)
+            return False
+
+        from .room_cache import room_cache  # Depends on this module
+
+        # Otherwise the element may be not created yet (its creation is stored concurrently), so it's retried
+        if not room_cache.is_deleted(room=element_data["room"], element_id=element_data["element_id"]):
+            logging.warning("Element #%s to update is not stored (yet)", element_data["element_id"])
+            return False
+
+        logging.debug("Skipping update of deleted element #%s", element_data["element_id"])
+    except Exception as e:
+        logging.exception("Error on element update", exc_info=e)
+        return False
 
-    # TODO: Send message after updated!
+    return True
 
 
 async def upsert_element(element: Dict[str, Any], create: bool = False):
     data = json.loads(simplejson.dumps(element), parse_float=Decimal)
 
     if create:
-        session = aioboto3.Session()
-        async with session.resource(
-            "dynamodb",
-            region_name=config.aws_region,
-            aws_access_key_id=config.aws_access_key_id,
-            aws_secret_access_key=config.aws_secret_access_key,
-            aws_session_token=config.aws_session_token
-        ) as dynamo_resource:
-            table = await dynamo_resource.Table(ELEMENTS_TABLE_NAME)
+        table = await dynamodb.table(ELEMENTS_TABLE_NAME)
 
-            try:
+        try:
+            with observe_dynamodb("put_item"):
                 await table.put_item(Item=data)
-            except Exception as e:
-                logging.exception("Error on element creation", exc_info=e)
+        except Exception as e:
+            logging.exception("Error on element creation", exc_info=e)
     else:
-        element_update_queue.put(element_data=data)
-        await update_element_task(element_id=data["element_id"])
+        await element_flusher.put(element_data=data)
 
     return element
 
 
 async def delete_element(element_id: str, room: str):
-    session = aioboto3.Session()
-    async with session.resource(
-        "dynamodb",
-        region_name=config.aws_region,
-        aws_access_key_id=config.aws_access_key_id,
-        aws_secret_access_key=config.aws_secret_access_key,
-        aws_session_token=config.aws_session_token
-    ) as dynamo_resource:
-        if element_update_queue.exists(element_id=element_id):
-            element_update_queue.drop(element_id=element_id)
-
-        table = await dynamo_resource.Table(ELEMENTS_TABLE_NAME)
+    element_update_queue.delete(element_id=element_id, room=room)
 
-        try:
+    table = await dynamodb.table(ELEMENTS_TABLE_NAME)
+
+    try:
+        with observe_dynamodb("delete_item"):
             return await table.delete_item(Key={
                 "element_id": element_id,
                 "room": room,
             })
-        except Exception as e:
-            logging.exception("Error on delete_element", exc_info=e)
+    except Exception as e:
+        logging.exception("Error on delete_element", exc_info=e)
 
 
 async def get_room_elements(room: str):
-    session = aioboto3.Session()
-    async with session.resource(
-        "dynamodb",
-        region_name=config.aws_region,
-        aws_access_key_id=config.aws_access_key_id,
-        aws_secret_access_key=config.aws_secret_access_key,
-        aws_session_token=config.aws_session_token
-    ) as dynamo_resource:
-        table = await dynamo_resource.Table(ELEMENTS_TABLE_NAME)
-
-        return (await table.scan(
-            FilterExpression="room = :room",
-            ExpressionAttributeValues={
-                ":room": room,
-            }
-        ))["Items"]
+    """
+    Get all the room elements page by page.
+
+    Queried by the <elements_room_index> GSI (with the <room> partition key) if configured,
+    otherwise the table is scanned for them.
+    """
+
+    table = await dynamodb.table(ELEMENTS_TABLE_NAME)
+
+    if config.elements_room_index:
+        operation, request = "query", table.query
+        params = {
+            "IndexName": config.elements_room_index,
+            "KeyConditionExpression": Key("room").eq(room),
+        }
+    else:
+        operation, request = "scan", table.scan
+        params = {
+            "FilterExpression": Attr("room").eq(room),
+        }
+
+    items = []
+    while True:
+        with observe_dynamodb(operation):
+            response = await request(**params)
+        items.extend(response["Items"])
+
+        if "LastEvaluatedKey" not in response:
+            return items
+
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
@@ -0,0 +1,340 @@
+"""
+In-memory room state cache.
+
+Holds the live elements state of the rooms, so DynamoDB is read on the first join to a cold room only.
+The element handlers update the cache write-through, while the rooms without connections are evicted
+after a TTL or, the least recently released first, once the cache exceeds its memory ceiling.
+
+Each change of a cached room gets a version (increasing, based on the time the room was loaded),
+so a joining client holding an older version of the room receives the changes made since then only.
+The element positions are indexed with a uniform grid, so the elements within a viewport are found by its cells.
+"""
+
+__all__ = [
+    "RoomCache",
+    "room_cache",
+]
+
+import asyncio
+import logging
+import sys
+import time
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fiasco_backend import config
+from fiasco_backend.utils.grid import Box, GridIndex, get_coordinates_box
+from fiasco_backend.utils.memory import deep_sizeof
+
+from .element import element_update_queue, get_room_elements
+
+
+class RoomState:
+
+    def __init__(self):
+        self.elements: Dict[str, Dict[str, Any]] = {}
+        self.sizes: Dict[str, int] = {}
+        self.size = 0
+
+        # Versions from the previous cache lifetime of the room can't be compared with the current ones
+        self.version = int(time.time() * 1000000)
+        self.min_version = self.version  # The oldest version the changes are known since
+        self.versions: Dict[str, int] = {}
+        self.tombstones: "OrderedDict[str, int]" = OrderedDict()  # Deleted element ID -> version; the oldest first
+
+        self.grid: GridIndex[str] = GridIndex(cell_size=config.viewport_cell_size)  # Element ID -> coordinates box
+
+        self.loaded: Optional[asyncio.Future] = None
+        self.deleted_while_loading: Set[str] = set()
+
+    def put(self, element_id: str, element: Dict[str, Any]) -> int:
+        """Store the element and return the room size change (in bytes)."""
+
+        return self._store(element_id, element, deep_sizeof(element))
+
+    def update(self, element_id: str, changes: Dict[str, Any]) -> int:
+        """Merge the changes into the element (if any) and return the room size change (in bytes).
+
+        The size of the merged element is got from the changed fields only, not the whole element.
+        """
+
+        element = self.elements.get(element_id)
+        if element is None:
+            return self.put(element_id, dict(changes))
+
+        merged = {
+            **element,
+            **changes,
+        }
+
+        size = self.sizes[element_id] + sys.getsizeof(merged) - sys.getsizeof(element)
+        for key, value in changes.items():
+            if key in element:
+                size -= deep_sizeof(element[key])
+            else:
+                size += deep_sizeof(key)
+            size += deep_sizeof(value)
+
+        return self._store(element_id, merged, size)
+
+    def _store(self, element_id: str, element: Dict[str, Any], size: int) -> int:
+        diff = size - self.sizes.get(element_id, 0)
+
+        self.elements[element_id] = element
+        self.sizes[element_id] = size
+        self.size += diff
+
+        self.version += 1
+        self.versions[element_id] = self.version
+        self.tombstones.pop(element_id, None)
+
+        self.grid.add(element_id, get_coordinates_box(element.get("coordinates")))
+
+        return diff
+
+    def pop(self, element_id: str) -> int:
+        """Remove the element and return the room size change (in bytes)."""
+
+        if element_id not in self.elements:
+            return 0
+
+        del self.elements[element_id]
+        diff = -self.sizes.pop(element_id, 0)
+        self.size += diff
+
+        self.version += 1
+        del self.versions[element_id]
+        self.tombstones[element_id] = self.version
+
+        self.grid.remove(element_id)
+
+        while len(self.tombstones) > config.room_cache_max_tombstones:
+            _, version = self.tombstones.popitem(last=False)
+            self.min_version = version
+
+        return diff
+
+    def changes_since(self, version: int) -> Optional[Tuple[Dict[str, Dict[str, Any]], List[str]]]:
+        """Get the elements changed and the IDs of the elements deleted since the <version>.
+
+        None if the changes since the version are not known (e.g. it's from before the room has been loaded).
+        """
+
+        if not self.min_version <= version <= self.version:
+            return None
+
+        changed = {
+            element_id: self.elements[element_id]
+            for element_id, element_version in self.versions.items()
+            if element_version > version
+        }
+        deleted = [
+            element_id
+            for element_id, element_version in self.tombstones.items()
+            if element_version > version
+        ]
+
+        return changed, deleted
+
+
+class RoomCache:
+
+    def __init__(self):
+        self._rooms: Dict[str, RoomState] = {}
+        self._active: Set[str] = set()
+        self._idle: "OrderedDict[str, float]" = OrderedDict()  # Room -> released at; the oldest first
+
+        self._size = 0
+        self._over_limit = False
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def rooms_count(self) -> int:
+        return len(self._rooms)
+
+    def is_cached(self, room: str) -> bool:
+        return room in self._rooms
+
+    def acquire(self, room: str):
+        """Mark the room as active (has connections), so it's never evicted."""
+
+        self._active.add(room)
+        self._idle.pop(room, None)
+
+        self.evict()
+
+    def release(self, room: str):
+        """Mark the room as inactive (no connections), so it may be evicted."""
+
+        self._active.discard(room)
+        if room in self._rooms:
+            self._idle[room] = time.time()
+
+        self.evict()
+
+    async def get_elements(self, room: str) -> Dict[str, Dict[str, Any]]:
+        state = await self._get_state(room)
+
+        return state.elements
+
+    async def get_viewport_elements(self, room: str, viewport: Box) -> Dict[str, Dict[str, Any]]:
+        """Get the elements within the viewport (or having no coordinates)."""
+
+        state = await self._get_state(room)
+
+        return {element_id: state.elements[element_id] for element_id in state.grid.query((viewport, ))}
+
+    def peek_element(self, room: str, element_id: str) -> Optional[Dict[str, Any]]:
+        """Get the cached element (None if the room is not loaded), never loading the room."""
+
+        state = self._rooms.get(room)
+        if state is None or not state.loaded.done():
+            return None
+
+        return state.elements.get(element_id)
+
+    def is_deleted(self, room: str, element_id: str) -> bool:
+        """Whether the element is known to be deleted (False if the room is not cached or its tombstone is dropped)."""
+
+        state = self._rooms.get(room)
+        if state is None:
+            return False
+
+        return element_id in state.tombstones or element_id in state.deleted_while_loading
+
+    async def get_version(self, room: str) -> int:
+        state = await self._get_state(room)
+
+        return state.version
+
+    async def get_changes(
+        self,
+        room: str,
+        version: int
+    ) -> Optional[Tuple[Dict[str, Dict[str, Any]], List[str]]]:
+        """Get the elements changed and the IDs of the elements deleted since the room <version>.
+
+        None if the changes are not known, so the client should get all the elements.
+        """
+
+        state = await self._get_state(room)
+
+        return state.changes_since(version)
+
+    async def _get_state(self, room: str) -> RoomState:
+        state = self._rooms.get(room)
+        if state is None:
+            state = self._rooms[room] = RoomState()
+            state.loaded = asyncio.get_event_loop().create_future()
+
+            try:
+                await self._load(room=room, state=state)
+            except asyncio.CancelledError:
+                self._drop(room, state=state)
+                state.loaded.cancel()
+                raise
+            except Exception as e:
+                self._drop(room, state=state)
+                state.loaded.set_exception(e)
+                state.loaded.exception()  # Mark retrieved; the joins awaiting it get the exception anyway
+                raise
+
+            state.loaded.set_result(True)
+            self.evict()
+        else:
+            await asyncio.shield(state.loaded)
+
+        return state
+
+    def upsert(self, element: Dict[str, Any]):
+        state = self._rooms.get(element["room"])
+        if state is None:  # Cold room; is going to be loaded from DB on join
+            return
+
+        element_id = element["element_id"]
+        state.deleted_while_loading.discard(element_id)
+
+        self._size += state.update(element_id, element)
+
+        if element["room"] not in self._active:
+            self.evict()
+
+    def delete(self, room: str, element_id: str):
+        state = self._rooms.get(room)
+        if state is None:
+            return
+
+        if not state.loaded.done():
+            state.deleted_while_loading.add(element_id)
+
+        self._size += state.pop(element_id)
+
+    def evict(self):
+        expired_at = time.time() - config.room_cache_ttl
+        while self._idle:
+            room, released_at = next(iter(self._idle.items()))
+            if released_at > expired_at and self._size <= config.room_cache_max_bytes:
+                break
+
+            logging.debug("Evicting room %s from cache", room)
+            self._drop(room)
+
+        over_limit = self._size > config.room_cache_max_bytes
+        if over_limit != self._over_limit:  # Once per change, not per call while over the limit
+            self._over_limit = over_limit
+            if over_limit:
+                logging.warning(
+                    "Room cache size %s exceeds the limit of %s bytes with active rooms only",
+                    self._size,
+                    config.room_cache_max_bytes
+                )
+            else:
+                logging.info("Room cache size %s is within the limit again", self._size)
+
+    def _drop(self, room: str, state: Optional[RoomState] = None):
+        if state is not None and self._rooms.get(room) is not state:  # Already evicted
+            return
+
+        self._idle.pop(room, None)
+
+        state = self._rooms.pop(room, None)
+        if state is not None:
+            self._size -= state.size
+
+    async def _load(self, room: str, state: RoomState):
+        logging.debug("Loading room %s into cache", room)
+
+        items = await get_room_elements(room)
+
+        size = state.size
+        pending = element_update_queue.get_room(room)  # Not yet stored changes override stored data
+        for item in items:
+            element_id = item["element_id"]
+            if element_id in state.deleted_while_loading:
+                continue
+
+            if element_id in pending:
+                if pending[element_id] is None:  # Deleted
+                    continue
+
+                item = {
+                    **item,
+                    **pending[element_id],
+                }
+
+            state.put(element_id, {  # Changes made while loading override both
+                **item,
+                **state.elements.get(element_id, {}),
+            })
+
+        state.deleted_while_loading.clear()
+
+        if self._rooms.get(room) is state:  # Not evicted while loading
+            self._size += state.size - size
+
+
+room_cache = RoomCache()
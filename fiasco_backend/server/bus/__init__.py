@@ -0,0 +1,5 @@
+from .base import *
+from .factory import *
+from .hub import *
+from .memory import *
+from .unix_socket import *
@@ -0,0 +1,112 @@
+__all__ = [
+    "Bus",
+    "BusHandler",
+    "NodeLeftHandler",
+    "ConnectedHandler",
+]
+
+import logging
+import uuid
+
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List
+
+BusHandler = Callable[[str, Dict[str, Any], str], None]  # (channel, message, publisher node ID)
+NodeLeftHandler = Callable[[str], None]  # (node ID)
+ConnectedHandler = Callable[[], None]
+
+
+class Bus(ABC):
+    """
+    Pub/sub bus of a node.
+
+    A message published to a channel is delivered to the handlers subscribed to the channel
+    on the publishing node (right away) and on all the other nodes connected to the bus.
+    Messages are JSON-compatible dicts; the handlers must not modify them.
+    """
+
+    def __init__(self):
+        self.node_id = uuid.uuid4().hex
+
+        self._handlers: Dict[str, List[BusHandler]] = {}
+        self._node_left_handlers: List[NodeLeftHandler] = []
+        self._connected_handlers: List[ConnectedHandler] = []
+
+    @abstractmethod
+    async def start(self):
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def stop(self):
+        raise NotImplementedError()
+
+    def is_subscribed(self, channel: str) -> bool:
+        return channel in self._handlers
+
+    def subscribe(self, channel: str, handler: BusHandler):
+        if channel not in self._handlers:
+            self._handlers[channel] = []
+            self._subscribe(channel)
+
+        self._handlers[channel].append(handler)
+
+    def unsubscribe(self, channel: str, handler: BusHandler):
+        handlers = self._handlers.get(channel)
+        if handlers is None or handler not in handlers:
+            return
+
+        handlers.remove(handler)
+        if not handlers:
+            del self._handlers[channel]
+            self._unsubscribe(channel)
+
+    def on_node_left(self, handler: NodeLeftHandler):
+        """Register the handler called when another node disconnects from the bus (e.g. its process dies)."""
+
+        self._node_left_handlers.append(handler)
+
+    def on_connected(self, handler: ConnectedHandler):
+        """Register the handler called when the node (re)connects to the bus, e.g. to sync its state with others."""
+
+        self._connected_handlers.append(handler)
+
+    def publish(self, channel: str, message: Dict[str, Any]):
+        self._deliver(channel=channel, message=message, node=self.node_id)
+        self._publish(channel=channel, message=message)
+
+    def _deliver(self, channel: str, message: Dict[str, Any], node: str):
+        for handler in tuple(self._handlers.get(channel, ())):
+            try:
+                handler(channel, message, node)
+            except Exception as e:
+                logging.error("Bus handler error on channel %s", channel, exc_info=e)
+
+    def _node_left(self, node: str):
+        logging.info("Bus node %s left", node)
+
+        for handler in tuple(self._node_left_handlers):
+            try:
+                handler(node)
+            except Exception as e:
+                logging.error("Bus node left handler error", exc_info=e)
+
+    def _connected(self):
+        for handler in tuple(self._connected_handlers):
+            try:
+                handler()
+            except Exception as e:
+                logging.error("Bus connected handler error", exc_info=e)
+
+    @abstractmethod
+    def _subscribe(self, channel: str):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def _unsubscribe(self, channel: str):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def _publish(self, channel: str, message: Dict[str, Any]):
+        """Send the message to the other nodes."""
+
+        raise NotImplementedError()
@@ -0,0 +1,61 @@
+"""
+Pub/sub bus of the process.
+
+Room messages and presence changes are published to the bus and delivered by every node (process)
+holding connections of the room, so a room is not bound to a single process.
+"""
+
+__all__ = [
+    "BUSES",
+    "get_bus",
+    "on_startup",
+    "on_cleanup",
+]
+
+from typing import Optional
+
+from fiasco_backend import config
+
+from .base import Bus
+from .hub import BusHub
+from .memory import MemoryBus
+from .unix_socket import UnixSocketBus
+
+BUSES = {
+    "memory": lambda: MemoryBus(),
+    "socket": lambda: UnixSocketBus(path=config.bus_socket_path),
+}
+
+_bus: Optional[Bus] = None
+_hub: Optional[BusHub] = None
+
+
+def get_bus() -> Bus:
+    """Get the bus of the process (created on the first call according to <bus> config value)."""
+
+    global _bus
+
+    if _bus is None:
+        _bus = BUSES[config.bus]()
+
+    return _bus
+
+
+async def on_startup(app):
+    global _hub
+
+    if config.bus_hub:
+        _hub = BusHub(path=config.bus_socket_path)
+        await _hub.start()
+
+    await get_bus().start()
+
+
+async def on_cleanup(app):
+    global _hub
+
+    await get_bus().stop()
+
+    if _hub is not None:
+        await _hub.stop()
+        _hub = None
@@ -0,0 +1,136 @@
+"""
+Local bus hub.
+
+Stands in for a Redis-style pub/sub server: the nodes connect to a Unix socket and exchange
+newline-delimited JSON frames, so several processes share rooms without external services.
+"""
+
+__all__ = [
+    "BusHub",
+    "FRAME_LIMIT",
+]
+
+import asyncio
+import json
+import logging
+import os
+
+from typing import Dict, Optional, Set
+
+FRAME_LIMIT = 16 * 1024 * 1024  # Max frame size (in bytes)
+
+
+class BusHub:
+    OP_HELLO = "hello"
+    OP_SUBSCRIBE = "sub"
+    OP_UNSUBSCRIBE = "unsub"
+    OP_PUBLISH = "pub"
+    OP_NODE_LEFT = "node-left"
+
+    WRITE_BUFFER_LIMIT = 4 * FRAME_LIMIT  # Max bytes buffered for a node (that does not read); disconnected above it
+
+    def __init__(self, path: str):
+        self._path = path
+        self._server: Optional[asyncio.AbstractServer] = None
+
+        self._nodes: Dict[asyncio.StreamWriter, Optional[str]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._channels: Dict[str, Set[asyncio.StreamWriter]] = {}
+
+    async def start(self):
+        if os.path.exists(self._path):  # Left by a previous (killed) process
+            os.unlink(self._path)
+
+        self._server = await asyncio.start_unix_server(self._handle_node, path=self._path, limit=FRAME_LIMIT)
+
+        logging.info("Bus hub listening on %s", self._path)
+
+    async def stop(self):
+        if self._server is None:
+            return
+
+        self._server.close()
+        for writer in tuple(self._nodes):
+            writer.close()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+
+        logging.info("Bus hub stopped")
+
+    async def _handle_node(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        self._nodes[writer] = None
+        try:
+            while True:
+                frame = await reader.readline()
+                if not frame:
+                    break
+
+                try:
+                    self._handle_frame(writer=writer, frame=frame)
+                except Exception as e:  # Skipped, so a malformed frame does not disconnect the node
+                    logging.warning("Malformed bus frame from node %s: %s", self._nodes.get(writer), e)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+            logging.warning("Bus node connection error: %s", e)
+        finally:
+            self._remove_node(writer)
+            self._tasks.discard(task)
+
+    def _handle_frame(self, writer: asyncio.StreamWriter, frame: bytes):
+        data = json.loads(frame)
+        op = data.get("op")
+
+        if op == self.OP_PUBLISH:  # Forwarded as is, without re-encoding
+            for subscriber in self._channels.get(data["channel"], ()):
+                if subscriber is not writer:
+                    self._write(subscriber, frame)
+        elif op == self.OP_SUBSCRIBE:
+            self._channels.setdefault(data["channel"], set()).add(writer)
+        elif op == self.OP_UNSUBSCRIBE:
+            self._discard_subscriber(channel=data["channel"], writer=writer)
+        elif op == self.OP_HELLO:
+            self._nodes[writer] = data["node"]
+        else:
+            logging.warning("Unsupported bus frame operation: %s", op)
+
+    def _remove_node(self, writer: asyncio.StreamWriter):
+        node = self._nodes.pop(writer, None)
+        for channel in tuple(self._channels):
+            self._discard_subscriber(channel=channel, writer=writer)
+
+        writer.close()
+
+        if node is None:
+            return
+
+        frame = (json.dumps({"op": self.OP_NODE_LEFT, "node": node}) + "\n").encode()
+        for other in self._nodes:
+            self._write(other, frame)
+
+    def _write(self, writer: asyncio.StreamWriter, frame: bytes):
+        """Write the frame to the node, disconnecting it if it does not read (so its frames pile up)."""
+
+        if writer.transport.is_closing():
+            return
+
+        writer.write(frame)
+
+        size = writer.transport.get_write_buffer_size()
+        if size > self.WRITE_BUFFER_LIMIT:
+            node = self._nodes.get(writer)
+            logging.warning("Bus node %s does not read (%s bytes buffered); disconnecting", node, size)
+            writer.transport.abort()  # Its reading ends, so it's removed as any other disconnected node
+
+    def _discard_subscriber(self, channel: str, writer: asyncio.StreamWriter):
+        subscribers = self._channels.get(channel)
+        if subscribers is None:
+            return
+
+        subscribers.discard(writer)
+        if not subscribers:
+            del self._channels[channel]
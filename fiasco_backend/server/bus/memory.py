@@ -0,0 +1,71 @@
+__all__ = [
+    "MemoryBus",
+    "MemoryHub",
+    "memory_hub",
+]
+
+import asyncio
+import json
+
+from typing import Any, Dict, Optional
+
+from fiasco_backend.utils.json_encoders import json_dumps
+
+from .base import Bus
+
+
+class MemoryHub:
+    """Connects the in-process buses, e.g. to run several nodes within a single process."""
+
+    def __init__(self):
+        self._nodes: Dict[str, "MemoryBus"] = {}
+
+    def join(self, bus: "MemoryBus"):
+        self._nodes[bus.node_id] = bus
+
+    def leave(self, bus: "MemoryBus"):
+        if self._nodes.pop(bus.node_id, None) is None:
+            return
+
+        for node in self._nodes.values():
+            node._node_left(bus.node_id)
+
+    def publish(self, sender: "MemoryBus", channel: str, message: Dict[str, Any]):
+        payload = None
+        loop = asyncio.get_event_loop()
+        for node in self._nodes.values():
+            if node is sender or not node.is_subscribed(channel):
+                continue
+
+            if payload is None:  # Serialized as for a real bus, so the nodes never share the message objects
+                payload = json_dumps(message)
+
+            loop.call_soon(node._deliver, channel, json.loads(payload), sender.node_id)
+
+
+memory_hub = MemoryHub()
+
+
+class MemoryBus(Bus):
+    """In-process bus; a single node unless several buses are connected to the same hub."""
+
+    def __init__(self, hub: Optional[MemoryHub] = None):
+        super().__init__()
+
+        self._hub = memory_hub if hub is None else hub
+
+    async def start(self):
+        self._hub.join(self)
+        self._connected()
+
+    async def stop(self):
+        self._hub.leave(self)
+
+    def _subscribe(self, channel: str):
+        pass
+
+    def _unsubscribe(self, channel: str):
+        pass
+
+    def _publish(self, channel: str, message: Dict[str, Any]):
+        self._hub.publish(sender=self, channel=channel, message=message)
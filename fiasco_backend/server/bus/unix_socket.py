@@ -0,0 +1,142 @@
+__all__ = [
+    "UnixSocketBus",
+]
+
+import asyncio
+import json
+import logging
+
+from typing import Any, Dict, Optional
+
+from fiasco_backend.utils.json_encoders import json_dumps
+
+from .base import Bus
+from .hub import BusHub, FRAME_LIMIT
+
+
+class UnixSocketBus(Bus):
+    """Bus connected to a <BusHub> over a Unix socket."""
+
+    RECONNECT_DELAY = 1  # Seconds
+
+    def __init__(self, path: str):
+        super().__init__()
+
+        self._path = path
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self._dropped_count = 0
+
+    @property
+    def is_connected(self) -> bool:
+        return self._writer is not None
+
+    @property
+    def dropped_count(self) -> int:
+        """Count of the messages not sent to the other nodes while disconnected from the hub."""
+
+        return self._dropped_count
+
+    async def start(self):
+        reader = await self._connect()  # Fails on startup if the hub is unreachable
+        self._task = asyncio.create_task(self._run(reader))
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def _connect(self) -> asyncio.StreamReader:
+        reader, writer = await asyncio.open_unix_connection(path=self._path, limit=FRAME_LIMIT)
+
+        self._writer = writer
+        self._send({"op": BusHub.OP_HELLO, "node": self.node_id})
+        for channel in self._handlers:
+            self._subscribe(channel)
+
+        logging.info("Connected to bus hub %s as node %s", self._path, self.node_id)
+
+        self._connected()
+
+        return reader
+
+    async def _run(self, reader: asyncio.StreamReader):
+        while True:
+            try:
+                await self._read(reader)
+            except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+                logging.warning("Bus hub connection error: %s", e)
+
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            logging.warning("Disconnected from bus hub %s", self._path)
+
+            while True:
+                await asyncio.sleep(self.RECONNECT_DELAY)
+                try:
+                    reader = await self._connect()
+                except OSError as e:
+                    logging.warning("Failed to reconnect to bus hub: %s", e)
+                else:
+                    break
+
+    async def _read(self, reader: asyncio.StreamReader):
+        while True:
+            frame = await reader.readline()
+            if not frame:
+                return
+
+            try:
+                self._handle_frame(frame)
+            except Exception as e:  # Skipped, so reading (and delivering the next frames) goes on
+                logging.warning("Malformed bus frame: %s", e)
+
+    def _handle_frame(self, frame: bytes):
+        data = json.loads(frame)
+        op = data.get("op")
+        if op == BusHub.OP_PUBLISH:
+            self._deliver(channel=data["channel"], message=data["message"], node=data["node"])
+        elif op == BusHub.OP_NODE_LEFT:
+            self._node_left(data["node"])
+
+    def _send(self, data: Dict[str, Any]) -> bool:
+        if self._writer is None:
+            return False
+
+        self._writer.write((json_dumps(data) + "\n").encode())
+
+        size = self._writer.transport.get_write_buffer_size()
+        if size > BusHub.WRITE_BUFFER_LIMIT:  # The hub does not read; reconnected (as on any disconnection)
+            logging.warning("Bus hub does not read (%s bytes buffered); disconnecting", size)
+            self._writer.transport.abort()
+            self._writer = None
+
+        return True
+
+    def _subscribe(self, channel: str):
+        self._send({"op": BusHub.OP_SUBSCRIBE, "channel": channel})
+
+    def _unsubscribe(self, channel: str):
+        self._send({"op": BusHub.OP_UNSUBSCRIBE, "channel": channel})
+
+    def _publish(self, channel: str, message: Dict[str, Any]):
+        sent = self._send({
+            "op": BusHub.OP_PUBLISH,
+            "channel": channel,
+            "node": self.node_id,
+            "message": message,
+        })
+        if not sent:
+            self._dropped_count += 1
@@ -0,0 +1,116 @@
+"""
+Conflation of high-frequency element updates.
+
+Keeps the latest (merged) state per element and forwards it at most <upsert_conflation_rate> times per second,
+always delivering the final state once the updates stop. The element state preceding the first conflated
+update (so the one clients have seen last) goes along, e.g. to reach the viewers of the old element position.
+The delayed updates are sent on the room actor, so they are ordered with the room events (e.g. a deletion).
+"""
+
+__all__ = [
+    "ElementConflator",
+    "element_conflator",
+]
+
+import asyncio
+
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fiasco_backend import config
+from fiasco_backend.server.room_actors import room_actors
+
+
+Send = Callable[[Dict[str, Any], Optional[Dict[str, Any]]], Awaitable[Any]]  # (Update, previous state)
+
+
+class ConflatedElement:
+
+    __slots__ = ("last_sent_at", "pending", "previous", "send", "timer")
+
+    def __init__(self, last_sent_at: float):
+        self.last_sent_at = last_sent_at
+        self.pending: Optional[Dict[str, Any]] = None
+        self.previous: Optional[Dict[str, Any]] = None
+        self.send: Optional[Send] = None
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class ElementConflator:
+
+    def __init__(self, rate: Optional[float] = None):
+        """:param rate: max updates per second per element (0 to disable); by default <upsert_conflation_rate>"""
+
+        self._rate = rate
+        self._elements: Dict[Tuple[str, str], ConflatedElement] = {}
+
+    @property
+    def interval(self) -> float:
+        rate = config.upsert_conflation_rate if self._rate is None else self._rate
+
+        return 1 / rate if rate else 0
+
+    async def submit(self, element: Dict[str, Any], send: Send, previous: Optional[Dict[str, Any]] = None):
+        """Send the element update now, or merge it into the pending one to be sent with the latest <send>.
+
+        :param previous: the element state before the update (if known)
+        """
+
+        interval = self.interval
+        if not interval:
+            await send(element, previous)
+            return
+
+        loop = asyncio.get_event_loop()
+        now = loop.time()
+        key = (element["room"], element["element_id"])
+
+        conflated = self._elements.get(key)
+        if conflated is None:
+            conflated = self._elements[key] = ConflatedElement(last_sent_at=now)
+            conflated.timer = loop.call_later(interval, self._schedule_flush, key, conflated)
+
+            await send(element, previous)
+            return
+
+        if conflated.pending is None:
+            conflated.pending = element
+            conflated.previous = previous
+        else:
+            conflated.pending = {
+                **conflated.pending,
+                **element,
+            }
+        conflated.send = send
+
+    def discard(self, room: str, element_id: str):
+        """Drop the pending element update (e.g. once the element deleted)."""
+
+        conflated = self._elements.pop((room, element_id), None)
+        if conflated is not None:
+            conflated.timer.cancel()
+
+    def _schedule_flush(self, key: Tuple[str, str], conflated: ConflatedElement):
+        room_actors.defer(room=key[0], job=partial(self._flush, key, conflated))
+
+    async def _flush(self, key: Tuple[str, str], conflated: ConflatedElement):
+        if self._elements.get(key) is not conflated:  # Discarded while waiting for the room (e.g. element deleted)
+            return
+
+        if conflated.pending is None:  # No updates since the last sent one
+            del self._elements[key]
+            return
+
+        element, previous, send = conflated.pending, conflated.previous, conflated.send
+        conflated.pending = None
+        conflated.previous = None
+        conflated.send = None
+
+        loop = asyncio.get_event_loop()
+        conflated.last_sent_at = loop.time()
+        conflated.timer = loop.call_later(self.interval or 0, self._schedule_flush, key, conflated)
+
+        await send(element, previous)
+
+
+element_conflator = ElementConflator()
@@ -3,10 +3,10 @@ __all__ = [
 ]
 
 
-from fiasco_backend.server.event_handlers.base_event_handler import BaseEventHandler
+from fiasco_backend.server.event_handlers.base_event_handler import BaseEventHandler, EventContext
 
 
 class DefaultAdminEventHandler(BaseEventHandler):
 
-    async def handle(self):
-        await self.send_message_to_admin(self.message)
+    async def handle(self, context: EventContext):
+        await self.send_message_to_admin(context, context.message)
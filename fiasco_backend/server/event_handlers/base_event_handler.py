@@ -1,5 +1,6 @@
 __all__ = [
     "BaseEventHandler",
+    "EventContext",
 ]
 
 from abc import ABC, abstractmethod
@@ -19,16 +20,29 @@ from fiasco_backend.server.websocket.message_senders import (
 )
 
 
+class EventContext:
+    """The message being handled and the connection it was received from."""
+
+    __slots__ = ("message", "connection")
+
+    def __init__(self, message: Message, connection: WebSocketConnection):
+        self.message = message
+        self.connection = connection
+
+
 class BaseEventHandler(ABC):
+    """
+    Stateless handler of an event, created once per event listener (not per message).
+
+    Everything specific to a message comes with the context, so the handlers keep no per-message state.
+    """
 
     def __init__(
         self,
         admin_message_sender: AdminMessageSender,
         player_message_sender: PlayerMessageSender,
         admin_connection_storage: AdminStorage,
-        player_connection_storage: PlayerStorage,
-        message: Message,
-        connection: WebSocketConnection
+        player_connection_storage: PlayerStorage
     ):
         self.admin_message_sender = admin_message_sender
         self.player_message_sender = player_message_sender
@@ -36,39 +50,40 @@ class BaseEventHandler(ABC):
         self.admin_connection_storage = admin_connection_storage
         self.player_connection_storage = player_connection_storage
 
-        self.message = message
-        self.connection = connection
-
     @abstractmethod
-    async def handle(self):
+    async def handle(self, context: EventContext):
         raise NotImplemented()
 
     async def send_message_to_player(
         self,
+        context: EventContext,
         message: Message,
         sender: str,
         room: str,
         player: str,
         target: str = PlayerMessageSender.TARGET_ROOM,
+        volatile: bool = False,
     ):
         await self.player_message_sender.send_message(
             message=message,
-            connection=self.connection,
+            connection=context.connection,
             sender=sender,
             target=target,
             room=room,
-            player=player
+            player=player,
+            volatile=volatile
         )
 
     async def send_message_to_admin(
         self,
+        context: EventContext,
         message: Message,
         target: str = AdminMessageSender.TARGET_DIRECT,
         sender: str = "$ADMIN"
     ):
         await self.admin_message_sender.send_message(
             message=message,
-            connection=self.connection,
+            connection=context.connection,
             sender=sender,
             target=target,
         )
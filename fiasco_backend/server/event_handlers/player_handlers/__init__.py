@@ -3,4 +3,5 @@ from .delete_element import *
 from .get_statistics import *
 from .player_connected import *
 from .player_disconnected import *
+from .set_viewport import *
 from .upsert_element import *
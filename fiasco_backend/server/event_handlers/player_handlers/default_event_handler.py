@@ -2,54 +2,66 @@ __all__ = [
     "DefaultPlayerEventHandler",
 ]
 
-from typing import Optional
+from typing import Optional, Sequence
 
-from fiasco_backend.server.event_handlers.base_event_handler import BaseEventHandler
+from fiasco_backend.server.event_handlers.base_event_handler import BaseEventHandler, EventContext
 from fiasco_backend.server.websocket import Message
 from fiasco_backend.server.websocket.message_senders import PlayerMessageSender
-from fiasco_backend.server.websocket.connections import PlayerConnection
+from fiasco_backend.utils.grid import Box
 
 
 class DefaultPlayerEventHandler(BaseEventHandler):
+    """Base of the player event handlers; the context connection is a <PlayerConnection>."""
+
     EVENT_ERROR = "$error"
 
-    connection: PlayerConnection
+    def is_player_online(self, context: EventContext) -> bool:
+        """Whether the player has connections on this or the other nodes."""
+
+        return self.is_player_online_locally(context) or self.player_message_sender.is_player_online_elsewhere(
+            room=context.connection.room,
+            player=context.connection.player
+        )
 
-    @property
-    def is_player_online(self):
+    def is_player_online_locally(self, context: EventContext) -> bool:
         return self.player_connection_storage.is_player_online(
-            room=self.connection.room,
-            player=self.connection.player
+            room=context.connection.room,
+            player=context.connection.player
         )
 
     async def send_message_to_player(
         self,
+        context: EventContext,
         message: Message,
         sender: Optional[str] = None,
         room: Optional[str] = None,
         player: Optional[str] = None,
         target: str = PlayerMessageSender.TARGET_ROOM,
+        volatile: bool = False,
+        area: Optional[Sequence[Optional[Box]]] = None,
     ):
         if sender is None:
-            sender = self.connection.player
+            sender = context.connection.player
         if room is None:
-            room = self.connection.room
+            room = context.connection.room
         if player is None:
-            player = self.connection.player
+            player = context.connection.player
 
         await self.player_message_sender.send_message(
             message=message,
-            connection=self.connection,
+            connection=context.connection,
             sender=sender,
             target=target,
             room=room,
-            player=player
+            player=player,
+            volatile=volatile,
+            area=area
         )
 
-    async def handle(self):
-        await self.send_message_to_player(self.message)
+    async def handle(self, context: EventContext):
+        await self.send_message_to_player(context, context.message)
 
-    async def send_error(self, error: str):
+    async def send_error(self, context: EventContext, error: str):
         msg = self.create_message(
             event=self.EVENT_ERROR,
             data={
@@ -58,6 +70,7 @@ class DefaultPlayerEventHandler(BaseEventHandler):
         )
 
         await self.send_message_to_player(
+            context,
             message=msg,
             target=self.player_message_sender.TARGET_DIRECT
         )
@@ -5,30 +5,36 @@ __all__ = [
 import asyncio
 
 from fiasco_backend.db.element import delete_element
+from fiasco_backend.db.room_cache import room_cache
+from fiasco_backend.server.element_conflator import element_conflator
+from fiasco_backend.server.event_handlers.base_event_handler import EventContext
 
 from .default_event_handler import DefaultPlayerEventHandler
 
 
 class DeleteElementHandler(DefaultPlayerEventHandler):
 
-    async def handle(self):
-        element_id = self.message.data.get("element_id")
+    async def handle(self, context: EventContext):
+        element_id = context.message.data.get("element_id")
         if element_id is None:
-            await self.send_error(error="No element_id parameter provided")
+            await self.send_error(context, error="No element_id parameter provided")
             return
 
+        room_cache.delete(room=context.connection.room, element_id=element_id)
+        element_conflator.discard(room=context.connection.room, element_id=element_id)
+
         msg = self.create_message(
-            event=self.message.event,
+            event=context.message.event,
             data={
                 "element_id": element_id,
             }
         )
-        await self.send_message_to_player(message=msg)
+        await self.send_message_to_player(context, message=msg)
 
         asyncio.run_coroutine_threadsafe(
             delete_element(
                 element_id=element_id,
-                room=self.connection.room
+                room=context.connection.room
             ),
             asyncio.get_event_loop()
         )
@@ -3,18 +3,19 @@ __all__ = [
 ]
 
 from time import time
+from fiasco_backend.server.event_handlers.base_event_handler import EventContext
 
 from .default_event_handler import DefaultPlayerEventHandler
 
 
 class GetStatisticsHandler(DefaultPlayerEventHandler):
 
-    async def handle(self):
+    async def handle(self, context: EventContext):
         msg = self.create_message(
-            event=self.message.event,
+            event=context.message.event,
             data={
-                "online_time": int(time() - self.connection.created_at),
+                "online_time": int(time() - context.connection.created_at),
             }
         )
 
-        await self.send_message_to_player(msg, target=self.player_message_sender.TARGET_DIRECT)
+        await self.send_message_to_player(context, msg, target=self.player_message_sender.TARGET_DIRECT)
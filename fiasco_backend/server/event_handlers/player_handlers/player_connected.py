@@ -5,65 +5,161 @@ __all__ = [
 import logging
 from collections import defaultdict
 
-from fiasco_backend.db.element import delete_element, get_room_elements, element_update_queue
+from fiasco_backend.db.element import delete_element
+from fiasco_backend.db.room_cache import room_cache
+from fiasco_backend.server.event_handlers.base_event_handler import EventContext
+from fiasco_backend.server.presence import pending_disconnects
+
 from .default_event_handler import DefaultPlayerEventHandler
 
 
 class PlayerConnectedHandler(DefaultPlayerEventHandler):
     EVENT_INITIAL = "$initial"
     EVENT_PLAYER_CONNECTED = "$player-connected"
-
-    async def handle(self):
-        if not self.is_player_online:  # Already has active connections
-            msg = self.create_message(
-                event=self.EVENT_PLAYER_CONNECTED
+    EVENT_RESUMED = "$resumed"
+
+    SYNC_FULL = "full"
+    SYNC_DELTA = "delta"
+    SYNC_UNCHANGED = "unchanged"
+
+    async def handle(self, context: EventContext):
+        if not self.is_player_online(context):  # Already has active connections
+            # Reconnected within the grace period; others have not been notified about disconnection
+            reconnected = pending_disconnects.cancel(room=context.connection.room, player=context.connection.player)
+            if not reconnected:
+                msg = self.create_message(
+                    event=self.EVENT_PLAYER_CONNECTED
+                )
+                await self.send_message_to_player(context, msg)
+
+        is_player_online_locally = self.is_player_online_locally(context)
+
+        self.player_connection_storage.add_connection(context.connection)
+        room_cache.acquire(context.connection.room)
+        self.player_message_sender.acquire_room(context.connection.room)
+
+        if not is_player_online_locally:
+            self.player_message_sender.publish_presence(
+                room=context.connection.room,
+                player=context.connection.player,
+                online=True
             )
-            await self.send_message_to_player(msg)
 
-        self.player_connection_storage.add_connection(self.connection)
+        if context.connection.resume is None or not await self.resume(context):
+            await self.send_initial_data(context)
 
-        await self.send_initial_data()
+    async def resume(self, context: EventContext) -> bool:
+        """Send the room messages missed since the <resume> one; False if some of them are not kept anymore."""
 
-    async def send_initial_data(self):
-        players = defaultdict(defaultdict)
-        elements = {}
-        items = await get_room_elements(self.connection.room)
+        epoch, seq = context.connection.resume
+        messages = self.player_message_sender.get_room_messages(
+            room=context.connection.room,
+            epoch=epoch,
+            seq=seq
+        )
+        if messages is None:
+            return False
 
-        for item in items:
-            # TODO: Remove after ws sending in update_element_task() will be implemented
-            element_id = item["element_id"]
-            if element_update_queue.exists(element_id=element_id):
-                element, _ = element_update_queue.get(element_id=element_id)
+        self.player_message_sender.resend_messages(messages=messages, connection=context.connection)
 
-                item = {
-                    **item,
-                    **element,
-                }
+        epoch, seq = self.player_message_sender.get_room_seq(room=context.connection.room)
+        msg = self.create_message(
+            event=self.EVENT_RESUMED,
+            data={
+                "seq": seq,
+                "epoch": epoch,
+            }
+        )
+        await self.send_message_to_player(
+            context,
+            target=self.player_message_sender.TARGET_DIRECT,
+            message=msg
+        )
 
-            elements[element_id] = item
+        return True
+
+    async def send_initial_data(self, context: EventContext):
+        players = defaultdict(defaultdict)
+        elements = dict(await room_cache.get_elements(context.connection.room))
+        version = await room_cache.get_version(context.connection.room)
+
+        for element_id, item in list(elements.items()):
             try:
                 players[item["player"]]["online"] = False
             except KeyError as e:
                 logging.warning("Key error on init. Removing element #%s", element_id, exc_info=e)
 
-                await delete_element(element_id=element_id, room=self.connection.room)
+                del elements[element_id]
+                room_cache.delete(room=context.connection.room, element_id=element_id)
+                await delete_element(element_id=element_id, room=context.connection.room)
 
         player_connections = self.player_connection_storage.get_room_connections(
-            room=self.connection.room
+            room=context.connection.room
         )
 
         for connection in player_connections:
             players[connection.player]["online"] = True
 
+        for player in self.player_message_sender.get_remote_players(room=context.connection.room):
+            players[player]["online"] = True
+
+        epoch, seq = self.player_message_sender.get_room_seq(room=context.connection.room)
+        data = {
+            "players": players,
+            "seq": seq,
+            "epoch": epoch,
+            "version": version,
+        }
+        if context.connection.viewport is not None:
+            data["viewport"] = context.connection.viewport
+        data.update(await self.get_elements_data(context, elements))
+
         initial_message = self.create_message(
             event=self.EVENT_INITIAL,
-            data={
-                "players": players,
-                "elements": elements,
-            }
+            data=data
         )
 
         await self.send_message_to_player(
+            context,
             target=self.player_message_sender.TARGET_DIRECT,
             message=initial_message
         )
+
+    async def get_elements_data(self, context: EventContext, elements: dict) -> dict:
+        """Get all the room elements, or only the ones changed since the version held by the client.
+
+        With a viewport, the elements within it only; the others are sent as the viewport gets to them.
+        """
+
+        visible = None
+        if context.connection.viewport is not None:
+            visible = await room_cache.get_viewport_elements(
+                room=context.connection.room,
+                viewport=context.connection.viewport
+            )
+            elements = {element_id: item for element_id, item in elements.items() if element_id in visible}
+
+        changes = None
+        if context.connection.version is not None:
+            changes = await room_cache.get_changes(room=context.connection.room, version=context.connection.version)
+
+        if changes is None:
+            return {
+                "sync": self.SYNC_FULL,
+                "elements": elements,
+            }
+
+        changed, deleted = changes
+        if visible is not None:
+            changed = {element_id: item for element_id, item in changed.items() if element_id in visible}
+
+        if not changed and not deleted:
+            return {
+                "sync": self.SYNC_UNCHANGED,
+            }
+
+        return {
+            "sync": self.SYNC_DELTA,
+            "elements": changed,
+            "deleted": deleted,
+        }
@@ -2,16 +2,68 @@ __all__ = [
     "PlayerDisconnectedHandler",
 ]
 
+from functools import partial
+
+from fiasco_backend import config
+from fiasco_backend.db.room_cache import room_cache
+from fiasco_backend.server.event_handlers.base_event_handler import EventContext
+from fiasco_backend.server.presence import pending_disconnects
+
 from .default_event_handler import DefaultPlayerEventHandler
 
 
 class PlayerDisconnectedHandler(DefaultPlayerEventHandler):
     EVENT_PLAYER_DISCONNECTED = "$player-disconnected"
 
-    async def handle(self):
-        self.player_connection_storage.remove_connection(self.connection)
-        if not self.is_player_online:  # Has no any active connections yet
-            msg = self.create_message(
-                event=self.EVENT_PLAYER_DISCONNECTED
+    async def handle(self, context: EventContext):
+        self.player_connection_storage.remove_connection(context.connection)
+
+        if not self.is_player_online_locally(context):
+            is_player_online_elsewhere = self.player_message_sender.is_player_online_elsewhere(
+                room=context.connection.room,
+                player=context.connection.player
+            )
+            self.player_message_sender.publish_presence(
+                room=context.connection.room,
+                player=context.connection.player,
+                online=False,
+                announced=not is_player_online_elsewhere
+            )
+            if is_player_online_elsewhere:  # Announced by the node the player leaves last
+                self.player_message_sender.wait_player_offline(
+                    room=context.connection.room,
+                    player=context.connection.player,
+                    callback=partial(self.announce_player_disconnected, context)
+                )
+
+        if not self.player_connection_storage.is_room_online(room=context.connection.room):
+            room_cache.release(context.connection.room)
+            self.player_message_sender.release_room(context.connection.room)
+
+        if self.is_player_online(context):  # Has other active connections
+            return
+
+        await self.announce_player_disconnected(context)
+
+    async def announce_player_disconnected(self, context: EventContext):
+        if self.is_player_online(context):  # Reconnected before the (deferred) announcement runs
+            return
+
+        if config.presence_grace_period:  # Announce, unless reconnected within the grace period
+            pending_disconnects.schedule(
+                room=context.connection.room,
+                player=context.connection.player,
+                delay=config.presence_grace_period,
+                callback=partial(self.send_player_disconnected, context)
             )
-            await self.send_message_to_player(msg)
+        else:
+            await self.send_player_disconnected(context)
+
+    async def send_player_disconnected(self, context: EventContext):
+        if self.is_player_online(context):  # Reconnected to another node within the grace period
+            return
+
+        msg = self.create_message(
+            event=self.EVENT_PLAYER_DISCONNECTED
+        )
+        await self.send_message_to_player(context, msg)
@@ -0,0 +1,39 @@
+__all__ = [
+    "SetViewportHandler",
+]
+
+from fiasco_backend.db.room_cache import room_cache
+from fiasco_backend.server.event_handlers.base_event_handler import EventContext
+from fiasco_backend.utils.grid import parse_box
+
+from .default_event_handler import DefaultPlayerEventHandler
+
+
+class SetViewportHandler(DefaultPlayerEventHandler):
+
+    async def handle(self, context: EventContext):
+        viewport = (context.message.data or {}).get("viewport")
+        if viewport is not None:
+            try:
+                viewport = parse_box(viewport)
+            except (TypeError, ValueError):
+                await self.send_error(context, error="Invalid viewport (expected [left, top, right, bottom] integers)")
+                return
+
+        # Updates within the viewport are sent from now on, so the reply may only be followed by newer ones
+        self.player_connection_storage.set_viewport(context.connection, viewport)
+
+        if viewport is None:
+            elements = await room_cache.get_elements(context.connection.room)
+        else:
+            elements = await room_cache.get_viewport_elements(room=context.connection.room, viewport=viewport)
+
+        msg = self.create_message(
+            event=context.message.event,
+            data={
+                "viewport": viewport,
+                "elements": elements,
+            }
+        )
+
+        await self.send_message_to_player(context, msg, target=self.player_message_sender.TARGET_DIRECT)
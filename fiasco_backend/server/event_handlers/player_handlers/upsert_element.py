@@ -4,23 +4,31 @@ __all__ = [
 
 import asyncio
 
+from functools import partial
+from typing import Any, Dict, List, Optional
+
 from marshmallow import ValidationError
 
 from fiasco_backend.db.element import (
-    ElementSchema,
+    load_element,
     upsert_element,
 )
+from fiasco_backend.db.room_cache import room_cache
+from fiasco_backend.server.element_conflator import element_conflator
+from fiasco_backend.server.event_handlers.base_event_handler import EventContext
 from fiasco_backend.utils.db import generate_uuid
+from fiasco_backend.utils.grid import Box, get_coordinates_box
 
 from .default_event_handler import DefaultPlayerEventHandler
 
 
 class UpsertElementHandler(DefaultPlayerEventHandler):
+    POSITION_FIELDS = frozenset(("element_id", "room", "coordinates"))
 
-    async def handle(self):
+    async def handle(self, context: EventContext):
         data = {
-            **(self.message.data or {}),
-            "room": self.connection.room,
+            **(context.message.data or {}),
+            "room": context.connection.room,
         }
 
         create = False
@@ -28,21 +36,60 @@ class UpsertElementHandler(DefaultPlayerEventHandler):
             create = True
             data["element_id"] = generate_uuid()
             if data.get("player") is None:
-                data["player"] = self.connection.player
+                data["player"] = context.connection.player
 
         try:
-            element = ElementSchema().load(data)
+            element = load_element(data)
         except ValidationError as e:
-            await self.send_error(e.messages)
+            await self.send_error(context, e.messages)
             return
 
+        previous = room_cache.peek_element(room=element["room"], element_id=element["element_id"])
+        room_cache.upsert(element)
+
+        if create:
+            await self.send_element(context, element, volatile=False)
+        else:  # High-frequency updates (e.g. dragging) are forwarded at a capped rate
+            await element_conflator.submit(element, send=partial(self.send_element, context), previous=previous)
+
+        if create:
+            asyncio.run_coroutine_threadsafe(
+                upsert_element(element, create=create),
+                asyncio.get_event_loop()
+            )
+        else:  # Awaited, so the room (and its readers) is held back while the update queue is full
+            await upsert_element(element)
+
+    async def send_element(
+        self,
+        context: EventContext,
+        element: Dict[str, Any],
+        previous: Optional[Dict[str, Any]] = None,
+        volatile: Optional[bool] = None
+    ):
+        """Send the element update to the connections viewing its previous or its new position."""
+
+        if volatile is None:
+            # Position-only updates are superseded by the later ones, so may be dropped for slow consumers
+            volatile = self.POSITION_FIELDS.issuperset(element)
+
         msg = self.create_message(
-            event=self.message.event,
+            event=context.message.event,
             data=element
         )
-        await self.send_message_to_player(msg)
-
-        asyncio.run_coroutine_threadsafe(
-            upsert_element(element, create=create),
-            asyncio.get_event_loop()
+        await self.send_message_to_player(
+            context,
+            message=msg,
+            volatile=volatile,
+            area=self.get_element_area(element, previous)
         )
+
+    @staticmethod
+    def get_element_area(element: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> List[Optional[Box]]:
+        """Boxes of the element positions after and before the update (None box if the position is not known)."""
+
+        area = [get_coordinates_box({**(previous or {}), **element}.get("coordinates"))]
+        if previous is not None:
+            area.append(get_coordinates_box(previous.get("coordinates")))
+
+        return area
@@ -0,0 +1,42 @@
+"""
+Event metrics middleware (see <WSEventListener>): times the event handlers and counts their failures by event name.
+
+The handled events are counted by the latency histogram (<fiasco_event_handler_seconds_count>).
+"""
+
+__all__ = [
+    "observe_event",
+]
+
+import time
+
+from fiasco_backend.server.event_handlers import EventContext
+from fiasco_backend.server.ws_event_listeners import Handle
+from fiasco_backend.utils.metrics import metrics
+
+MAX_EVENTS = 200  # The event names are up to the clients, the others are counted as "$other"
+
+EVENT_ERRORS = metrics.counter(
+    "fiasco_event_errors_total",
+    "Inbound events failed to be handled by event name",
+    labels=("event", ),
+    max_series=MAX_EVENTS,
+)
+EVENT_LATENCY = metrics.histogram(
+    "fiasco_event_handler_seconds",
+    "Event handler latency by event name",
+    labels=("event", ),
+    max_series=MAX_EVENTS,
+)
+
+
+async def observe_event(context: EventContext, handle: Handle):
+    labels = (context.message.event, )
+    started_at = time.perf_counter()
+    try:
+        return await handle(context)
+    except Exception:
+        EVENT_ERRORS.inc(labels)
+        raise
+    finally:
+        EVENT_LATENCY.observe(time.perf_counter() - started_at, labels)
@@ -0,0 +1,59 @@
+"""
+Delayed presence changes.
+
+A player's disconnection is announced only after a grace period, so a brief network blip
+followed by a reconnection does not broadcast <$player-disconnected> and <$player-connected> to the room.
+The callbacks run on the room actor, so they are ordered with the room events; a reconnection handled
+after the grace timer fires, but before the callback runs, still cancels it.
+"""
+
+__all__ = [
+    "PendingDisconnects",
+    "pending_disconnects",
+]
+
+import asyncio
+
+from functools import partial
+from typing import Awaitable, Callable, Dict, Tuple
+
+from fiasco_backend.server.room_actors import room_actors
+
+
+class PendingDisconnects:
+
+    def __init__(self):
+        self._pending: Dict[Tuple[str, str], asyncio.TimerHandle] = {}  # Kept till the callback runs
+
+    def schedule(self, room: str, player: str, delay: float, callback: Callable[[], Awaitable]):
+        """Run the (async) callback after the delay, unless cancelled by the player reconnection."""
+
+        self.cancel(room=room, player=player)
+
+        key = (room, player)
+        self._pending[key] = asyncio.get_event_loop().call_later(delay, self._run, key, callback)
+
+    def cancel(self, room: str, player: str) -> bool:
+        """Cancel the pending disconnection; return True, if it was pending."""
+
+        timer = self._pending.pop((room, player), None)
+        if timer is None:
+            return False
+
+        timer.cancel()
+
+        return True
+
+    def _run(self, key: Tuple[str, str], callback: Callable[[], Awaitable]):
+        room_actors.defer(room=key[0], job=partial(self._run_callback, key, self._pending[key], callback))
+
+    async def _run_callback(self, key: Tuple[str, str], timer: asyncio.TimerHandle, callback: Callable[[], Awaitable]):
+        if self._pending.get(key) is not timer:  # Cancelled (or rescheduled) while waiting for the room actor
+            return
+
+        del self._pending[key]
+
+        await callback()
+
+
+pending_disconnects = PendingDisconnects()
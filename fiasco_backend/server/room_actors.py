@@ -0,0 +1,155 @@
+"""
+Room actors.
+
+The jobs of a room (handling its events and the deferred sends, e.g. the conflated element updates)
+run one by one, in the order submitted, on the task of the room (its actor), so the room mutations never
+interleave and the socket readers only decode and enqueue the events. A room has its task while it has jobs
+to run; the mailbox is bounded for the events, so a reader submitting to a full one waits (and stops reading
+its socket) till the room catches up.
+"""
+
+__all__ = [
+    "RoomActors",
+    "RoomEventListener",
+    "room_actors",
+]
+
+import asyncio
+import logging
+
+from collections import deque
+from functools import partial
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from aiohttp import WSCloseCode
+
+from fiasco_backend import config
+from fiasco_backend.server.websocket import Message
+from fiasco_backend.server.websocket.connections import PlayerConnection
+
+Job = Callable[[], Awaitable[Any]]
+Listener = Callable[[Message, PlayerConnection], Awaitable[Any]]
+
+
+class RoomActor:
+
+    __slots__ = ("mailbox", "task", "space")
+
+    def __init__(self):
+        self.mailbox: Deque[Tuple[Job, Optional[PlayerConnection]]] = deque()
+        self.task: Optional[asyncio.Future] = None
+        self.space: Optional[asyncio.Event] = None  # Set once a job is taken, for the submitters waiting on full
+
+
+class RoomActors:
+    """Runs the jobs of each room one at a time on the task of the room."""
+
+    ERROR_CLOSE_CODE = WSCloseCode.INTERNAL_ERROR
+    ERROR_CLOSE_MESSAGE = b"Internal error"
+
+    def __init__(self, mailbox_size: Optional[int] = None):
+        """
+        :param mailbox_size: max number of the pending jobs per room a submitter waits on (0 for no limit);
+            by default <room_mailbox_size> config value
+        """
+
+        self._mailbox_size = mailbox_size
+
+        self._actors: Dict[str, RoomActor] = {}
+
+    @property
+    def mailbox_size(self) -> int:
+        return config.room_mailbox_size if self._mailbox_size is None else self._mailbox_size
+
+    @property
+    def actors_count(self) -> int:
+        return len(self._actors)
+
+    @property
+    def pending_count(self) -> int:
+        """Count of the jobs waiting in the mailboxes of all the rooms."""
+
+        return sum(len(actor.mailbox) for actor in self._actors.values())
+
+    async def submit(self, room: str, job: Job, connection: Optional[PlayerConnection] = None):
+        """Enqueue the job, waiting while the room mailbox is full.
+
+        :param connection: the one the job handles an event of; closed if the job fails
+        """
+
+        mailbox_size = self.mailbox_size
+        while True:
+            actor = self._get_actor(room)  # The actor may have finished while waiting, then a new one starts
+            if not mailbox_size or len(actor.mailbox) < mailbox_size:
+                break
+
+            if actor.space is None:
+                actor.space = asyncio.Event()
+            actor.space.clear()
+            await actor.space.wait()
+
+        actor.mailbox.append((job, connection))  # No await since getting the actor, so it's still running
+
+    def defer(self, room: str, job: Job):
+        """Enqueue the job regardless of the mailbox size (e.g. from a timer, that can't wait)."""
+
+        self._get_actor(room).mailbox.append((job, None))
+
+    async def on_cleanup(self, app):
+        """Run the pending jobs (e.g. disconnections of the connections closed on shutdown)."""
+
+        tasks = [actor.task for actor in self._actors.values()]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _get_actor(self, room: str) -> RoomActor:
+        actor = self._actors.get(room)
+        if actor is None:
+            actor = self._actors[room] = RoomActor()
+            actor.task = asyncio.ensure_future(self._run(room, actor))  # Starts after the job is enqueued
+
+        return actor
+
+    async def _run(self, room: str, actor: RoomActor):
+        mailbox = actor.mailbox
+        while mailbox:
+            job, connection = mailbox.popleft()
+            if actor.space is not None:
+                actor.space.set()
+
+            try:
+                await job()
+            except Exception as e:
+                logging.error("Failed to run job of room %s", room, exc_info=e)
+
+                if connection is not None:
+                    # Closed as a failure on reading would; not awaited, so the closing handshake does not hold the room
+                    asyncio.ensure_future(
+                        connection.ws.close(code=self.ERROR_CLOSE_CODE, message=self.ERROR_CLOSE_MESSAGE)
+                    )
+
+        # No await since the mailbox checked empty, so nothing is enqueued to the finished actor;
+        # the submitters still waiting on it go to a new one
+        del self._actors[room]
+        if actor.space is not None:
+            actor.space.set()
+
+
+class RoomEventListener:
+    """Player event listener passing the events to the listener on the actors of their rooms."""
+
+    def __init__(self, listener: Listener, actors: Optional[RoomActors] = None):
+        """:param actors: by default the room actors of the process"""
+
+        self._listener = listener
+        self._actors = room_actors if actors is None else actors
+
+    async def __call__(self, message: Message, connection: PlayerConnection):
+        await self._actors.submit(
+            room=connection.room,
+            job=partial(self._listener, message, connection),
+            connection=connection
+        )
+
+
+room_actors = RoomActors()
@@ -1 +1,2 @@
 from .healthcheck_handler import *
+from .metrics_handler import *
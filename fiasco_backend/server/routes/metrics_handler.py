@@ -0,0 +1,13 @@
+__all__ = [
+    "metrics_handler",
+]
+
+from aiohttp import web
+
+from fiasco_backend.utils.metrics import metrics
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"  # Prometheus text exposition format
+
+
+async def metrics_handler(*args, **kwargs):
+    return web.Response(body=metrics.render().encode(), headers={"Content-Type": CONTENT_TYPE})
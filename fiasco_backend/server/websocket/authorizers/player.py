@@ -16,9 +16,11 @@ from fiasco_backend.server.websocket import (
 )
 
 from fiasco_backend.server.websocket.connections import PlayerConnection
+from fiasco_backend.utils.grid import parse_box
 
 
 class PlayerAuthorizer(Authorizer):
+    TRUE_VALUES = ("1", "true")
 
     async def authorize(self, request: Request, ws: WebSocketResponse) -> Optional[WebSocketConnection]:
         room = request.query.get("room")
@@ -36,9 +38,35 @@ class PlayerAuthorizer(Authorizer):
         if re.search(r".*\s+.*", player) or player.startswith("$"):
             raise NotAuthorizedError("Invalid <player> characters")
 
+        resume = request.query.get("resume")
+        if resume is not None:
+            try:
+                epoch, seq = resume.split(":")
+                resume = (epoch, int(seq))
+            except ValueError:
+                raise NotAuthorizedError("Invalid <resume> value (expected <epoch>:<seq>)")
+
+        version = request.query.get("version")
+        if version is not None:
+            try:
+                version = int(version)
+            except ValueError:
+                raise NotAuthorizedError("Invalid <version> value")
+
+        viewport = request.query.get("viewport")
+        if viewport is not None:
+            try:
+                viewport = parse_box(viewport.split(","))
+            except ValueError:
+                raise NotAuthorizedError("Invalid <viewport> value")
+
         return PlayerConnection(
             ws=ws,
             room=room,
-            player=player
+            player=player,
+            batch=request.query.get("batch") in self.TRUE_VALUES,
+            resume=resume,
+            version=version,
+            viewport=viewport
         )
 
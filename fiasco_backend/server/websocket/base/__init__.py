@@ -1,6 +1,10 @@
 from .authorizer import *
+from .codecs import *
 from .connection import *
 from .connection_storage import *
 from .exceptions import *
+from .heartbeat import *
 from .message import *
+from .outbound_queue import *
+from .rate_limiter import *
 from .response import *
@@ -0,0 +1,72 @@
+__all__ = [
+    "Codec",
+    "JsonCodec",
+    "MsgPackCodec",
+    "CODECS",
+    "DEFAULT_CODEC",
+    "get_codec",
+]
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Union
+
+import simplejson
+
+from fiasco_backend.utils.json_encoders import decimal_default, json_dumps
+
+try:
+    import msgpack
+except ImportError:  # Optional dependency
+    msgpack = None
+
+
+class Codec(ABC):
+    """Wire format of the messages, negotiated as a websocket subprotocol."""
+
+    name: str
+    binary: bool
+
+    @abstractmethod
+    def encode(self, data: Any) -> Union[str, bytes]:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def decode(self, payload: Union[str, bytes]) -> Any:
+        raise NotImplementedError()
+
+
+class JsonCodec(Codec):
+    name = "fiasco.json"
+    binary = False
+
+    def encode(self, data: Any) -> str:
+        return json_dumps(data)
+
+    def decode(self, payload: Union[str, bytes]) -> Any:
+        return simplejson.loads(payload)
+
+
+class MsgPackCodec(Codec):
+    name = "fiasco.msgpack"
+    binary = True
+
+    def encode(self, data: Any) -> bytes:
+        return msgpack.packb(data, default=decimal_default)
+
+    def decode(self, payload: Union[str, bytes]) -> Any:
+        return msgpack.unpackb(payload, raw=False)
+
+
+DEFAULT_CODEC = JsonCodec()
+
+CODECS: Dict[str, Codec] = {
+    DEFAULT_CODEC.name: DEFAULT_CODEC,
+}
+if msgpack is not None:
+    CODECS[MsgPackCodec.name] = MsgPackCodec()
+
+
+def get_codec(protocol: Optional[str]) -> Codec:
+    """Get codec by the negotiated subprotocol (JSON, if none)."""
+
+    return CODECS.get(protocol, DEFAULT_CODEC)
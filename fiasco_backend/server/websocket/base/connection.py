@@ -2,26 +2,51 @@ __all__ = [
     "WebSocketConnection",
 ]
 
-from time import time
+from time import monotonic, time
+from typing import Any, Dict, Union
 
+from .outbound_queue import OutboundQueue
 from .response import WebSocketResponse
 
 
 class WebSocketConnection:
-    
+
+    # No per-instance dict; subclasses keep their (known) params in own slots as well
+    __slots__ = ("_ws", "_params", "_created_at", "_last_seen", "_outbound")
+
     def __init__(self, ws: WebSocketResponse, **params):
         self._ws = ws
-        self._params = params
+        self._params = params or None
         self._created_at = time()
+        self._last_seen = monotonic()
+        self._outbound = OutboundQueue(ws=ws)
 
     @property
     def ws(self):
         return self._ws
 
     @property
-    def params(self):
-        return self._params
+    def params(self) -> Dict[str, Any]:
+        return dict(self._params or ())
 
     @property
     def created_at(self):
         return self._created_at
+
+    @property
+    def last_seen(self) -> float:
+        """Monotonic time of the last inbound frame."""
+
+        return self._last_seen
+
+    def touch(self):
+        self._last_seen = monotonic()
+
+    @property
+    def outbound(self) -> OutboundQueue:
+        return self._outbound
+
+    def send(self, payload: Union[str, bytes], volatile: bool = False) -> bool:
+        """Enqueue the message to be sent; return False if it's not going to be sent."""
+
+        return self._outbound.put(payload, volatile=volatile)
@@ -0,0 +1,120 @@
+__all__ = [
+    "HeartbeatMonitor",
+    "heartbeat_monitor",
+]
+
+import asyncio
+import logging
+import time
+
+from typing import Dict, Optional
+
+from aiohttp import WSCloseCode
+
+from fiasco_backend import config
+from fiasco_backend.utils.timer_wheel import TimerWheel, TimerWheelEntry
+
+from .connection import WebSocketConnection
+
+
+class HeartbeatMonitor:
+    """
+    Pings the quiet connections and closes the idle ones, so half-open connections do not linger.
+
+    A connection is checked once per heartbeat interval by a timer of the shared wheel (not a timer per connection);
+    any inbound frame, pongs included, counts as activity. Closing goes through the normal disconnection path.
+    """
+
+    CLOSE_CODE = WSCloseCode.GOING_AWAY
+    CLOSE_MESSAGE = b"Idle timeout"
+
+    def __init__(
+        self,
+        interval: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+        wheel: Optional[TimerWheel] = None
+    ):
+        """
+        :param interval: time (in seconds) of no activity to ping the connection after (0 to disable);
+            by default <heartbeat_interval> config value
+        :param idle_timeout: time (in seconds) of no activity to close the connection after (0 to disable);
+            by default <idle_timeout> config value
+        """
+
+        self._interval = interval
+        self._idle_timeout = idle_timeout
+        self._wheel = TimerWheel() if wheel is None else wheel
+
+        self._entries: Dict[int, TimerWheelEntry] = {}  # Connection ID -> check timer
+
+        self.pings_count = 0
+        self.reaped_count = 0
+
+    @property
+    def interval(self) -> float:
+        return config.heartbeat_interval if self._interval is None else self._interval
+
+    @property
+    def idle_timeout(self) -> float:
+        return config.idle_timeout if self._idle_timeout is None else self._idle_timeout
+
+    @property
+    def watched_count(self) -> int:
+        return len(self._entries)
+
+    def watch(self, connection: WebSocketConnection):
+        if not self.interval and not self.idle_timeout:
+            return
+
+        connection.touch()
+        self._schedule(connection, delay=self._get_check_delay(idle=0))
+
+    def unwatch(self, connection: WebSocketConnection):
+        entry = self._entries.pop(id(connection), None)
+        if entry is not None:
+            entry.cancel()
+
+    def _get_check_delay(self, idle: float) -> float:
+        delays = []
+        if self.interval:  # Pinged again after every interval of no activity
+            delays.append(self.interval - idle if idle < self.interval else self.interval)
+        if self.idle_timeout:
+            delays.append(self.idle_timeout - idle)
+
+        return min(delays)
+
+    def _schedule(self, connection: WebSocketConnection, delay: float):
+        self._entries[id(connection)] = self._wheel.schedule(delay, self._check, connection)
+
+    def _check(self, connection: WebSocketConnection):
+        if id(connection) not in self._entries:  # Unwatched
+            return
+
+        if connection.ws.closed:
+            del self._entries[id(connection)]
+            return
+
+        idle = time.monotonic() - connection.last_seen
+        if self.idle_timeout and idle >= self.idle_timeout:
+            del self._entries[id(connection)]
+            self.reaped_count += 1
+
+            logging.info("Closing connection idle for %.1f seconds", idle)
+            asyncio.ensure_future(connection.ws.close(code=self.CLOSE_CODE, message=self.CLOSE_MESSAGE))
+            return
+
+        if self.interval and idle >= self.interval:
+            self.pings_count += 1
+            asyncio.ensure_future(self._ping(connection))
+
+        self._schedule(connection, delay=self._get_check_delay(idle=idle))
+
+    @staticmethod
+    async def _ping(connection: WebSocketConnection):
+        try:
+            await connection.ws.ping()
+        except (ConnectionError, RuntimeError) as e:  # Closing meanwhile
+            logging.debug("Failed to ping connection: %s", e)
+
+
+heartbeat_monitor = HeartbeatMonitor()
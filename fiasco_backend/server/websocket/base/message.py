@@ -3,6 +3,8 @@ __all__ = [
 ]
 
 
+import json
+
 from dataclasses import dataclass
 from typing import Optional, Dict, Any
 
@@ -14,6 +16,10 @@ class MessageSchema(Schema):
     data = fields.Dict(required=False)
 
 
+MESSAGE_SCHEMA = MessageSchema()
+MESSAGE_FIELDS = frozenset(("event", "data"))
+
+
 @dataclass
 class Message:
     event: str
@@ -21,9 +27,26 @@ class Message:
 
     @classmethod
     def from_str(cls, msg: str):
-        return cls(
-            **MessageSchema().loads(msg)
+        return cls.from_dict(json.loads(msg))
+
+    @classmethod
+    def from_dict(cls, msg: Dict[str, Any]):
+        """Validate the (freshly decoded) message; well-formed ones skip the schema."""
+
+        if (
+            type(msg) is dict
+            and type(msg.get("event")) is str
+            and type(msg.get("data", {})) is dict
+            and MESSAGE_FIELDS.issuperset(msg)
+        ):
+            return cls(event=msg["event"], data=msg.get("data"))
+
+        return cls(  # Raises the validation error
+            **MESSAGE_SCHEMA.load(msg)
         )
 
     def to_disc(self):
-        return MessageSchema().dump(self)
+        return {
+            "event": self.event,
+            "data": self.data,
+        }
@@ -0,0 +1,222 @@
+__all__ = [
+    "OutboundQueue",
+    "get_payload_size",
+]
+
+import asyncio
+import logging
+
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Union
+
+from aiohttp import WSCloseCode
+
+from fiasco_backend import config
+
+from .response import WebSocketResponse
+
+
+def get_payload_size(payload: Union[str, bytes]) -> int:
+    """Size (in bytes) of the payload as sent, i.e. of the UTF-8 encoded text."""
+
+    if isinstance(payload, str) and not payload.isascii():  # The check is O(1); the ASCII text length is its size
+        return len(payload.encode())
+
+    return len(payload)
+
+
+class OutboundQueue:
+    """
+    Bounded queue of the outgoing connection messages, sent in order by a single writer task.
+
+    Once the queue exceeds its length or bytes limits, it either drops the oldest volatile messages
+    (the ones that are superseded by the later ones, e.g. positions) or closes the connection.
+
+    The volatile messages are queued in a deque of their own as well, so the oldest one is dropped in O(1):
+    it's only marked dropped in the main deque, and skipped by the writer.
+    """
+
+    POLICY_DROP_OLDEST = "drop-oldest"
+    POLICY_CLOSE = "close"
+
+    POLICIES = (
+        POLICY_DROP_OLDEST,
+        POLICY_CLOSE,
+    )
+
+    CLOSE_CODE = WSCloseCode.TRY_AGAIN_LATER
+    CLOSE_MESSAGE = b"Slow consumer"
+
+    __slots__ = (
+        "_ws",
+        "_max_length",
+        "_max_bytes",
+        "_policy",
+        "_items",
+        "_volatile",
+        "_length",
+        "_bytes",
+        "_closed",
+        "_wakeup",
+        "_task",
+        "sent_count",
+        "dropped_count",
+    )
+
+    def __init__(
+        self,
+        ws: WebSocketResponse,
+        max_length: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        policy: Optional[str] = None
+    ):
+        self._ws = ws
+        self._max_length = max_length if max_length is not None else config.outbound_queue_max_length
+        self._max_bytes = max_bytes if max_bytes is not None else config.outbound_queue_max_bytes
+        self._policy = policy if policy is not None else config.outbound_queue_overflow_policy
+
+        self._items: Deque[List] = deque()  # [payload (None once dropped), size]
+        self._volatile: Deque[List] = deque()  # Volatile items of <_items> not dropped (nor taken to be sent)
+        self._length = 0  # Items not dropped
+        self._bytes = 0
+        self._closed = False
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.sent_count = 0
+        self.dropped_count = 0
+
+    @property
+    def depth(self) -> int:
+        return self._length
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "bytes": self.bytes,
+            "sent_count": self.sent_count,
+            "dropped_count": self.dropped_count,
+        }
+
+    def start(self):
+        if self._task is not None:
+            return
+
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+        if self._length:
+            self._wakeup.set()
+
+    async def stop(self):
+        self._closed = True
+        self._clear()
+
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+        self._task = None
+
+    def put(self, payload: Union[str, bytes], volatile: bool = False) -> bool:
+        """Enqueue the message; return False if it's not going to be sent."""
+
+        if self._closed:
+            return False
+
+        item = [payload, get_payload_size(payload)]
+        self._items.append(item)
+        if volatile:
+            self._volatile.append(item)
+        self._length += 1
+        self._bytes += item[1]
+
+        if self._is_overflown():
+            self._handle_overflow()
+            if self._closed:
+                return False
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+        return True
+
+    def _is_overflown(self) -> bool:
+        return self._length > self._max_length or self._bytes > self._max_bytes
+
+    def _handle_overflow(self):
+        if self._policy == self.POLICY_DROP_OLDEST:
+            while self._volatile and self._is_overflown():
+                item = self._volatile.popleft()
+                self._length -= 1
+                self._bytes -= item[1]
+                item[0] = None
+                self.dropped_count += 1
+
+            if len(self._items) > 2 * self._length:  # Mostly dropped items (the writer is stuck); amortized O(1)
+                self._items = deque(item for item in self._items if item[0] is not None)
+
+            if not self._is_overflown():
+                return
+
+        logging.warning(
+            "Closing slow consumer connection; %s messages (%s bytes) are pending",
+            self._length,
+            self._bytes
+        )
+
+        self.dropped_count += self._length
+        self._closed = True
+        self._clear()
+
+        asyncio.ensure_future(self._ws.close(code=self.CLOSE_CODE, message=self.CLOSE_MESSAGE))
+
+    def _clear(self):
+        self._items.clear()
+        self._volatile.clear()
+        self._length = 0
+        self._bytes = 0
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            while self._items:
+                item = self._items.popleft()
+                payload, size = item
+                if payload is None:  # Dropped
+                    continue
+
+                if self._volatile and self._volatile[0] is item:
+                    self._volatile.popleft()
+                self._length -= 1
+                self._bytes -= size
+
+                if self._ws.closed:
+                    self._clear()
+                    break
+
+                try:
+                    await self._ws.send_payload(payload)
+                except Exception as e:
+                    logging.debug("Error on sending message", exc_info=e)
+                    self._closed = True
+                    self._clear()
+                    return
+
+                self.sent_count += 1
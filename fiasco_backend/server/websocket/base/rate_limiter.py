@@ -0,0 +1,180 @@
+__all__ = [
+    "RateLimit",
+    "RateLimiter",
+    "TokenBucket",
+    "parse_rate_limit_rule",
+]
+
+import time
+
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from fiasco_backend import config
+
+from .connection import WebSocketConnection
+
+
+class RateLimit(NamedTuple):
+    rate: float  # Tokens per second
+    burst: float
+
+
+class TokenBucket:
+
+    __slots__ = ("limit", "tokens", "updated_at")
+
+    def __init__(self, limit: RateLimit):
+        self.limit = limit
+        self.tokens = limit.burst
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float) -> float:
+        self.tokens = min(self.limit.burst, self.tokens + (now - self.updated_at) * self.limit.rate)
+        self.updated_at = now
+
+        return self.tokens
+
+
+def parse_rate_limit_rule(rule: str) -> Tuple[str, str, RateLimit]:
+    """Parse <SCOPE>:<EVENT>=<RATE>/<BURST> rule, e.g. "connection:upsert-element=60/120"."""
+
+    try:
+        target, limit = rule.split("=")
+        scope, event = target.split(":", 1)
+        rate, burst = limit.split("/")
+        rate_limit = RateLimit(rate=float(rate), burst=float(burst))
+    except ValueError:
+        raise ValueError(f"Invalid rate limit rule: {rule} (expected <SCOPE>:<EVENT>=<RATE>/<BURST>)")
+
+    if scope not in RateLimiter.SCOPES:
+        raise ValueError(f"Unsupported rate limit scope: {scope} (available: {', '.join(RateLimiter.SCOPES)})")
+
+    if rate_limit.rate <= 0 or rate_limit.burst < 1:
+        raise ValueError(f"Invalid rate limit: {limit} (rate must be positive, burst at least 1)")
+
+    return scope, event, rate_limit
+
+
+class RateLimiter:
+    """
+    Token bucket limits of the inbound messages per connection and per room (of the connections having a room).
+
+    A limit applies either to a single event or, with "*" event, to all the events together; a message has
+    to fit in all the limits applying to it (the "*" ones are taken first, see <allow>). A throttled connection
+    may exceed the limits by <max_throttled> messages (restored by one per second), then it's to be disconnected.
+    """
+
+    SCOPE_CONNECTION = "connection"
+    SCOPE_ROOM = "room"
+
+    SCOPES = (
+        SCOPE_CONNECTION,
+        SCOPE_ROOM,
+    )
+
+    ANY_EVENT = "*"
+
+    def __init__(self, rules: Optional[Sequence[str]] = None, max_throttled: Optional[int] = None):
+        """
+        :param rules: see <parse_rate_limit_rule>; by default <rate_limits> config value
+        :param max_throttled: by default <rate_limit_max_throttled> config value
+        """
+
+        self._limits: Dict[str, Dict[str, RateLimit]] = {scope: {} for scope in self.SCOPES}
+        for rule in (config.rate_limits if rules is None else rules):
+            scope, event, limit = parse_rate_limit_rule(rule)
+            self._limits[scope][event] = limit
+
+        max_throttled = config.rate_limit_max_throttled if max_throttled is None else max_throttled
+        self._throttled_limit = RateLimit(rate=1, burst=max_throttled)
+
+        self._connection_buckets: Dict[int, Dict[str, TokenBucket]] = {}  # Connection ID -> event -> bucket
+        self._room_buckets: Dict[str, Dict[str, TokenBucket]] = {}
+        self._room_connections_count: Dict[str, int] = defaultdict(int)
+
+        self.throttled_count: Dict[str, int] = defaultdict(int)  # Limited event (or "*") -> throttled messages
+        self.disconnected_count = 0
+
+    def watch(self, connection: WebSocketConnection):
+        self._connection_buckets[id(connection)] = {}
+
+        room = getattr(connection, "room", None)
+        if room is not None:
+            self._room_connections_count[room] += 1
+
+    def forget(self, connection: WebSocketConnection):
+        if self._connection_buckets.pop(id(connection), None) is None:
+            return
+
+        room = getattr(connection, "room", None)
+        if room is not None:
+            self._room_connections_count[room] -= 1
+            if not self._room_connections_count[room]:
+                del self._room_connections_count[room]
+                self._room_buckets.pop(room, None)
+
+    def allow(self, connection: WebSocketConnection, event: str = ANY_EVENT) -> bool:
+        """
+        Take the tokens of the event limits for the message; False if the connection (or its room) is over a limit.
+
+        With "*" event (default), the tokens of the limits of all the events are taken: checked per frame before
+        decoding it, so a flood is not decoded; the limits of the event itself are checked once it's decoded.
+        """
+
+        buckets: List[TokenBucket] = []
+
+        connection_buckets = self._connection_buckets.get(id(connection))
+        if connection_buckets is not None:
+            self._collect_bucket(self.SCOPE_CONNECTION, connection_buckets, event=event, buckets=buckets)
+
+        room = getattr(connection, "room", None)
+        if room is not None and self._limits[self.SCOPE_ROOM]:
+            room_buckets = self._room_buckets.setdefault(room, {})
+            self._collect_bucket(self.SCOPE_ROOM, room_buckets, event=event, buckets=buckets)
+
+        now = time.monotonic()
+        for bucket in buckets:
+            if bucket.refill(now) < 1:
+                self.throttled_count[event] += 1
+                return False
+
+        for bucket in buckets:
+            bucket.tokens -= 1
+
+        return True
+
+    def penalize(self, connection: WebSocketConnection) -> bool:
+        """Count a throttled message of the connection; False if the connection is to be disconnected."""
+
+        connection_buckets = self._connection_buckets.get(id(connection))
+        if connection_buckets is None:
+            return True
+
+        bucket = connection_buckets.get("$throttled")
+        if bucket is None:
+            bucket = connection_buckets["$throttled"] = TokenBucket(self._throttled_limit)
+
+        if bucket.refill(time.monotonic()) < 1:
+            self.disconnected_count += 1
+            return False
+
+        bucket.tokens -= 1
+        return True
+
+    def stats(self):
+        return {
+            "throttled_count": dict(self.throttled_count),
+            "disconnected_count": self.disconnected_count,
+        }
+
+    def _collect_bucket(self, scope: str, scope_buckets: Dict[str, TokenBucket], event: str, buckets: List):
+        limit = self._limits[scope].get(event)
+        if limit is None:
+            return
+
+        bucket = scope_buckets.get(event)
+        if bucket is None:
+            bucket = scope_buckets[event] = TokenBucket(limit)
+
+        buckets.append(bucket)
@@ -3,11 +3,78 @@ __all__ = [
 ]
 
 
-from aiohttp import web
+import zlib
+
+from typing import Any, Optional, Tuple
+
+from aiohttp import WSCloseCode, web
+from aiohttp.http_websocket import WebSocketWriter
+from aiohttp.web_request import BaseRequest
+
+from fiasco_backend import config
+
+from .codecs import Codec, get_codec
 
 
 class WebSocketResponse(web.WebSocketResponse):
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self._close_reason: Optional[Tuple[int, bytes]] = None
+        self._plain_writer: Optional[WebSocketWriter] = None  # Uncompressed one for the messages below the threshold
+
     def __eq__(self, other):
         """Identify client responses for correctly removing/closing etc."""
         return id(self) == id(other)
+
+    @property
+    def codec(self) -> Codec:
+        """Codec of the negotiated subprotocol."""
+
+        return get_codec(self.ws_protocol)
+
+    async def prepare(self, request: BaseRequest):
+        writer = await super().prepare(request)
+
+        # Negotiated permessage-deflate window is the max one; compressing with a smaller window is always valid
+        if self._writer is not None and self._writer.compress:
+            self._writer.compress = min(self._writer.compress, config.ws_compress_window_bits)
+            self._writer._compressobj = zlib.compressobj(
+                level=config.ws_compress_level,
+                wbits=-self._writer.compress
+            )
+            # Same transport; the uncompressed frames don't touch the deflate context of the compressing writer
+            self._plain_writer = WebSocketWriter(self._writer.protocol, self._writer.transport)
+
+        return writer
+
+    async def close(self, *, code: int = WSCloseCode.OK, message: bytes = b"") -> bool:
+        """Close the connection with the code and message of the first call.
+
+        Closing from another task makes the reading task close the connection as well (and first);
+        the client gets the reason of the original call anyway.
+        """
+
+        if self._close_reason is None:
+            self._close_reason = (code, message)
+
+        code, message = self._close_reason
+
+        return await super().close(code=code, message=message)
+
+    async def send_payload(self, payload: Any):
+        """Send the encoded (see <codec>) message, compressing it only if not less than the threshold.
+
+        Called by the outbound queue writer of the connection only (see <OutboundQueue>), so the data frames
+        go out one at a time; the writers are chosen per message, none of their state is changed.
+        """
+
+        writer = self._plain_writer
+        if writer is None or len(payload) >= config.ws_compress_threshold or self._writer._closing:
+            writer = self._writer  # Which raises if closing
+
+        if writer is None:
+            raise RuntimeError("Call .prepare() first")
+
+        await writer.send(payload, binary=isinstance(payload, bytes))
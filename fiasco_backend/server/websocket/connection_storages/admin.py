@@ -1,8 +1,7 @@
-from typing import List, Iterable
+from typing import Dict, Iterable
 
 from fiasco_backend.server.websocket import (
     ConnectionStorage,
-    WebSocketResponse,
 )
 from fiasco_backend.server.websocket.connections import AdminConnection
 
@@ -10,14 +9,17 @@ from fiasco_backend.server.websocket.connections import AdminConnection
 class AdminStorage(ConnectionStorage):
 
     def __init__(self):
-        self._storage: List[WebSocketResponse] = []
+        self._storage: Dict[int, AdminConnection] = {}  # ID -> connection
+
+    @property
+    def connections_count(self) -> int:
+        return len(self._storage)
 
     def add_connection(self, connection: AdminConnection):
-        self._storage.append(connection.ws)
+        self._storage[id(connection)] = connection
 
     def remove_connection(self, connection: AdminConnection):
-        self._storage.remove(connection.ws)
+        self._storage.pop(id(connection), None)
 
     def get_all_connections(self) -> Iterable[AdminConnection]:
-        for connection in self._storage:
-            yield connection
+        yield from self._storage.values()
@@ -2,48 +2,180 @@ __all__ = [
     "PlayerStorage",
 ]
 
-from collections import defaultdict
-from typing import Dict, List, Iterable
+from typing import Dict, Iterable, Optional, Sequence, Set
 
+from fiasco_backend import config
 from fiasco_backend.server.websocket import (
     ConnectionStorage,
 )
 from fiasco_backend.server.websocket.connections import PlayerConnection
+from fiasco_backend.utils.grid import Box, GridIndex
 
 
 class PlayerStorage(ConnectionStorage):
+    """
+    Player connections indexed by room and player.
+
+    Connections are keyed by their object IDs, so adding, removing and the online checks take constant time;
+    empty rooms and players are removed right away, and the lookups never create entries.
+    The connections of a room having a viewport are indexed by it as well (see <get_area_connections>);
+    the ones without a viewport are kept in a plain set of the room, as they are in any area anyway.
+    """
 
     def __init__(self):
-        self._storage: Dict[str, Dict[str, List[PlayerConnection]]] = defaultdict(lambda: defaultdict(list))
+        self._storage: Dict[str, Dict[str, Dict[int, PlayerConnection]]] = {}  # Room -> player -> ID -> connection
+        self._room_connections_count: Dict[str, int] = {}
+        self._connections_count = 0
+
+        self._viewports: Dict[str, GridIndex[PlayerConnection]] = {}  # Room -> connection -> viewport
+        self._no_viewport: Dict[str, Set[PlayerConnection]] = {}  # Room -> connections without a viewport
+
+    @property
+    def connections_count(self) -> int:
+        return self._connections_count
+
+    @property
+    def rooms_count(self) -> int:
+        return len(self._storage)
+
+    @property
+    def players_count(self) -> int:
+        return sum(len(players) for players in self._storage.values())
 
     def add_connection(self, connection: PlayerConnection):
-        self._storage[connection.room][connection.player].append(connection)
+        connections = self._storage.setdefault(connection.room, {}).setdefault(connection.player, {})
+        if id(connection) in connections:
+            return
+
+        connections[id(connection)] = connection
+        self._place(connection, connection.viewport)
+        self._room_connections_count[connection.room] = self._room_connections_count.get(connection.room, 0) + 1
+        self._connections_count += 1
 
     def remove_connection(self, connection: PlayerConnection):
-        self._storage[connection.room][connection.player].remove(connection)
+        players = self._storage.get(connection.room)
+        if players is None:
+            return
+
+        connections = players.get(connection.player)
+        if connections is None or connections.pop(id(connection), None) is None:
+            return
+
+        self._unplace(connection)
+        self._room_connections_count[connection.room] -= 1
+        self._connections_count -= 1
 
-        if not self.is_room_online(room=connection.room):
+        if not connections:
+            del players[connection.player]
+        if not players:
             del self._storage[connection.room]
-        elif not self.is_player_online(room=connection.room, player=connection.player):
-            del self._storage[connection.room][connection.player]
+            del self._room_connections_count[connection.room]
 
     def is_room_online(self, room: str) -> bool:
-        return room in self._storage and bool(sum(len(self._storage[room][p]) for p in self._storage[room]))
+        return room in self._storage
 
     def is_player_online(self, room: str, player: str) -> bool:
-        return player in self._storage[room] and bool(len(self._storage[room][player]))
+        players = self._storage.get(room)
+
+        return players is not None and player in players
+
+    def get_rooms(self) -> Iterable[str]:
+        return self._storage.keys()
+
+    def get_room_connections_count(self, room: str) -> int:
+        return self._room_connections_count.get(room, 0)
 
     def get_all_connections(self) -> Iterable[PlayerConnection]:
-        for room, players in self._storage.items():
-            for player, connections in players.items():
-                for connection in connections:
-                    yield connection
+        for players in self._storage.values():
+            for connections in players.values():
+                yield from connections.values()
 
     def get_room_connections(self, room: str) -> Iterable[PlayerConnection]:
-        for player, connections in self._storage[room].items():
-            for connection in connections:
-                yield connection
+        for connections in self._storage.get(room, {}).values():
+            yield from connections.values()
+
+    def get_area_connections(self, room: str, area: Optional[Sequence[Box]] = None) -> Iterable[PlayerConnection]:
+        """Get the room connections having no viewport or the one intersecting any of the area boxes.
+
+        Takes the grid cells of the area only, so does not depend on the number of the room connections.
+        """
+
+        viewports = self._viewports.get(room)
+        if area is None or viewports is None:
+            return self.get_room_connections(room=room)
+
+        connections = viewports.query(area)
+        connections.update(self._no_viewport.get(room, ()))
+
+        return connections
+
+    def is_connection_in_area(self, connection: PlayerConnection, area: Optional[Sequence[Box]] = None) -> bool:
+        viewports = self._viewports.get(connection.room)
+        if area is None or viewports is None or connection not in viewports:
+            return True
+
+        return viewports.intersects(connection, area)
+
+    def set_viewport(self, connection: PlayerConnection, viewport: Optional[Box]):
+        stored = (
+            connection in self._no_viewport.get(connection.room, ())
+            or connection in self._viewports.get(connection.room, ())
+        )
+
+        connection.viewport = viewport
+
+        if stored:
+            self._unplace(connection)
+            self._place(connection, viewport)
+
+    def get_room_players(self, room: str) -> Iterable[str]:
+        return tuple(self._storage.get(room, ()))
+
+    def get_room_outbound_stats(self, room: str) -> Dict[str, int]:
+        return self._get_outbound_stats(self.get_room_connections(room=room))
+
+    def get_outbound_stats(self) -> Dict[str, int]:
+        return self._get_outbound_stats(self.get_all_connections())
 
     def get_player_connections(self, room: str, player: str) -> Iterable[PlayerConnection]:
-        for connection in self._storage[room][player]:
-            yield connection
+        yield from self._storage.get(room, {}).get(player, {}).values()
+
+    @staticmethod
+    def _get_outbound_stats(connections: Iterable[PlayerConnection]) -> Dict[str, int]:
+        stats = {
+            "depth": 0,
+            "bytes": 0,
+            "sent_count": 0,
+            "dropped_count": 0,
+        }
+
+        for connection in connections:
+            for key, value in connection.outbound.stats().items():
+                stats[key] += value
+
+        return stats
+
+    def _place(self, connection: PlayerConnection, viewport: Optional[Box]):
+        if viewport is None:
+            self._no_viewport.setdefault(connection.room, set()).add(connection)
+            return
+
+        viewports = self._viewports.get(connection.room)
+        if viewports is None:
+            viewports = self._viewports[connection.room] = GridIndex(cell_size=config.viewport_cell_size)
+
+        viewports.add(connection, viewport)
+
+    def _unplace(self, connection: PlayerConnection):
+        connections = self._no_viewport.get(connection.room)
+        if connections is not None and connection in connections:
+            connections.remove(connection)
+            if not connections:
+                del self._no_viewport[connection.room]
+            return
+
+        viewports = self._viewports.get(connection.room)
+        if viewports is not None:
+            viewports.remove(connection)
+            if not len(viewports):
+                del self._viewports[connection.room]
@@ -6,5 +6,6 @@ from fiasco_backend.server.websocket import WebSocketConnection
 
 
 class AdminConnection(WebSocketConnection):
-    pass
+
+    __slots__ = ()
 
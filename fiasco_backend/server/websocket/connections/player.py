@@ -2,6 +2,12 @@ __all__ = [
     "PlayerConnection",
 ]
 
+import sys
+
+from typing import Any, Dict, Optional, Tuple
+
+from fiasco_backend.utils.grid import Box
+
 from fiasco_backend.server.websocket import (
     WebSocketConnection,
     WebSocketError,
@@ -11,6 +17,8 @@ from fiasco_backend.server.websocket import (
 
 class PlayerConnection(WebSocketConnection):
 
+    __slots__ = ("_room", "_player", "_batch", "_resume", "_version", "_viewport")
+
     def __init__(self, ws: WebSocketResponse, **params):
         if "room" not in params:
             raise WebSocketError("No <room> provided for player connection")
@@ -18,13 +26,60 @@ class PlayerConnection(WebSocketConnection):
         if "player" not in params:
             raise WebSocketError("No <player> provided for player connection")
 
+        # Interned, so the connections (and storage keys) of a room or player share a single string
+        self._room = sys.intern(params.pop("room"))
+        self._player = sys.intern(params.pop("player"))
+        self._batch = params.pop("batch", False)
+        self._resume = params.pop("resume", None)
+        self._version = params.pop("version", None)
+        self._viewport = params.pop("viewport", None)
+
         super().__init__(ws=ws, **params)
 
     @property
-    def room(self):
-        return self._params["room"]
+    def params(self) -> Dict[str, Any]:
+        return {
+            "room": self._room,
+            "player": self._player,
+            "batch": self._batch,
+            "resume": self._resume,
+            "version": self._version,
+            "viewport": self._viewport,
+            **super().params,
+        }
 
     @property
-    def player(self):
-        return self._params["player"]
+    def room(self) -> str:
+        return self._room
+
+    @property
+    def player(self) -> str:
+        return self._player
+
+    @property
+    def batch(self) -> bool:
+        """Whether the connection receives room messages collected into frames (JSON arrays)."""
+
+        return self._batch
+
+    @property
+    def resume(self) -> Optional[Tuple[str, int]]:
+        """Epoch and sequence number of the last room message received by the client before reconnection."""
+
+        return self._resume
+
+    @property
+    def version(self) -> Optional[int]:
+        """Version of the room elements held by the client (received with the initial data before)."""
+
+        return self._version
+
+    @property
+    def viewport(self) -> Optional[Box]:
+        """Board area shown by the client; element updates outside of it are not sent (None for the whole board)."""
+
+        return self._viewport
 
+    @viewport.setter
+    def viewport(self, viewport: Optional[Box]):
+        self._viewport = viewport
@@ -17,10 +17,15 @@ from aiohttp import web
 from aiohttp.web_request import Request
 from marshmallow import ValidationError
 
+from fiasco_backend import config
+
 from .base import (
+    CODECS,
     Authorizer,
+    heartbeat_monitor,
     NotAuthorizedError,
     Message,
+    RateLimiter,
     WebSocketConnection,
     WebSocketResponse,
     ConnectionClosedError,
@@ -45,11 +50,17 @@ class DefaultEventListener:
 class WebSocketHandler:
     EVENT_USER_CONNECTED = "$user-connected"
     EVENT_USER_DISCONNECTED = "$user-disconnected"
+    EVENT_ERROR = "$error"
+
+    THROTTLED_ERROR = "Too many messages"
+    THROTTLED_CLOSE_CODE = aiohttp.WSCloseCode.POLICY_VIOLATION
+    THROTTLED_CLOSE_MESSAGE = b"Too many messages"
 
     def __init__(
         self,
         authorizer: Optional[Authorizer] = None,
-        event_listeners: Optional[Sequence[Callable]] = None
+        event_listeners: Optional[Sequence[Callable]] = None,
+        rate_limiter: Optional[RateLimiter] = None
     ):
         if authorizer is None:
             authorizer = DefaultAuthorizer()
@@ -58,17 +69,35 @@ class WebSocketHandler:
 
         self._authorizer = authorizer
         self._event_listeners = event_listeners
+        self._rate_limiter = rate_limiter
+
+        if len(event_listeners) == 1:  # The usual case; called directly instead of looping over the listeners
+            self._send_event = event_listeners[0]
 
     async def __call__(self, request: Request):
-        ws = WebSocketResponse()
+        # Pings are answered and pongs are received by <_read_messages>, so both count as activity.
+        # Larger messages close the connection (code 1009) before being read whole, not to say parsed
+        ws = WebSocketResponse(
+            protocols=tuple(CODECS),
+            compress=bool(config.ws_compress_level),
+            autoping=False,
+            max_msg_size=config.max_message_size
+        )
         await ws.prepare(request)
 
         try:
             connection = await self._authorizer.authorize(request=request, ws=ws)
+            try:
+                connection.outbound.start()
+                heartbeat_monitor.watch(connection)
+                if self._rate_limiter is not None:
+                    self._rate_limiter.watch(connection)
 
-            await self.on_user_connected(connection=connection)
+                await self.on_user_connected(connection=connection)
 
-            await self._read_messages(connection)
+                await self._read_messages(connection)
+            finally:
+                await self._close_connection(connection)
         except (ConnectionClosedError, NotAuthorizedError) as e:
             msg = str(e)
             if not ws.closed:
@@ -90,29 +119,74 @@ class WebSocketHandler:
         await self._send_event(message=message, connection=connection)
 
     async def _read_messages(self, connection: WebSocketConnection):
-        try:
-            async for msg in connection.ws:
-                if msg.type == aiohttp.WSMsgType.ERROR:
-                    logging.error(f"ws connection closed with exception {connection.ws.exception()}")
-                elif msg.type == aiohttp.WSMsgType.TEXT:
-                    try:
-                        message = Message.from_str(msg.data)
-                        if message.event.startswith("$"):
-                            await connection.ws.send_str("Forbidden")
-                            continue
-
-                    except ValidationError as e:
-                        await connection.ws.send_json(e.messages)
+        """Read the messages till the connection is closed; the replies go through the connection queue as others."""
+
+        rate_limiter = self._rate_limiter
+
+        async for msg in connection.ws:
+            connection.touch()
+
+            if msg.type == aiohttp.WSMsgType.PING:
+                await connection.ws.pong(msg.data)
+            elif msg.type == aiohttp.WSMsgType.PONG:
+                pass
+            elif msg.type == aiohttp.WSMsgType.ERROR:
+                logging.error(f"ws connection closed with exception {connection.ws.exception()}")
+            elif msg.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                if rate_limiter is not None and not rate_limiter.allow(connection):  # Not decoded, if over limits
+                    await self._throttle(connection)
+                    continue
+
+                try:
+                    message = self._decode_message(msg, connection=connection)
+                    if rate_limiter is not None and not rate_limiter.allow(connection, message.event):
+                        await self._throttle(connection)
                         continue
 
-                    except Exception as e:
-                        logging.exception("An error occurred", exc_info=e)
-                        await connection.ws.send_str(f"An error occurred")
+                    if message.event.startswith("$"):
+                        connection.send("Forbidden")
                         continue
 
-                    await self._send_event(message=message, connection=connection)
-        finally:
-            await self._close_connection(connection)
+                except ValidationError as e:
+                    connection.send(connection.ws.codec.encode(e.messages))
+                    continue
+
+                except Exception as e:
+                    logging.exception("An error occurred", exc_info=e)
+                    connection.send("An error occurred")
+                    continue
+
+                await self._send_event(message=message, connection=connection)
+
+    async def _throttle(self, connection: WebSocketConnection):
+        """Drop the message over the rate limits with an error; close the connection keeping exceeding them."""
+
+        if self._rate_limiter.penalize(connection):
+            connection.send(connection.ws.codec.encode({
+                "event": self.EVENT_ERROR,
+                "data": {
+                    "error": self.THROTTLED_ERROR,
+                },
+            }))
+            return
+
+        logging.info("Closing connection exceeding rate limits")
+        await connection.ws.close(code=self.THROTTLED_CLOSE_CODE, message=self.THROTTLED_CLOSE_MESSAGE)
+
+    @classmethod
+    def _decode_message(cls, msg: aiohttp.WSMessage, connection: WebSocketConnection) -> Message:
+        if msg.type == aiohttp.WSMsgType.TEXT:
+            return Message.from_str(msg.data)
+
+        codec = connection.ws.codec
+        if not codec.binary:
+            raise ValidationError("Binary messages are not supported by the negotiated protocol")
+
+        data = codec.decode(msg.data)
+        if not isinstance(data, dict):
+            raise ValidationError("Invalid input type.")
+
+        return Message.from_dict(data)
 
     async def _close_connection(
         self,
@@ -124,7 +198,12 @@ class WebSocketHandler:
                 await connection.ws.send_str(message)
             await connection.ws.close()
 
+        heartbeat_monitor.unwatch(connection)
+        if self._rate_limiter is not None:
+            self._rate_limiter.forget(connection)
+
         await self.on_user_disconnected(connection=connection)
+        await connection.outbound.stop()
 
     async def _send_event(self, message: Message, connection: WebSocketConnection):
         for listener in self._event_listeners:
@@ -28,6 +28,7 @@ class AdminMessageSender:
         sender: str,
         target: Optional[str] = TARGET_DIRECT,
         connection: Optional[WebSocketConnection] = None,
+        volatile: bool = False
     ):
         if target == self.TARGET_DIRECT:
             connections = (connection, )
@@ -38,7 +39,8 @@ class AdminMessageSender:
 
         send_message(
             message=message,
-            wss=(c.ws for c in connections),
+            connections=connections,
             target=target,
-            sender=sender
+            sender=sender,
+            volatile=volatile
         )
@@ -1,37 +1,83 @@
 __all__ = [
+    "message_to_dict",
     "send_message",
+    "send_data",
 ]
 
-import asyncio
+import time
 
-from typing import Iterable
-
-import simplejson
+from typing import Any, Dict, Iterable, List, Union
 
 from fiasco_backend.server.websocket import (
     Message,
-    WebSocketResponse,
+    WebSocketConnection,
+)
+from fiasco_backend.utils.metrics import SIZE_BUCKETS, metrics
+
+FANOUT_SIZE = metrics.histogram(
+    "fiasco_fanout_connections",
+    "Connections a message (frame) is enqueued to",
+    buckets=SIZE_BUCKETS,
+)
+FANOUT_LATENCY = metrics.histogram(
+    "fiasco_fanout_seconds",
+    "Time to serialize and enqueue a message (frame) to its connections",
 )
 
 
 def send_message(
     message: Message,
-    wss: Iterable[WebSocketResponse],
+    connections: Iterable[WebSocketConnection],
     target: str,
-    sender: str
+    sender: str,
+    volatile: bool = False
 ):
-    for ws in wss:
-        if ws.closed:
+    """
+    Enqueue the message to all the connections, serializing it once per codec (on the first open connection).
+
+    Volatile messages may be dropped for slow consumers (see <OutboundQueue>).
+    """
+
+    send_data(
+        data=message_to_dict(message=message, target=target, sender=sender),
+        connections=connections,
+        volatile=volatile
+    )
+
+
+def send_data(
+    data: Union[Dict[str, Any], List[Dict[str, Any]]],
+    connections: Iterable[WebSocketConnection],
+    volatile: bool = False
+):
+    """
+    Enqueue the message (see <message_to_dict>) or list of messages (single frame) to all the connections,
+    serializing it once per codec (on the first open connection).
+    """
+
+    started_at = time.perf_counter()
+
+    payloads = {}
+    count = 0
+    for connection in connections:
+        if connection.ws.closed:
             continue
 
-        asyncio.run_coroutine_threadsafe(
-            ws.send_json(
-                dumps=simplejson.dumps,
-                data={
-                    **message.to_disc(),
-                    "sender": sender,
-                    "target": target
-                }
-            ),
-            asyncio.get_event_loop()
-        )
+        codec = connection.ws.codec
+        payload = payloads.get(codec.name)
+        if payload is None:
+            payload = payloads[codec.name] = codec.encode(data)
+
+        connection.send(payload, volatile=volatile)
+        count += 1
+
+    FANOUT_LATENCY.observe(time.perf_counter() - started_at)
+    FANOUT_SIZE.observe(count)
+
+
+def message_to_dict(message: Message, target: str, sender: str) -> Dict[str, Any]:
+    return {
+        **message.to_disc(),
+        "sender": sender,
+        "target": target
+    }
@@ -2,26 +2,75 @@ __all__ = [
     "PlayerMessageSender",
 ]
 
-from typing import Optional
+import asyncio
+import logging
 
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from fiasco_backend import config
+from fiasco_backend.server.bus import Bus, get_bus
+from fiasco_backend.server.room_actors import room_actors
 from fiasco_backend.server.websocket import (
     WebSocketConnection,
     WebSocketError,
     Message,
 )
 from fiasco_backend.server.websocket.connection_storages import PlayerStorage
+from fiasco_backend.server.websocket.connections import PlayerConnection
+from fiasco_backend.utils.grid import Box
 
-from .message_sending import send_message
+from .message_sending import message_to_dict, send_data, send_message
+from .room_event_log import Event, RoomEventLog
 
 
 class PlayerMessageSender:
+    """
+    Sends messages to the player connections of this node, and to the ones of the other nodes through the bus.
+
+    The room and player targeted messages are published to the room channel, which the node is subscribed to
+    while it has connections in the room. Presence changes (a player got the first or lost the last connection
+    on a node) are published to the presence channel, so every node knows the online players of all the nodes.
+
+    A room message may carry the board area it concerns, then only the connections with the viewports
+    intersecting the area (or with no viewport) receive it.
+    """
+
     TARGET_DIRECT = "direct"
     TARGET_PLAYER = "player"
     TARGET_ROOM = "room"
     TARGET_BROADCAST = "broadcast"
 
-    def __init__(self, storage: PlayerStorage):
+    ROOM_CHANNEL_PREFIX = "room:"
+    BROADCAST_CHANNEL = "broadcast"
+    PRESENCE_CHANNEL = "presence"
+
+    BUS_PRESENCE = "presence"
+    BUS_PRESENCE_REQUEST = "presence-request"
+
+    def __init__(self, storage: PlayerStorage, batch_tick: Optional[float] = None, bus: Optional[Bus] = None):
+        """
+        :param batch_tick: time (in seconds) to collect room messages into a single frame for the connections
+            supporting batches (0 to disable); by default <room_batch_tick> config value
+        :param bus: by default the bus of the process
+        """
+
         self._storage = storage
+        self._batch_tick = config.room_batch_tick if batch_tick is None else batch_tick
+
+        self._room_batches: Dict[str, List[Tuple[Dict[str, Any], bool, Optional[List[Box]]]]] = {}
+        self._room_batch_timers: Dict[str, asyncio.TimerHandle] = {}
+
+        self._event_log = RoomEventLog()
+
+        self._bus = get_bus() if bus is None else bus
+        self._bus.subscribe(self.BROADCAST_CHANNEL, self._on_broadcast_message)
+        self._bus.subscribe(self.PRESENCE_CHANNEL, self._on_presence_message)
+        self._bus.on_connected(self._on_bus_connected)
+        self._bus.on_node_left(self._on_node_left)
+
+        self._rooms: Set[str] = set()  # Rooms having connections on this node
+        self._remote_players: Dict[str, Dict[str, Set[str]]] = {}  # Room -> player -> IDs of the nodes
+        self._offline_callbacks: Dict[Tuple[str, str], Callable[[], Awaitable]] = {}
 
     async def send_message(
         self,
@@ -30,22 +79,295 @@ class PlayerMessageSender:
         target: Optional[str] = TARGET_ROOM,
         connection: Optional[WebSocketConnection] = None,
         room: Optional[str] = None,
-        player: Optional[str] = None
+        player: Optional[str] = None,
+        volatile: bool = False,
+        area: Optional[Sequence[Optional[Box]]] = None
     ):
+        """
+        :param area: boxes of the board the room message concerns (e.g. the old and the new element positions);
+            None (or a None box) for the whole board
+        """
+
         if target == self.TARGET_DIRECT:
-            connections = (connection, )
+            self.flush_room_batch(room=connection.room)
+            send_message(
+                message=message,
+                connections=(connection, ),
+                target=target,
+                sender=sender,
+                volatile=volatile
+            )
+            return
+
+        bus_message = {
+            "data": message_to_dict(message=message, target=target, sender=sender),
+            "volatile": volatile,
+        }
+
+        if target == self.TARGET_ROOM:
+            if area is not None and None not in area:
+                bus_message["area"] = [list(box) for box in area]
+            self._bus.publish(self._get_room_channel(room), bus_message)
         elif target == self.TARGET_PLAYER:
-            connections = self._storage.get_player_connections(room=room, player=player)
-        elif target == self.TARGET_ROOM:
-            connections = self._storage.get_room_connections(room=room)
+            bus_message["player"] = player
+            self._bus.publish(self._get_room_channel(room), bus_message)
         elif target == self.TARGET_BROADCAST:
-            connections = self._storage.get_all_connections()
+            self._bus.publish(self.BROADCAST_CHANNEL, bus_message)
         else:
             raise WebSocketError(f"Unsupported target: {target}")
 
-        send_message(
-            message=message,
-            wss=(c.ws for c in connections),
-            target=target,
-            sender=sender
+    def flush_room_batch(self, room: str):
+        """Send the collected room messages as a single frame to the room connections supporting batches."""
+
+        timer = self._room_batch_timers.pop(room, None)
+        if timer is not None:
+            timer.cancel()
+
+        batch = self._room_batches.pop(room, None)
+        if not batch:
+            return
+
+        connections = (c for c in self._storage.get_room_connections(room=room) if c.batch)
+
+        if all(area is None for _, _, area in batch):
+            send_data(
+                data=[message for message, _, _ in batch],
+                connections=connections,
+                volatile=all(volatile for _, volatile, _ in batch)
+            )
+            return
+
+        # The connections seeing the same messages of the batch share the frame
+        frames: Dict[Tuple[int, ...], List[PlayerConnection]] = {}
+        for connection in connections:
+            frame = tuple(
+                i for i, (_, _, area) in enumerate(batch)
+                if self._storage.is_connection_in_area(connection, area=area)
+            )
+            if frame:
+                frames.setdefault(frame, []).append(connection)
+
+        for frame, frame_connections in frames.items():
+            send_data(
+                data=[batch[i][0] for i in frame],
+                connections=frame_connections,
+                volatile=all(batch[i][1] for i in frame)
+            )
+
+    def get_room_seq(self, room: str) -> Tuple[str, int]:
+        """Get the epoch (of this node's room message numbering) and sequence number of the last room message."""
+
+        return self._event_log.last_seq(room=room)
+
+    def get_room_messages(self, room: str, epoch: str, seq: int) -> Optional[List[Event]]:
+        """Get the room messages (with their areas) following <seq> of the <epoch>; None if some are not kept."""
+
+        return self._event_log.since(room=room, epoch=epoch, seq=seq)
+
+    def resend_messages(self, messages: List[Event], connection: PlayerConnection):
+        """Send the (already sent to the room) messages to the connection, the ones of its viewport only."""
+
+        self.flush_room_batch(room=connection.room)
+
+        messages = [
+            message for message, area in messages
+            if self._storage.is_connection_in_area(connection, area=area)
+        ]
+
+        if connection.batch:
+            if messages:
+                send_data(data=messages, connections=(connection, ))
+            return
+
+        for message in messages:
+            send_data(data=message, connections=(connection, ))
+
+    def acquire_room(self, room: str):
+        """Mark the room as active (has connections), so its messages are received and the recent ones are kept."""
+
+        self._event_log.acquire(room=room)
+
+        if room in self._rooms:
+            return
+
+        self._rooms.add(room)
+        self._bus.subscribe(self._get_room_channel(room), self._on_room_message)
+
+    def release_room(self, room: str):
+        """Mark the room as inactive (no connections), so its recent messages may be dropped."""
+
+        self._event_log.release(room=room)
+
+        if room not in self._rooms:
+            return
+
+        self._rooms.discard(room)
+        self._bus.unsubscribe(self._get_room_channel(room), self._on_room_message)
+
+    def publish_presence(self, room: str, player: str, online: bool, announced: bool = True):
+        """Let the other nodes know the player got (or no longer has) connections on this node.
+
+        :param announced: whether this node announces the player disconnected (not being online elsewhere)
+        """
+
+        if online:
+            self._offline_callbacks.pop((room, player), None)
+
+        self._bus.publish(self.PRESENCE_CHANNEL, {
+            "type": self.BUS_PRESENCE,
+            "room": room,
+            "player": player,
+            "online": online,
+            "announced": announced,
+        })
+
+    def wait_player_offline(self, room: str, player: str, callback: Callable[[], Awaitable]):
+        """Run the (async) callback once the player leaves the other nodes without them announcing it.
+
+        Happens when the player's last connections on several nodes close at the same time, so each of the nodes
+        sees the player online on the other one; the node with the lowest ID runs the callback (on the room actor) then.
+        """
+
+        self._offline_callbacks[(room, player)] = callback
+
+    def is_player_online_elsewhere(self, room: str, player: str) -> bool:
+        """Whether the player has connections on the other nodes."""
+
+        return player in self._remote_players.get(room, ())
+
+    def get_remote_players(self, room: str) -> Iterable[str]:
+        """Get the players having connections on the other nodes."""
+
+        return tuple(self._remote_players.get(room, ()))
+
+    def _get_room_channel(self, room: str) -> str:
+        return self.ROOM_CHANNEL_PREFIX + room
+
+    def _on_room_message(self, channel: str, message: Dict[str, Any], node: str):
+        room = channel[len(self.ROOM_CHANNEL_PREFIX):]
+
+        player = message.get("player")
+        if player is None:
+            data = {**message["data"]}  # Numbered by each node on its own, so the bus message stays intact
+            self._event_log.append(room=room, message=data, area=message.get("area"))
+            self._send_room_data(
+                data=data,
+                room=room,
+                volatile=message["volatile"],
+                area=message.get("area")
+            )
+        elif self._storage.is_player_online(room=room, player=player):
+            self.flush_room_batch(room=room)
+            send_data(
+                data=message["data"],
+                connections=self._storage.get_player_connections(room=room, player=player),
+                volatile=message["volatile"]
+            )
+
+    def _on_broadcast_message(self, channel: str, message: Dict[str, Any], node: str):
+        for batch_room in tuple(self._room_batches):
+            self.flush_room_batch(room=batch_room)
+
+        send_data(
+            data=message["data"],
+            connections=self._storage.get_all_connections(),
+            volatile=message["volatile"]
         )
+
+    def _on_presence_message(self, channel: str, message: Dict[str, Any], node: str):
+        if node == self._bus.node_id:
+            return
+
+        message_type = message["type"]
+        if message_type == self.BUS_PRESENCE:
+            self._set_remote_player(
+                room=message["room"],
+                player=message["player"],
+                node=node,
+                online=message["online"]
+            )
+
+            if not message["online"]:
+                self._check_player_offline(
+                    room=message["room"],
+                    player=message["player"],
+                    announce=not message["announced"] and self._bus.node_id < node
+                )
+        elif message_type == self.BUS_PRESENCE_REQUEST:
+            self._publish_all_presence()
+        else:
+            logging.warning("Unsupported bus presence message type: %s", message_type)
+
+    def _on_bus_connected(self):
+        # The other nodes may have forgotten this one (e.g. on reconnection), and this one knows nothing about them
+        self._publish_all_presence()
+        self._bus.publish(self.PRESENCE_CHANNEL, {
+            "type": self.BUS_PRESENCE_REQUEST,
+        })
+
+    def _on_node_left(self, node: str):
+        for room, players in tuple(self._remote_players.items()):
+            for player in tuple(players):
+                self._set_remote_player(room=room, player=player, node=node, online=False)
+                self._check_player_offline(room=room, player=player, announce=True)
+
+    def _check_player_offline(self, room: str, player: str, announce: bool):
+        if self.is_player_online_elsewhere(room=room, player=player):
+            return
+
+        callback = self._offline_callbacks.pop((room, player), None)
+        if callback is not None and announce:
+            room_actors.defer(room=room, job=callback)
+
+    def _publish_all_presence(self):
+        for room in self._rooms:
+            for player in self._storage.get_room_players(room=room):
+                self.publish_presence(room=room, player=player, online=True)
+
+    def _set_remote_player(self, room: str, player: str, node: str, online: bool):
+        if online:
+            self._remote_players.setdefault(room, {}).setdefault(player, set()).add(node)
+            return
+
+        players = self._remote_players.get(room)
+        if players is None or player not in players:
+            return
+
+        players[player].discard(node)
+        if not players[player]:
+            del players[player]
+        if not players:
+            del self._remote_players[room]
+
+    def _send_room_data(self, data: Dict[str, Any], room: str, volatile: bool, area: Optional[List[Box]] = None):
+        if not self._batch_tick:
+            send_data(
+                data=data,
+                connections=self._storage.get_area_connections(room=room, area=area),
+                volatile=volatile
+            )
+            return
+
+        connections: List[PlayerConnection] = []
+        has_batch_connections = False
+        for connection in self._storage.get_area_connections(room=room, area=area):
+            if connection.batch:
+                has_batch_connections = True
+            else:
+                connections.append(connection)
+
+        # Connections not supporting batches receive single messages right away
+        send_data(data=data, connections=connections, volatile=volatile)
+
+        if not has_batch_connections:
+            return
+
+        if room not in self._room_batches:
+            self._room_batches[room] = []
+            self._room_batch_timers[room] = asyncio.get_event_loop().call_later(
+                self._batch_tick,
+                self.flush_room_batch,
+                room
+            )
+
+        self._room_batches[room].append((data, volatile, area))
@@ -0,0 +1,116 @@
+__all__ = [
+    "RoomEventLog",
+]
+
+import time
+import uuid
+
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from fiasco_backend import config
+from fiasco_backend.utils.grid import Box
+
+Event = Tuple[Dict[str, Any], Optional[List[Box]]]  # Message and the board area it concerns (None for all)
+
+
+class RoomLog:
+
+    __slots__ = ("epoch", "seq", "events")
+
+    def __init__(self, seq: int, size: int):
+        self.epoch = uuid.uuid4().hex[:16]
+        self.seq = seq
+        self.events: Deque[Event] = deque(maxlen=size)
+
+
+class RoomEventLog:
+    """
+    Bounded per-room ring buffers of the recent room messages with monotonically increasing sequence numbers.
+
+    Sequence numbers of a room start from the current time in microseconds, so ones of a dropped
+    (and recreated) room log never repeat. Each node numbers the room messages on its own, so the numbers
+    are only comparable within a log, identified by its (random) epoch: a client resumes with both.
+    """
+
+    SEQ_KEY = "seq"
+
+    def __init__(self, size: Optional[int] = None, ttl: Optional[float] = None):
+        """
+        :param size: max events kept per room; by default <room_event_log_size> config value
+        :param ttl: time (in seconds) to keep the log of a room without connections;
+            by default <presence_grace_period> config value
+        """
+
+        self._size = config.room_event_log_size if size is None else size
+        self._ttl = config.presence_grace_period if ttl is None else ttl
+
+        self._rooms: Dict[str, RoomLog] = {}
+        self._idle: "OrderedDict[str, float]" = OrderedDict()  # Room -> released at; the oldest first
+
+    def append(self, room: str, message: Dict[str, Any], area: Optional[List[Box]] = None) -> int:
+        """Set the next room sequence number to the message (see <message_to_dict>) and keep it with its area.
+
+        The message is kept as is, so it must be owned by the log (e.g. not the one shared by the bus handlers).
+        """
+
+        log = self._get_log(room)
+
+        log.seq += 1
+        message[self.SEQ_KEY] = log.seq
+        log.events.append((message, area))
+
+        return log.seq
+
+    def last_seq(self, room: str) -> Tuple[str, int]:
+        """Get the epoch of the room log and the sequence number of the last room message."""
+
+        log = self._get_log(room)
+
+        return log.epoch, log.seq
+
+    def since(self, room: str, epoch: str, seq: int) -> Optional[List[Event]]:
+        """Get the room messages (with their areas) following <seq>; None if some of them are not kept anymore.
+
+        None for the <seq> of another log (<epoch>) as well, e.g. the one of another node or a dropped log.
+        """
+
+        log = self._rooms.get(room)
+        if log is None or epoch != log.epoch or seq > log.seq:
+            return None
+
+        missed = log.seq - seq
+        if missed > len(log.events):
+            return None
+
+        return list(log.events)[len(log.events) - missed:]
+
+    def acquire(self, room: str):
+        """Mark the room as active (has connections), so its log is kept."""
+
+        self._idle.pop(room, None)
+        self._evict()
+
+    def release(self, room: str):
+        """Mark the room as inactive (no connections), so its log is dropped after the TTL."""
+
+        if room in self._rooms:
+            self._idle[room] = time.time()
+        self._evict()
+
+    def _get_log(self, room: str) -> RoomLog:
+        log = self._rooms.get(room)
+        if log is None:
+            log = self._rooms[room] = RoomLog(seq=int(time.time() * 1_000_000), size=self._size)
+
+        return log
+
+    def _evict(self):
+        expired_at = time.time() - self._ttl
+        while self._idle:
+            room, released_at = next(iter(self._idle.items()))
+            if released_at > expired_at:
+                break
+
+            del self._idle[room]
+            self._rooms.pop(room, None)
@@ -0,0 +1,192 @@
+"""
+Multi-worker mode.
+
+The master process runs the bus hub and spawns the workers; every worker listens on the same public port
+(SO_REUSEPORT lets the kernel balance the connections) and on its own internal Unix socket.
+Rooms are assigned to the workers by consistent hashing: a player connection accepted by another worker
+is proxied to the room worker's socket, so the state and fan-out of a room stay within a single process.
+"""
+
+__all__ = [
+    "RoomAffinityHandler",
+    "get_worker_socket_path",
+    "run_workers",
+]
+
+import asyncio
+import logging
+import multiprocessing
+import signal
+
+from dataclasses import asdict
+from typing import Awaitable, Callable, Dict, List
+
+import aiohttp
+
+from aiohttp import web
+from aiohttp.web_request import Request
+
+from fiasco_backend import config
+from fiasco_backend.server.bus import BusHub
+from fiasco_backend.server.websocket import CODECS, WebSocketResponse
+from fiasco_backend.utils.hash_ring import HashRing
+
+WORKER_CHECK_INTERVAL = 1  # Seconds
+WORKER_STOP_TIMEOUT = 30  # Seconds
+
+
+def get_worker_socket_path(worker: int) -> str:
+    return config.worker_socket_path.format(worker=worker)
+
+
+class RoomAffinityHandler:
+    """Handles the player connections of the rooms assigned to this worker, proxies the others to their workers."""
+
+    CLOSE_CODE = aiohttp.WSCloseCode.TRY_AGAIN_LATER
+    CLOSE_MESSAGE = b"Worker unavailable"
+
+    def __init__(self, handler: Callable[[Request], Awaitable[web.StreamResponse]], worker: int, workers: int):
+        self._handler = handler
+        self._worker = worker
+        self._ring = HashRing(nodes=range(workers))
+
+        self._sessions: Dict[int, aiohttp.ClientSession] = {}
+
+    async def __call__(self, request: Request):
+        room = request.query.get("room")
+        if room is None:  # Rejected by the handler
+            return await self._handler(request)
+
+        worker = self._ring.get_node(room)
+        if worker == self._worker:
+            return await self._handler(request)
+
+        return await self._proxy(request=request, worker=worker)
+
+    async def on_cleanup(self, app):
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions = {}
+
+    async def _proxy(self, request: Request, worker: int):
+        # Pings and pongs are forwarded, so the room worker's heartbeat reaches the client
+        ws = WebSocketResponse(
+            protocols=tuple(CODECS),
+            compress=bool(config.ws_compress_level),
+            autoping=False,
+            max_msg_size=config.max_message_size
+        )
+        await ws.prepare(request)
+
+        try:
+            upstream = await self._get_session(worker).ws_connect(
+                f"http://worker{request.path_qs}",
+                protocols=(ws.ws_protocol, ) if ws.ws_protocol else (),
+                compress=0,
+                max_msg_size=0,
+                autoping=False
+            )
+        except aiohttp.ClientError as e:
+            logging.error("Failed to proxy connection to worker %s: %s", worker, e)
+            await ws.close(code=self.CLOSE_CODE, message=self.CLOSE_MESSAGE)
+            return ws
+
+        await self._pipe(ws, upstream)
+
+        return ws
+
+    @classmethod
+    async def _pipe(cls, ws: WebSocketResponse, upstream: aiohttp.ClientWebSocketResponse):
+        tasks = (
+            asyncio.create_task(cls._forward(ws, upstream)),
+            asyncio.create_task(cls._forward(upstream, ws)),
+        )
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            if not upstream.closed:
+                await upstream.close()
+            if not ws.closed:
+                await ws.close(code=upstream.close_code or aiohttp.WSCloseCode.OK)
+
+    @staticmethod
+    async def _forward(source, target):
+        async for msg in source:
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                await target.send_str(msg.data)
+            elif msg.type == aiohttp.WSMsgType.BINARY:
+                await target.send_bytes(msg.data)
+            elif msg.type == aiohttp.WSMsgType.PING:
+                await target.ping(msg.data)
+            elif msg.type == aiohttp.WSMsgType.PONG:
+                await target.pong(msg.data)
+
+    def _get_session(self, worker: int) -> aiohttp.ClientSession:
+        if worker not in self._sessions:
+            self._sessions[worker] = aiohttp.ClientSession(
+                connector=aiohttp.UnixConnector(path=get_worker_socket_path(worker))
+            )
+
+        return self._sessions[worker]
+
+
+def run_workers(target: Callable[[dict, int], None], workers: int) -> int:
+    """Run the bus hub and the <target>(config values, worker index) worker processes till interrupted.
+
+    A worker exited unexpectedly is restarted with the same index, so the rooms keep their worker.
+    """
+
+    asyncio.run(_supervise(target=target, workers=workers))
+
+    return 0
+
+
+async def _supervise(target: Callable[[dict, int], None], workers: int):
+    context = multiprocessing.get_context("spawn")  # No event loop state is inherited by the workers
+    values = asdict(config)
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    hub = BusHub(path=config.bus_socket_path)
+    await hub.start()
+
+    def start_worker(worker: int) -> multiprocessing.Process:
+        process = context.Process(target=target, args=(values, worker), name=f"fiasco-worker-{worker}")
+        process.start()
+        logging.info("Worker %s started (pid %s)", worker, process.pid)
+
+        return process
+
+    processes: List[multiprocessing.Process] = [start_worker(worker) for worker in range(workers)]
+
+    try:
+        while not stopping.is_set():
+            try:
+                await asyncio.wait_for(stopping.wait(), timeout=WORKER_CHECK_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+            for worker, process in enumerate(processes):
+                if not stopping.is_set() and not process.is_alive():
+                    logging.error("Worker %s exited with code %s; restarting", worker, process.exitcode)
+                    processes[worker] = start_worker(worker)
+    finally:
+        logging.info("Stopping workers")
+
+        for process in processes:
+            if process.is_alive():
+                process.terminate()  # Graceful shutdown of the aiohttp app
+        for process in processes:
+            await loop.run_in_executor(None, process.join, WORKER_STOP_TIMEOUT)
+            if process.is_alive():
+                logging.warning("Worker %s has not stopped in time; killing", process.name)
+                process.kill()
+
+        await hub.stop()
@@ -1,8 +1,9 @@
 import logging
 
-from typing import Dict, Type
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Type
 
-from fiasco_backend.server.event_handlers import BaseEventHandler
+from fiasco_backend.server.event_handlers import BaseEventHandler, EventContext
 from fiasco_backend.server.websocket import (
     Message,
     WebSocketConnection,
@@ -11,8 +12,18 @@ from fiasco_backend.server.websocket import (
 from fiasco_backend.server.websocket.connection_storages import AdminStorage, PlayerStorage
 from fiasco_backend.server.websocket.message_senders import AdminMessageSender, PlayerMessageSender
 
+Handle = Callable[[EventContext], Awaitable[Any]]
+Middleware = Callable[[EventContext, Handle], Awaitable[Any]]  # Calls (or not) the next handle with the context
+
 
 class WSEventListener:
+    """
+    Dispatches the events to their handlers.
+
+    The handlers are created once, and each event is bound to its handler wrapped with the middlewares
+    up front, so dispatching a message is a single dict lookup (and no wrapping without middlewares).
+    """
+
     EVENT_USER_CONNECTED = WebSocketHandler.EVENT_USER_CONNECTED
     EVENT_USER_DISCONNECTED = WebSocketHandler.EVENT_USER_DISCONNECTED
     EVENT_DEFAULT = "$default"
@@ -24,30 +35,48 @@ class WSEventListener:
         player_message_sender: PlayerMessageSender,
         admin_connection_storage: AdminStorage,
         player_connection_storage: PlayerStorage,
+        middlewares: Sequence[Middleware] = (),
     ):
+        """
+        :param middlewares: e.g. timing ones; the first one is called first, the handler goes last
+        """
+
         self.event_handlers = event_handlers
         self.admin_message_sender = admin_message_sender
         self.player_message_sender = player_message_sender
         self.admin_connection_storage = admin_connection_storage
         self.player_connection_storage = player_connection_storage
+        self.middlewares = tuple(middlewares)
+
+        handlers: Dict[Type[BaseEventHandler], BaseEventHandler] = {}
+        for handler_cls in event_handlers.values():
+            if handler_cls not in handlers:
+                handlers[handler_cls] = handler_cls(
+                    admin_message_sender=admin_message_sender,
+                    player_message_sender=player_message_sender,
+                    admin_connection_storage=admin_connection_storage,
+                    player_connection_storage=player_connection_storage,
+                )
+
+        self._dispatch: Dict[str, Handle] = {
+            event: self._wrap(handlers[handler_cls].handle)
+            for event, handler_cls in event_handlers.items()
+        }
+        self._default: Optional[Handle] = self._dispatch.get(self.EVENT_DEFAULT)
 
     async def __call__(self, message: Message, connection: WebSocketConnection):
-        if message.event in self.event_handlers:
-            handler_cls = self.event_handlers[message.event]
-        elif self.EVENT_DEFAULT in self.event_handlers:
-            handler_cls = self.event_handlers[self.EVENT_DEFAULT]
-        else:
+        handle = self._dispatch.get(message.event, self._default)
+        if handle is None:
             logging.debug(
                 f"Event <{message.event}> received by "
                 f"{connection.__class__.__name__}(ws={connection.ws}, params={connection.params})"
             )
             return
 
-        await handler_cls(
-            admin_message_sender=self.admin_message_sender,
-            player_message_sender=self.player_message_sender,
-            admin_connection_storage=self.admin_connection_storage,
-            player_connection_storage=self.player_connection_storage,
-            connection=connection,
-            message=message
-        ).handle()
+        await handle(EventContext(message=message, connection=connection))
+
+    def _wrap(self, handle: Handle) -> Handle:
+        for middleware in reversed(self.middlewares):
+            handle = partial(middleware, handle=handle)
+
+        return handle
@@ -0,0 +1,153 @@
+import math
+
+from typing import Any, Dict, Generic, Hashable, Iterable, Iterator, Optional, Sequence, Set, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+Box = Tuple[int, int, int, int]  # Left, top, right, bottom (inclusive)
+Cell = Tuple[int, int]
+
+
+def get_coordinates_box(coordinates: Optional[Sequence[Any]]) -> Optional[Box]:
+    """Bounding box of the (x, y) pairs of the element coordinates; None if there is no pair.
+
+    The coordinates may be of any number type (e.g. Decimal ones read from DynamoDB);
+    the box is of the integers covering them.
+    """
+
+    if not coordinates or len(coordinates) < 2:
+        return None
+
+    xs = coordinates[0:len(coordinates) - 1:2]
+    ys = coordinates[1::2]
+
+    return math.floor(min(xs)), math.floor(min(ys)), math.ceil(max(xs)), math.ceil(max(ys))
+
+
+def parse_box(values: Sequence[Any]) -> Box:
+    """Box of the [left, top, right, bottom] integer values; raises ValueError if invalid."""
+
+    if len(values) != 4:
+        raise ValueError("Box expects 4 values")
+
+    left, top, right, bottom = (int(value) for value in values)
+    if left > right or top > bottom:
+        raise ValueError("Box has negative size")
+
+    return left, top, right, bottom
+
+
+def boxes_intersect(a: Box, b: Box) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class GridIndex(Generic[K]):
+    """
+    Uniform grid of boxes (by key), finding the ones intersecting a box with the cells it covers only.
+
+    Keys without a box are everywhere (match any query); the boxes covering more than <max_cells> cells
+    are kept out of the grid and checked one by one.
+    """
+
+    def __init__(self, cell_size: int, max_cells: int = 256):
+        self._cell_size = cell_size
+        self._max_cells = max_cells
+
+        self._boxes: Dict[K, Optional[Box]] = {}
+        self._cells: Dict[Cell, Set[K]] = {}
+        self._unplaced: Set[K] = set()
+        self._wide: Set[K] = set()
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def __contains__(self, key: K):
+        return key in self._boxes
+
+    @property
+    def placed_count(self) -> int:
+        """Count of the keys having a box."""
+
+        return len(self._boxes) - len(self._unplaced)
+
+    def get_box(self, key: K) -> Optional[Box]:
+        return self._boxes[key]
+
+    def add(self, key: K, box: Optional[Box]):
+        """Add the key, or move it to the box."""
+
+        if key in self._boxes:
+            if self._boxes[key] == box:
+                return
+
+            self.remove(key)
+
+        self._boxes[key] = box
+
+        if box is None:
+            self._unplaced.add(key)
+            return
+
+        cells = self._get_cells(box)
+        if cells is None:
+            self._wide.add(key)
+            return
+
+        for cell in cells:
+            self._cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key: K):
+        if key not in self._boxes:
+            return
+
+        box = self._boxes.pop(key)
+        if box is None:
+            self._unplaced.discard(key)
+            return
+
+        cells = self._get_cells(box)
+        if cells is None:
+            self._wide.discard(key)
+            return
+
+        for cell in cells:
+            keys = self._cells[cell]
+            keys.discard(key)
+            if not keys:
+                del self._cells[cell]
+
+    def query(self, boxes: Iterable[Box]) -> Set[K]:
+        """Get the keys intersecting any of the boxes (the ones without a box included)."""
+
+        found = set(self._unplaced)
+
+        for box in boxes:
+            cells = self._get_cells(box)
+            if cells is None:  # Scanning all is cheaper than that many cells
+                found.update(key for key, key_box in self._boxes.items() if key_box and boxes_intersect(box, key_box))
+                continue
+
+            for cell in cells:
+                for key in self._cells.get(cell, ()):
+                    if key not in found and boxes_intersect(box, self._boxes[key]):
+                        found.add(key)
+
+            found.update(key for key in self._wide if boxes_intersect(box, self._boxes[key]))
+
+        return found
+
+    def intersects(self, key: K, boxes: Iterable[Box]) -> bool:
+        """Whether the box of the key (if any) intersects any of the boxes."""
+
+        key_box = self._boxes[key]
+
+        return key_box is None or any(boxes_intersect(box, key_box) for box in boxes)
+
+    def _get_cells(self, box: Box) -> Optional[Iterator[Cell]]:
+        size = self._cell_size
+        left, top, right, bottom = box[0] // size, box[1] // size, box[2] // size, box[3] // size
+
+        if (right - left + 1) * (bottom - top + 1) > self._max_cells:
+            return None
+
+        return ((x, y) for x in range(left, right + 1) for y in range(top, bottom + 1))
@@ -0,0 +1,36 @@
+import bisect
+import hashlib
+
+from typing import Generic, List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+class HashRing(Generic[T]):
+    """Consistent hashing of keys to nodes; adding or removing a node remaps about 1/N of the keys only."""
+
+    def __init__(self, nodes: Sequence[T], replicas: int = 128):
+        """
+        :param replicas: virtual points per node, smoothing the keys distribution
+        """
+
+        if not nodes:
+            raise ValueError("No nodes for hash ring")
+
+        points = sorted(
+            (self._hash(f"{node}:{replica}"), node)
+            for node in nodes
+            for replica in range(replicas)
+        )
+
+        self._hashes: List[int] = [h for h, _ in points]
+        self._nodes: List[T] = [node for _, node in points]
+
+    def get_node(self, key: str) -> T:
+        index = bisect.bisect(self._hashes, self._hash(key)) % len(self._hashes)
+
+        return self._nodes[index]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
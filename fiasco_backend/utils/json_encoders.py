@@ -0,0 +1,64 @@
+"""
+Selectable JSON encoders of the outgoing messages.
+
+Each encoder serializes DynamoDB numbers (<Decimal>) the same way as <simplejson> does and returns <str>.
+"""
+
+__all__ = [
+    "JSON_ENCODERS",
+    "decimal_default",
+    "get_json_encoder",
+    "json_dumps",
+]
+
+import json
+
+from decimal import Decimal
+from typing import Any, Callable, Dict
+
+import simplejson
+
+from fiasco_backend import config
+
+try:
+    import orjson
+except ImportError:  # Optional dependency
+    orjson = None
+
+
+def decimal_default(obj: Any):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+def _simplejson_dumps(obj: Any) -> str:
+    return simplejson.dumps(obj)
+
+
+def _json_dumps(obj: Any) -> str:
+    return json.dumps(obj, default=decimal_default)
+
+
+def _orjson_dumps(obj: Any) -> str:
+    return orjson.dumps(obj, default=decimal_default).decode()
+
+
+JSON_ENCODERS: Dict[str, Callable[[Any], str]] = {
+    "simplejson": _simplejson_dumps,
+    "json": _json_dumps,
+}
+if orjson is not None:
+    JSON_ENCODERS["orjson"] = _orjson_dumps
+
+
+def get_json_encoder(name: str) -> Callable[[Any], str]:
+    try:
+        return JSON_ENCODERS[name]
+    except KeyError:
+        raise ValueError(f"Unsupported JSON encoder: {name} (available: {', '.join(JSON_ENCODERS)})")
+
+
+def json_dumps(obj: Any) -> str:
+    return get_json_encoder(config.json_encoder)(obj)
@@ -0,0 +1,15 @@
+import sys
+
+from typing import Any
+
+
+def deep_sizeof(obj: Any) -> int:
+    """Approximate size (in bytes) of an object with its nested dicts, lists and tuples."""
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k) + deep_sizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_sizeof(v) for v in obj)
+
+    return size
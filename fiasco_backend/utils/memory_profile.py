@@ -0,0 +1,167 @@
+"""
+Memory profile of idle player connections.
+
+Runs the player WebSocket endpoint (without the database and the event handlers) in this process,
+opens N connections to it from a child process and reports the memory taken per idle connection,
+including aiohttp's own request, reader and writer state:
+
+    python -m fiasco_backend.utils.memory_profile --connections 100000 --rooms 10000
+
+With <--trace> the Python heap growth and its top allocation sites are reported as well
+(tracing inflates the RSS and slows the connections down).
+"""
+
+import argparse
+import asyncio
+import gc
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+import aiohttp
+
+from aiohttp import web
+
+from fiasco_backend.server.websocket import Message, WebSocketHandler
+from fiasco_backend.server.websocket.authorizers import PlayerAuthorizer
+from fiasco_backend.server.websocket.connection_storages import PlayerStorage
+from fiasco_backend.server.websocket.connections import PlayerConnection
+
+CONNECT_BATCH_SIZE = 500
+
+
+class StoringEventListener:
+    """Only keeps the connections, as the player event listener does before any message."""
+
+    def __init__(self, storage: PlayerStorage):
+        self._storage = storage
+
+    async def __call__(self, message: Message, connection: PlayerConnection):
+        if message.event == WebSocketHandler.EVENT_USER_CONNECTED:
+            self._storage.add_connection(connection)
+        elif message.event == WebSocketHandler.EVENT_USER_DISCONNECTED:
+            self._storage.remove_connection(connection)
+
+
+def raise_open_files_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def get_rss() -> int:
+    """Current resident set size (in bytes)."""
+
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:  # Not Linux; peak instead of current
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_clients(url: str, connections: int, rooms: int, done):
+    raise_open_files_limit()
+    asyncio.run(_run_clients(url=url, connections=connections, rooms=rooms, done=done))
+
+
+async def _run_clients(url: str, connections: int, rooms: int, done):
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        sockets = []
+        for start in range(0, connections, CONNECT_BATCH_SIZE):
+            sockets += await asyncio.gather(*(
+                session.ws_connect(f"{url}?room=room-{i % rooms}&player=player-{i}", autoping=True)
+                for i in range(start, min(start + CONNECT_BATCH_SIZE, connections))
+            ))
+
+        await asyncio.get_running_loop().run_in_executor(None, done.wait)
+
+        for ws in sockets:
+            await ws.close()
+
+
+async def profile(connections: int, rooms: int, port: int, trace: bool, top: int):
+    storage = PlayerStorage()
+    handler = WebSocketHandler(authorizer=PlayerAuthorizer(), event_listeners=(StoringEventListener(storage), ))
+
+    app = web.Application()
+    app.add_routes([
+        web.get("/", handler),
+    ])
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host="127.0.0.1", port=port).start()
+
+    context = multiprocessing.get_context("spawn")
+    done = context.Event()
+
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+        traced_before, _ = tracemalloc.get_traced_memory()
+        snapshot_before = tracemalloc.take_snapshot()
+    rss_before = get_rss()
+
+    clients = context.Process(
+        target=run_clients,
+        args=(f"http://127.0.0.1:{port}/", connections, rooms, done)
+    )
+    clients.start()
+
+    started_at = time.time()
+    while storage.connections_count < connections:
+        if not clients.is_alive():
+            raise RuntimeError(f"Clients exited having opened {storage.connections_count} connections")
+
+        await asyncio.sleep(0.1)
+
+    gc.collect()
+    rss_after = get_rss()
+
+    print(f"Connections: {connections} in {rooms} rooms (opened in {time.time() - started_at:.1f} s)")
+    print(
+        f"RSS: +{(rss_after - rss_before) / 2 ** 20:.1f} MiB, "
+        f"{(rss_after - rss_before) // connections} B per connection"
+    )
+
+    if trace:
+        traced_after, _ = tracemalloc.get_traced_memory()
+        snapshot_after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        print(
+            f"Python heap: +{(traced_after - traced_before) / 2 ** 20:.1f} MiB, "
+            f"{(traced_after - traced_before) // connections} B per connection"
+        )
+        print("Top allocation sites per connection:")
+        for stat in snapshot_after.compare_to(snapshot_before, "lineno")[:top]:
+            frame = stat.traceback[0]
+            print(f"  {stat.size_diff // connections:>6} B  {frame.filename}:{frame.lineno}")
+
+    done.set()
+    await asyncio.get_running_loop().run_in_executor(None, clients.join)
+    await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report memory taken per idle player connection")
+
+    parser.add_argument("-n", "--connections", dest="connections", type=int, default=10000, help="connections to open")
+    parser.add_argument("--rooms", dest="rooms", type=int, default=1000, help="rooms to spread the connections over")
+    parser.add_argument("--port", dest="port", type=int, default=3999, help="port of the profiled server")
+    parser.add_argument("--trace", dest="trace", action="store_true", help="trace Python allocations")
+    parser.add_argument("--top", dest="top", type=int, default=10, help="allocation sites to report (with --trace)")
+
+    args = parser.parse_args()
+
+    raise_open_files_limit()
+    asyncio.run(profile(connections=args.connections, rooms=args.rooms, port=args.port, trace=args.trace, top=args.top))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
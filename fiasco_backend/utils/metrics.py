@@ -0,0 +1,201 @@
+"""
+Prometheus-style metrics.
+
+Counters and histograms are plain dict and list updates, cheap enough for the hot paths;
+the gauges (and the counters kept elsewhere) are collected by callbacks on scrape only.
+Rendered in the Prometheus text exposition format, see <Metrics.render>.
+"""
+
+import bisect
+import logging
+import math
+
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple, Union
+
+Labels = Tuple[str, ...]
+CallbackValue = Union[float, Dict[Labels, float]]
+
+OTHER_LABEL = "$other"
+
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+SIZE_BUCKETS = (
+    0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000,
+)
+
+
+class Metric:
+    TYPE = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), max_series: int = 1000):
+        """
+        :param max_series: max number of the label value sets; the others are counted as <OTHER_LABEL> ones
+        """
+
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.max_series = max_series
+
+    def collect(self) -> Iterable[Tuple[str, Labels, float]]:
+        """Get the samples: name suffix, label values and value."""
+
+        raise NotImplementedError()
+
+    def render(self, labels: Sequence[str] = ()) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.TYPE}",
+        ]
+        for suffix, values, value in self.collect():
+            series_labels = format_labels(tuple(labels or self.labels), values)
+            lines.append(f"{self.name}{suffix}{series_labels} {format_value(value)}")
+
+        return lines
+
+    def _get_series_key(self, labels: Labels, series: Dict) -> Labels:
+        if len(series) < self.max_series:
+            return labels
+
+        return (OTHER_LABEL, ) * len(labels)
+
+
+class Counter(Metric):
+    TYPE = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1):
+        try:
+            self._values[labels] += amount
+        except KeyError:
+            key = self._get_series_key(labels, self._values)
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        return (("", labels, value) for labels, value in self._values.items())
+
+
+class HistogramSeries:
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets_count: int):
+        self.counts = [0] * (buckets_count + 1)  # Not cumulative; the last one is +Inf
+        self.sum = 0.
+        self.count = 0
+
+
+class Histogram(Metric):
+    TYPE = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, HistogramSeries] = {}
+
+    def observe(self, value: float, labels: Labels = ()):
+        series = self._series.get(labels)
+        if series is None:
+            key = self._get_series_key(labels, self._series)
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = HistogramSeries(len(self.buckets))
+
+        series.counts[bisect.bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    def collect(self):
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf, ), series.counts):
+                cumulative += count
+                yield "_bucket", labels + (format_value(bound), ), cumulative
+
+            yield "_sum", labels, series.sum
+            yield "_count", labels, series.count
+
+    def render(self, labels: Sequence[str] = ()) -> List[str]:
+        # The sums and counts have no <le> value, so go without the label
+        return super().render(labels=self.labels + ("le", ))
+
+
+class CallbackMetric(Metric):
+    """Gauge (or counter kept elsewhere) collected by the callback returning the value or label values -> value."""
+
+    def __init__(self, name: str, help: str, callback: Callable[[], CallbackValue], type: str = "gauge", **kwargs):
+        super().__init__(name, help, **kwargs)
+
+        self.TYPE = type
+        self._callback = callback
+
+    def collect(self):
+        value = self._callback()
+        if isinstance(value, dict):
+            return (("", labels, labels_value) for labels, labels_value in value.items())
+
+        return (("", (), value), )
+
+
+class Metrics:
+    """Registry of the metrics by name; registering a metric with the same name replaces the previous one."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = (), **kwargs) -> Counter:
+        return self.register(Counter(name, help, labels=labels, **kwargs))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), **kwargs) -> Histogram:
+        return self.register(Histogram(name, help, labels=labels, **kwargs))
+
+    def gauge(self, name: str, help: str, callback: Callable[[], CallbackValue], labels: Sequence[str] = ()):
+        return self.register(CallbackMetric(name, help, callback=callback, type="gauge", labels=labels))
+
+    def callback_counter(self, name: str, help: str, callback: Callable[[], CallbackValue], labels: Sequence[str] = ()):
+        return self.register(CallbackMetric(name, help, callback=callback, type="counter", labels=labels))
+
+    def register(self, metric: Metric):
+        self._metrics[metric.name] = metric
+
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception as e:  # A single broken callback should not hide all the metrics
+                logging.error("Failed to collect metric %s", metric.name, exc_info=e)
+
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(names: Labels, values: Labels) -> str:
+    if not values:
+        return ""
+
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+
+    if float(value).is_integer():
+        return str(int(value))
+
+    return repr(float(value))
+
+
+metrics = Metrics()
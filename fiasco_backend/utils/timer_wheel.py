@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import math
+
+from typing import Any, Callable, List, Optional
+
+
+class TimerWheelEntry:
+
+    __slots__ = ("rounds", "callback", "args", "cancelled")
+
+    def __init__(self, rounds: int, callback: Callable[..., Any], args: tuple):
+        self.rounds = rounds
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel running any number of timers on a single event loop timer.
+
+    Scheduling and cancelling take constant time; the callbacks run with the <tick> resolution (late, never early).
+    """
+
+    def __init__(self, tick: float = 1, slots: int = 512):
+        self._tick = tick
+        self._slots: List[List[TimerWheelEntry]] = [[] for _ in range(slots)]
+        self._cursor = 0
+        self._count = 0
+
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._next_at = 0.
+
+    def __len__(self):
+        """Count of the scheduled (including the cancelled, yet not dropped) timers."""
+
+        return self._count
+
+    def schedule(self, delay: float, callback: Callable[..., Any], *args) -> TimerWheelEntry:
+        ticks = max(1, math.ceil(delay / self._tick))
+        entry = TimerWheelEntry(rounds=(ticks - 1) // len(self._slots), callback=callback, args=args)
+
+        self._slots[(self._cursor + ticks) % len(self._slots)].append(entry)
+        self._count += 1
+
+        if self._handle is None:
+            loop = asyncio.get_event_loop()
+            self._next_at = loop.time() + self._tick
+            self._handle = loop.call_at(self._next_at, self._run)
+
+        return entry
+
+    def stop(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+        self._slots = [[] for _ in self._slots]
+        self._count = 0
+
+    def _run(self):
+        self._cursor = (self._cursor + 1) % len(self._slots)
+
+        entries = self._slots[self._cursor]
+        self._slots[self._cursor] = []  # The ones scheduled a whole turn ahead by the callbacks go here
+
+        for entry in entries:
+            if entry.cancelled:
+                self._count -= 1
+            elif entry.rounds:
+                entry.rounds -= 1
+                self._slots[self._cursor].append(entry)
+            else:
+                self._count -= 1
+                try:
+                    entry.callback(*entry.args)
+                except Exception as e:
+                    logging.error("Timer wheel callback error", exc_info=e)
+
+        if not self._count:
+            self._handle = None
+            return
+
+        self._next_at += self._tick  # No drift, however long the callbacks take
+        self._handle = asyncio.get_event_loop().call_at(self._next_at, self._run)
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import tempfile
+
+from fiasco_backend.server.bus import BusHub, UnixSocketBus
+
+
+async def wait_for(condition, timeout=2.0):
+    """Wait till the <condition> callable is true (as the frames go through the hub asynchronously)."""
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "Timed out"
+        await asyncio.sleep(0.01)
+
+
+def run_with_hub(test):
+    """Run the <test> coroutine function with a hub and two bus clients connected to it on a temp socket."""
+
+    async def main(path):
+        hub = BusHub(path=path)
+        await hub.start()
+
+        buses = [UnixSocketBus(path=path), UnixSocketBus(path=path)]
+        for bus in buses:
+            await bus.start()
+        await wait_for(lambda: sorted(filter(None, hub._nodes.values())) == sorted(bus.node_id for bus in buses))
+
+        try:
+            await test(hub, *buses)
+        finally:
+            for bus in buses:
+                await bus.stop()
+            await hub.stop()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(main(os.path.join(directory, "bus.sock")))
+
+
+def collect(messages):
+    return lambda channel, message, node: messages.append((channel, message, node))
+
+
+def test_published_message_is_delivered_to_subscribers():
+    async def test(hub, a, b):
+        received_a, received_b = [], []
+        a.subscribe("room-1", collect(received_a))
+        b.subscribe("room-1", collect(received_b))
+        b.subscribe("room-2", collect(received_b))
+        await asyncio.sleep(0.05)  # Subscriptions reach the hub
+
+        a.publish("room-1", {"event": "x"})
+        a.publish("room-3", {"event": "y"})
+        await wait_for(lambda: received_b)
+        await asyncio.sleep(0.05)
+
+        assert received_a == [("room-1", {"event": "x"}, a.node_id)]  # Delivered locally, not echoed back
+        assert received_b == [("room-1", {"event": "x"}, a.node_id)]
+
+    run_with_hub(test)
+
+
+def test_node_left_is_announced():
+    async def test(hub, a, b):
+        left = []
+        b.on_node_left(left.append)
+
+        await a.stop()
+        await wait_for(lambda: left)
+
+        assert left == [a.node_id]
+
+    run_with_hub(test)
+
+
+def test_reconnect_restores_subscriptions(monkeypatch):
+    monkeypatch.setattr(UnixSocketBus, "RECONNECT_DELAY", 0.05)
+
+    async def test(hub, a, b):
+        received = []
+        connected = []
+        b.subscribe("room-1", collect(received))
+        a.on_connected(lambda: connected.append("a"))
+        b.on_connected(lambda: connected.append("b"))
+
+        await hub.stop()
+        await wait_for(lambda: not a.is_connected and not b.is_connected)
+        a.publish("room-1", {"event": "lost"})
+
+        await hub.start()
+        await wait_for(lambda: len(connected) == 2)
+        await asyncio.sleep(0.05)
+
+        a.publish("room-1", {"event": "x"})
+        await wait_for(lambda: received)
+
+        assert received == [("room-1", {"event": "x"}, a.node_id)]
+        assert a.dropped_count == 1
+
+    run_with_hub(test)
+
+
+def test_malformed_frames_are_skipped():
+    async def test(hub, a, b):
+        received = []
+        b.subscribe("room-1", collect(received))
+        await asyncio.sleep(0.05)
+
+        a._writer.write(b"not json\n")  # Skipped by the hub
+        a._writer.write(b'{"op": "sub"}\n')
+        a._writer.write(b'{"op": "pub", "channel": "room-1"}\n')  # Forwarded, skipped by the subscriber
+        a.publish("room-1", {"event": "x"})
+        await wait_for(lambda: received)
+
+        assert received == [("room-1", {"event": "x"}, a.node_id)]
+        assert a.is_connected and b.is_connected
+
+    run_with_hub(test)
+
+
+def test_node_not_reading_is_disconnected(monkeypatch):
+    monkeypatch.setattr(BusHub, "WRITE_BUFFER_LIMIT", 64 * 1024)
+
+    async def test(hub, a, b):
+        left = []
+        a.on_node_left(left.append)
+
+        _, writer = await asyncio.open_unix_connection(path=hub._path)  # Subscribes, but never reads
+        writer.write(json.dumps({"op": "hello", "node": "slow"}).encode() + b"\n")
+        writer.write(json.dumps({"op": "sub", "channel": "room-1"}).encode() + b"\n")
+        await asyncio.sleep(0.05)
+
+        for _ in range(100):
+            a.publish("room-1", {"data": "x" * 10000})
+            await asyncio.sleep(0)
+            if left:
+                break
+        await wait_for(lambda: left)
+
+        assert left == ["slow"]
+        writer.close()
+
+    run_with_hub(test)
@@ -0,0 +1,183 @@
+import asyncio
+
+from botocore.exceptions import ClientError
+
+from fiasco_backend.db import element as element_module
+from fiasco_backend.db.element import ElementFlusher, ElementUpdateQueue, upsert_element
+from fiasco_backend.db.room_cache import room_cache
+
+
+def run_flushes(monkeypatch, results, flushes):
+    """Flush the element <flushes> times (with no backoff), the updates returning the <results> in turn."""
+
+    calls = []
+
+    async def update_element(element_data):
+        calls.append(dict(element_data))
+
+        return results[len(calls) - 1]
+
+    monkeypatch.setattr(element_module, "update_element", update_element)
+
+    queue = ElementUpdateQueue()
+    flusher = ElementFlusher(queue)
+    queue.put({"element_id": "a", "room": "r", "coordinates": [1, 2]})
+
+    async def main():
+        flusher._flushed = asyncio.Event()
+        for _ in range(flushes):
+            await flusher.flush(retry_now=True)
+
+    asyncio.run(main())
+
+    return queue, flusher, calls
+
+
+def test_failed_update_is_retried(monkeypatch):
+    queue, flusher, calls = run_flushes(monkeypatch, results=[False, True], flushes=2)
+
+    assert len(calls) == 2
+    assert len(queue) == 0
+    assert flusher.flushed_elements_count == 1
+    assert flusher.retried_elements_count == 1
+    assert flusher.failed_elements_count == 0
+
+
+def test_failed_update_is_dropped_after_max_attempts(monkeypatch):
+    attempts = ElementFlusher.MAX_ATTEMPTS
+    queue, flusher, calls = run_flushes(monkeypatch, results=[False] * attempts, flushes=attempts + 1)
+
+    assert len(calls) == attempts
+    assert len(queue) == 0
+    assert flusher.failed_elements_count == 1
+    assert flusher.retried_elements_count == attempts - 1
+
+
+def test_failed_update_waits_for_backoff(monkeypatch):
+    async def update_element(element_data):
+        return False
+
+    monkeypatch.setattr(element_module, "update_element", update_element)
+
+    queue = ElementUpdateQueue()
+    flusher = ElementFlusher(queue)
+    queue.put({"element_id": "a", "room": "r", "coordinates": [1, 2]})
+
+    async def main():
+        flusher._flushed = asyncio.Event()
+        await flusher.flush()
+        await flusher.flush()  # Within the backoff
+
+    asyncio.run(main())
+
+    assert len(queue) == 1
+    assert queue.get_attempts("a") == 1
+    assert flusher.flushes_count == 1
+
+
+def test_change_during_failed_update_is_merged_into_retry(monkeypatch):
+    queue = ElementUpdateQueue()
+    queue.put({"element_id": "a", "room": "r", "coordinates": [1, 2]})
+
+    taken, = queue.take_dirty()
+    queue.put({"element_id": "a", "room": "r", "styles": {"color": "red"}})
+
+    assert queue.fail("a", element_data=taken, retry_at=0, max_attempts=1)  # Changed since taken, so never dropped
+
+    data, = queue.take_dirty()
+    assert data == {"element_id": "a", "room": "r", "coordinates": [1, 2], "styles": {"color": "red"}}
+
+
+class FakeTable:
+    """Table failing the conditional updates of the items not put yet, as DynamoDB does."""
+
+    def __init__(self):
+        self.items = {}
+
+    async def put_item(self, Item):
+        self.items[Item["element_id"]] = dict(Item)
+
+    async def update_item(self, Key, ExpressionAttributeNames, ExpressionAttributeValues, **params):
+        if Key["element_id"] not in self.items:
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem")
+
+        for name, value in ExpressionAttributeValues.items():
+            self.items[Key["element_id"]][ExpressionAttributeNames["#" + name[1:]]] = value
+
+
+def flush_with_table(monkeypatch, table, create):
+    """Flush an update queued before its create, which is stored after the first flush if <create>."""
+
+    async def get_table(name):
+        return table
+
+    monkeypatch.setattr(element_module.dynamodb, "table", get_table)
+
+    queue = ElementUpdateQueue()
+    flusher = ElementFlusher(queue)
+    queue.put({"element_id": "a", "room": "r", "coordinates": [3, 4]})
+
+    async def main():
+        flusher._flushed = asyncio.Event()
+        await flusher.flush(retry_now=True)
+        if create:
+            await upsert_element({"element_id": "a", "room": "r", "coordinates": [1, 2]}, create=True)
+        await flusher.flush(retry_now=True)
+
+    asyncio.run(main())
+
+    return queue, flusher
+
+
+def test_update_queued_before_create_is_retried(monkeypatch):
+    table = FakeTable()
+    queue, flusher = flush_with_table(monkeypatch, table, create=True)
+
+    assert len(queue) == 0
+    assert flusher.retried_elements_count == 1
+    assert flusher.flushed_elements_count == 1
+    assert table.items["a"]["coordinates"] == [3, 4]
+
+
+def test_update_of_deleted_element_is_skipped(monkeypatch):
+    monkeypatch.setattr(room_cache, "is_deleted", lambda room, element_id: True)
+
+    queue, flusher = flush_with_table(monkeypatch, FakeTable(), create=False)
+
+    assert len(queue) == 0
+    assert flusher.retried_elements_count == 0
+    assert flusher.flushed_elements_count == 1
+
+
+def test_full_queue_holds_updates_back(monkeypatch, caplog):
+    monkeypatch.setattr(element_module.config, "element_flush_max_pending", 2)
+    monkeypatch.setattr(element_module.config, "element_flush_interval", 60)
+
+    stored = []
+    depths = []
+
+    async def update_element(element_data):
+        await asyncio.sleep(0.01)
+        stored.append(element_data["element_id"])
+
+        return True
+
+    monkeypatch.setattr(element_module, "update_element", update_element)
+
+    flusher = ElementFlusher(ElementUpdateQueue())
+
+    async def put(element_id):
+        await flusher.put({"element_id": element_id, "room": "r", "coordinates": [1, 2]})
+        depths.append(flusher.depth)
+
+    async def main():
+        await asyncio.gather(*(put(str(i)) for i in range(7)))
+        await flusher.stop()
+
+    with caplog.at_level("WARNING"):
+        asyncio.run(main())
+
+    assert max(depths) <= 2
+    assert sorted(stored) == [str(i) for i in range(7)]
+    warnings = [record for record in caplog.records if record.levelname == "WARNING"]
+    assert len(warnings) == 3  # Filled up with 2, 4 and 6 updates, not logged for each held back one
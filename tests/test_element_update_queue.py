@@ -0,0 +1,88 @@
+from fiasco_backend.db.element import ElementUpdateQueue
+
+
+def test_stored_element_is_dropped():
+    queue = ElementUpdateQueue()
+    queue.put({"element_id": "a", "room": "r", "coordinates": [1, 2]})
+
+    [taken] = queue.take_dirty()
+    assert taken == {"element_id": "a", "room": "r", "coordinates": [1, 2]}
+    assert queue.take_dirty() == []  # In-flight
+
+    queue.complete("a", element_data=taken)
+
+    assert len(queue) == 0
+    assert queue.get_room("r") == {}
+
+
+def test_element_changed_in_flight_stays_dirty():
+    queue = ElementUpdateQueue()
+    queue.put({"element_id": "a", "room": "r", "coordinates": [1, 2]})
+    [taken] = queue.take_dirty()
+
+    queue.put({"element_id": "a", "room": "r", "styles": {"z": 1}})
+    queue.complete("a", element_data=taken)
+
+    assert taken == {"element_id": "a", "room": "r", "coordinates": [1, 2]}  # Handed back data is not mutated
+    [taken] = queue.take_dirty()
+    assert taken == {"element_id": "a", "room": "r", "coordinates": [1, 2], "styles": {"z": 1}}
+
+    queue.complete("a", element_data=taken)
+
+    assert len(queue) == 0
+
+
+def test_element_deleted_in_flight_is_not_updated_anymore():
+    queue = ElementUpdateQueue()
+    queue.put({"element_id": "a", "room": "r", "coordinates": [1, 2]})
+    [taken] = queue.take_dirty()
+
+    queue.delete("a", room="r")
+    queue.put({"element_id": "a", "room": "r", "coordinates": [3, 4]})
+    queue.complete("a", element_data=taken)
+
+    assert queue.get("a") is None
+    assert queue.get_room("r") == {"a": None}
+
+    assert queue.take_dirty() == []  # Nothing to store for the tombstone, so it's dropped
+    assert len(queue) == 0
+
+
+def test_deleted_element_without_pending_changes():
+    queue = ElementUpdateQueue()
+    queue.delete("a", room="r")
+    queue.put({"element_id": "a", "room": "r", "coordinates": [1, 2]})
+
+    assert queue.get_room("r") == {"a": None}
+    assert queue.take_dirty() == []
+    assert len(queue) == 0
+
+
+def test_elements_by_room():
+    queue = ElementUpdateQueue()
+    queue.put({"element_id": "a", "room": "r1"})
+    queue.put({"element_id": "b", "room": "r1"})
+    queue.put({"element_id": "c", "room": "r2"})
+
+    assert set(queue.get_room("r1")) == {"a", "b"}
+
+    for element_data in queue.take_dirty():
+        if element_data["room"] == "r1":
+            queue.complete(element_data["element_id"], element_data=element_data)
+
+    assert queue.get_room("r1") == {}
+    assert set(queue.get_room("r2")) == {"c"}
+
+
+def test_failed_element_is_retried_after_backoff():
+    queue = ElementUpdateQueue()
+    queue.put({"element_id": "a", "room": "r"})
+    [taken] = queue.take_dirty()
+
+    assert queue.fail("a", element_data=taken, retry_at=10.0, max_attempts=2)
+    assert queue.take_dirty(now=5.0) == []
+    assert queue.take_dirty(now=11.0) == [taken]
+    assert not queue.fail("a", element_data=taken, retry_at=20.0, max_attempts=2)
+
+    assert len(queue) == 0
+    assert queue.get_attempts("a") == 0
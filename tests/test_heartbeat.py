@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+from fiasco_backend.server.websocket.base.heartbeat import HeartbeatMonitor
+from fiasco_backend.utils.timer_wheel import TimerWheel
+
+
+class FakeResponse:
+
+    def __init__(self):
+        self.closed = False
+        self.pings = 0
+        self.close_code = None
+
+    async def ping(self):
+        self.pings += 1
+
+    async def close(self, code, message):
+        self.close_code = code
+        self.closed = True
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.ws = FakeResponse()
+        self.last_seen = 0.0
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+
+
+def run_monitor(duration, active_for=0.0, interval=0.05, idle_timeout=0.12):
+    """Watch a connection for <duration> seconds, touched each tick for the first <active_for> seconds."""
+
+    monitor = HeartbeatMonitor(interval=interval, idle_timeout=idle_timeout, wheel=TimerWheel(tick=0.01))
+    connection = FakeConnection()
+
+    async def main():
+        monitor.watch(connection)
+
+        loop = asyncio.get_running_loop()
+        stop_at = loop.time() + active_for
+        while loop.time() < stop_at:
+            connection.touch()
+            await asyncio.sleep(0.01)
+
+        await asyncio.sleep(duration - active_for)
+        monitor.unwatch(connection)
+
+    asyncio.run(main())
+
+    return monitor, connection
+
+
+def test_quiet_connection_is_pinged_then_closed():
+    monitor, connection = run_monitor(duration=0.3)
+
+    assert connection.ws.pings >= 1
+    assert connection.ws.close_code == HeartbeatMonitor.CLOSE_CODE
+    assert monitor.pings_count == connection.ws.pings
+    assert monitor.reaped_count == 1
+    assert monitor.watched_count == 0
+
+
+def test_quiet_connection_is_pinged_before_idle_timeout():
+    monitor, connection = run_monitor(duration=0.09)
+
+    assert connection.ws.pings == 1
+    assert not connection.ws.closed
+
+
+def test_active_connection_is_neither_pinged_nor_closed():
+    monitor, connection = run_monitor(duration=0.3, active_for=0.3)
+
+    assert connection.ws.pings == 0
+    assert not connection.ws.closed
+    assert monitor.reaped_count == 0
@@ -0,0 +1,119 @@
+import asyncio
+
+from fiasco_backend.server.websocket.base.outbound_queue import OutboundQueue
+
+
+class FakeResponse:
+
+    def __init__(self):
+        self.closed = False
+        self.sent = []
+        self.close_code = None
+
+    async def send_payload(self, payload):
+        self.sent.append(payload)
+
+    async def close(self, code, message):
+        self.close_code = code
+        self.closed = True
+
+
+def run_queue(puts, **kwargs):
+    """Put the (payload, volatile) messages, then start the writer; return the queue, results of the puts and ws."""
+
+    ws = FakeResponse()
+    queue = OutboundQueue(ws=ws, **kwargs)
+
+    async def main():
+        results = [queue.put(payload, volatile=volatile) for payload, volatile in puts]
+
+        queue.start()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)  # The closing, if any, as well
+        await queue.stop()
+
+        return results
+
+    results = asyncio.run(main())
+
+    return queue, results, ws
+
+
+def test_drop_oldest_drops_volatile_messages_first():
+    queue, results, ws = run_queue(
+        [("a", True), ("b", False), ("c", True), ("d", True), ("e", False)],
+        max_length=3,
+        max_bytes=100,
+        policy=OutboundQueue.POLICY_DROP_OLDEST
+    )
+
+    assert results == [True] * 5
+    assert ws.sent == ["b", "d", "e"]
+    assert queue.dropped_count == 2
+    assert queue.sent_count == 3
+    assert ws.close_code is None
+
+
+def test_drop_oldest_closes_if_no_volatile_messages_left():
+    queue, results, ws = run_queue(
+        [("a", True), ("b", False), ("c", False), ("d", False)],
+        max_length=2,
+        max_bytes=100,
+        policy=OutboundQueue.POLICY_DROP_OLDEST
+    )
+
+    assert results == [True, True, True, False]
+    assert ws.sent == []
+    assert ws.close_code == OutboundQueue.CLOSE_CODE
+    assert queue.dropped_count == 4
+
+
+def test_close_policy_closes_on_overflow():
+    queue, results, ws = run_queue(
+        [("a", True), ("b", True), ("c", True)],
+        max_length=2,
+        max_bytes=100,
+        policy=OutboundQueue.POLICY_CLOSE
+    )
+
+    assert results == [True, True, False]
+    assert ws.sent == []
+    assert ws.close_code == OutboundQueue.CLOSE_CODE
+    assert queue.closed
+    assert not queue.put("d")
+
+
+def test_bytes_are_counted_encoded():
+    queue = OutboundQueue(ws=FakeResponse(), max_length=100, max_bytes=100, policy=OutboundQueue.POLICY_CLOSE)
+
+    queue.put("ab")
+    queue.put(b"abc")
+    queue.put("é" * 10)  # 10 characters, 20 bytes
+
+    assert queue.bytes == 25
+    assert queue.depth == 3
+
+
+def test_volatile_messages_are_dropped_by_bytes():
+    queue, results, ws = run_queue(
+        [("é" * 10, True), ("a" * 10, False), ("é" * 10, True), ("a" * 10, True)],
+        max_length=100,
+        max_bytes=45,  # Not overflown by the 40 characters, but by the 60 bytes
+        policy=OutboundQueue.POLICY_DROP_OLDEST
+    )
+
+    assert results == [True] * 4
+    assert ws.sent == ["a" * 10, "é" * 10, "a" * 10]
+    assert queue.dropped_count == 1
+    assert queue.bytes == 0
+
+
+def test_dropped_messages_do_not_pile_up():
+    queue = OutboundQueue(ws=FakeResponse(), max_length=10, max_bytes=1000, policy=OutboundQueue.POLICY_DROP_OLDEST)
+
+    for i in range(1000):  # The writer is not started, so nothing is sent
+        queue.put(str(i), volatile=True)
+
+    assert queue.depth == 10
+    assert queue.dropped_count == 990
+    assert len(queue._items) <= 2 * 10 + 1
@@ -0,0 +1,50 @@
+from fiasco_backend.server.websocket.base.codecs import JsonCodec
+from fiasco_backend.server.websocket.connection_storages import PlayerStorage
+from fiasco_backend.server.websocket.connections import PlayerConnection
+
+
+class FakeResponse:
+    closed = False
+    codec = JsonCodec()
+
+
+def make_connection(player, room="room"):
+    return PlayerConnection(ws=FakeResponse(), room=room, player=player)
+
+
+def test_area_connections_by_viewport():
+    storage = PlayerStorage()
+    near, far, anywhere = make_connection("a"), make_connection("b"), make_connection("c")
+    for connection in (near, far, anywhere):
+        storage.add_connection(connection)
+    storage.set_viewport(near, (0, 0, 100, 100))
+    storage.set_viewport(far, (5000, 5000, 5100, 5100))
+
+    assert set(storage.get_area_connections("room", area=[(50, 50, 60, 60)])) == {near, anywhere}
+    assert set(storage.get_area_connections("room")) == {near, far, anywhere}
+    assert storage.is_connection_in_area(anywhere, area=[(50, 50, 60, 60)])
+    assert not storage.is_connection_in_area(far, area=[(50, 50, 60, 60)])
+
+    storage.set_viewport(far, None)
+
+    assert set(storage.get_area_connections("room", area=[(50, 50, 60, 60)])) == {near, far, anywhere}
+
+
+def test_only_connections_with_viewport_are_indexed():
+    storage = PlayerStorage()
+    connection = make_connection("a")
+    storage.add_connection(connection)
+
+    assert not storage._viewports
+    assert set(storage.get_area_connections("room", area=[(0, 0, 1, 1)])) == {connection}
+
+    storage.set_viewport(connection, (0, 0, 10, 10))
+    storage.set_viewport(connection, None)
+
+    assert not storage._viewports
+
+    storage.remove_connection(connection)
+    storage.set_viewport(connection, (0, 0, 10, 10))  # Not stored anymore, so not indexed
+
+    assert not storage._viewports and not storage._no_viewport
+    assert not storage.is_room_online("room")
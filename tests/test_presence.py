@@ -0,0 +1,47 @@
+import asyncio
+
+from fiasco_backend.server.presence import PendingDisconnects
+from fiasco_backend.server.room_actors import room_actors
+
+
+def test_reconnection_cancels_fired_disconnect_waiting_for_room():
+    disconnects = PendingDisconnects()
+    announced = []
+
+    async def announce():
+        announced.append("disconnected")
+
+    async def main():
+        busy = asyncio.Event()
+        room_actors.defer("room", busy.wait)  # The room is busy when the grace timer fires
+
+        disconnects.schedule("room", "player", delay=0, callback=announce)
+        await asyncio.sleep(0.01)
+
+        reconnected = disconnects.cancel("room", "player")
+
+        busy.set()
+        await room_actors.on_cleanup(None)
+
+        return reconnected
+
+    assert asyncio.run(main())
+    assert announced == []
+
+
+def test_disconnect_is_announced_after_grace_period():
+    disconnects = PendingDisconnects()
+    announced = []
+
+    async def announce():
+        announced.append("disconnected")
+
+    async def main():
+        disconnects.schedule("room", "player", delay=0, callback=announce)
+        await asyncio.sleep(0.01)
+        await room_actors.on_cleanup(None)
+
+        return disconnects.cancel("room", "player")
+
+    assert not asyncio.run(main())
+    assert announced == ["disconnected"]
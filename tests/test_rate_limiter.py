@@ -0,0 +1,104 @@
+import pytest
+
+from fiasco_backend.server.websocket.base import rate_limiter as rate_limiter_module
+from fiasco_backend.server.websocket.base.rate_limiter import RateLimiter, parse_rate_limit_rule
+
+
+class FakeConnection:
+
+    def __init__(self, room=None):
+        self.room = room
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter_module.time, "monotonic", clock.monotonic)
+
+    return clock
+
+
+def make_limiter(*rules, max_throttled=3):
+    limiter = RateLimiter(rules=rules, max_throttled=max_throttled)
+    connection = FakeConnection(room="room")
+    limiter.watch(connection)
+
+    return limiter, connection
+
+
+def test_burst_then_refill(clock):
+    limiter, connection = make_limiter("connection:*=2/4")
+
+    assert [limiter.allow(connection) for _ in range(5)] == [True] * 4 + [False]
+
+    clock.now += 1  # 2 tokens per second
+    assert [limiter.allow(connection) for _ in range(3)] == [True, True, False]
+
+    clock.now += 60  # Refilled up to the burst only
+    assert [limiter.allow(connection) for _ in range(5)] == [True] * 4 + [False]
+    assert limiter.throttled_count == {"*": 3}
+
+
+def test_event_rule_applies_to_its_event_only(clock):
+    limiter, connection = make_limiter("connection:*=100/100", "connection:upsert-element=1/2")
+
+    assert [limiter.allow(connection, "upsert-element") for _ in range(3)] == [True, True, False]
+    assert limiter.allow(connection, "delete-element")
+    assert limiter.throttled_count == {"upsert-element": 1}
+
+
+def test_any_event_rule_counts_all_the_messages(clock):
+    limiter, connection = make_limiter("connection:*=1/3", "connection:upsert-element=100/100")
+
+    for _ in range(3):  # As the handler does: the "*" limits per frame, then the event ones
+        assert limiter.allow(connection) and limiter.allow(connection, "upsert-element")
+
+    assert not limiter.allow(connection)
+    assert limiter.allow(connection, "upsert-element")  # Not taken by the "*" limits
+
+
+def test_room_limit_is_shared_by_room_connections(clock):
+    limiter, connection = make_limiter("room:*=1/2")
+    other = FakeConnection(room="room")
+    limiter.watch(other)
+
+    assert limiter.allow(connection)
+    assert limiter.allow(other)
+    assert not limiter.allow(connection)
+    assert limiter.allow(FakeConnection(room="another-room"))
+
+
+def test_connection_is_disconnected_after_max_throttled(clock):
+    limiter, connection = make_limiter("connection:*=1/1", max_throttled=3)
+
+    assert [limiter.penalize(connection) for _ in range(4)] == [True, True, True, False]
+    assert limiter.disconnected_count == 1
+
+    clock.now += 1  # One throttled message restored per second
+    assert limiter.penalize(connection)
+    assert not limiter.penalize(connection)
+
+
+def test_forgotten_connection_is_not_limited(clock):
+    limiter, connection = make_limiter("connection:*=1/1", "room:*=1/1")
+
+    assert limiter.allow(connection)
+    limiter.forget(connection)
+
+    assert limiter._room_buckets == {}
+    assert limiter.penalize(connection)
+
+
+@pytest.mark.parametrize("rule", ("connection:*=1", "user:*=1/2", "connection:*=0/2", "connection:*=a/b"))
+def test_invalid_rules(rule):
+    with pytest.raises(ValueError):
+        parse_rate_limit_rule(rule)
@@ -0,0 +1,48 @@
+import asyncio
+
+from fiasco_backend import config
+from fiasco_backend.server.websocket.base.response import WebSocketResponse
+
+
+class FakeWriter:
+
+    def __init__(self, compress: int = 0):
+        self.compress = compress
+        self._closing = False
+        self.sent = []
+
+    async def send(self, message, binary=False):
+        self.sent.append((message, self.compress))
+        await asyncio.sleep(0)  # As draining does, so the sends interleave if anything else sends
+
+
+def test_send_payload_compresses_only_from_threshold(monkeypatch):
+    monkeypatch.setattr(config, "ws_compress_threshold", 10)
+
+    ws = WebSocketResponse()
+    ws._writer = FakeWriter(compress=15)
+    ws._plain_writer = FakeWriter()
+
+    async def main():
+        await asyncio.gather(
+            ws.send_payload("small"),
+            ws.send_payload("large" * 10),
+            ws.send_payload(b"small"),
+        )
+
+    asyncio.run(main())
+
+    assert ws._plain_writer.sent == [("small", 0), (b"small", 0)]
+    assert ws._writer.sent == [("large" * 10, 15)]
+    assert ws._writer.compress == 15
+
+
+def test_send_payload_without_compression(monkeypatch):
+    monkeypatch.setattr(config, "ws_compress_threshold", 10)
+
+    ws = WebSocketResponse()
+    ws._writer = FakeWriter()
+
+    asyncio.run(ws.send_payload("small"))
+
+    assert ws._writer.sent == [("small", 0)]
@@ -0,0 +1,94 @@
+import asyncio
+
+from fiasco_backend.server.element_conflator import ElementConflator
+from fiasco_backend.server.room_actors import RoomActors, room_actors
+
+
+def test_submitters_waiting_on_full_mailbox_are_not_lost():
+    actors = RoomActors(mailbox_size=2)
+    handled = []
+
+    def job(i):
+        async def run():
+            handled.append(i)  # Never suspends, so the actor may drain the mailbox before a submitter wakes up
+
+        return run
+
+    async def main():
+        await asyncio.wait_for(asyncio.gather(*(actors.submit("room", job(i)) for i in range(5))), timeout=1)
+        await asyncio.sleep(0)
+        while actors.actors_count:
+            await asyncio.sleep(0)
+
+    asyncio.run(main())
+
+    assert handled == [0, 1, 2, 3, 4]
+    assert actors.actors_count == 0
+    assert actors.pending_count == 0
+
+
+def test_failed_job_does_not_stop_room():
+    actors = RoomActors()
+    handled = []
+
+    async def fail():
+        raise RuntimeError("Failure")
+
+    async def main():
+        await actors.submit("room", fail)
+        await actors.submit("room", lambda: asyncio.sleep(0, result=handled.append("next")))
+        await actors.on_cleanup(None)
+
+    asyncio.run(main())
+
+    assert handled == ["next"]
+
+
+def test_conflated_update_is_sent_on_room_actor():
+    conflator = ElementConflator(rate=100)
+    log = []
+
+    async def send(element, previous):
+        log.append(("sent", element["coordinates"]))
+
+    async def delete():
+        await asyncio.sleep(0.05)  # The flush timer fires meanwhile
+        conflator.discard(room="room", element_id="a")
+        log.append(("deleted", None))
+
+    async def main():
+        await conflator.submit({"element_id": "a", "room": "room", "coordinates": [1, 1]}, send=send)
+        await conflator.submit({"element_id": "a", "room": "room", "coordinates": [2, 2]}, send=send)
+
+        await room_actors.submit("room", delete)
+        await asyncio.sleep(0.1)
+        await room_actors.on_cleanup(None)
+
+    asyncio.run(main())
+
+    # The delayed update waits for the deletion to finish, and is dropped with the element then
+    assert log == [("sent", [1, 1]), ("deleted", None)]
+
+
+def test_conflated_update_is_sent_after_room_jobs():
+    conflator = ElementConflator(rate=100)
+    log = []
+
+    async def send(element, previous):
+        log.append(("sent", element["coordinates"]))
+
+    async def move():
+        await asyncio.sleep(0.05)
+        log.append(("moved", None))
+
+    async def main():
+        await conflator.submit({"element_id": "a", "room": "room", "coordinates": [1, 1]}, send=send)
+        await conflator.submit({"element_id": "a", "room": "room", "coordinates": [2, 2]}, send=send)
+
+        await room_actors.submit("room", move)
+        await asyncio.sleep(0.1)
+        await room_actors.on_cleanup(None)
+
+    asyncio.run(main())
+
+    assert log == [("sent", [1, 1]), ("moved", None), ("sent", [2, 2])]
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+
+from decimal import Decimal
+
+from fiasco_backend import config
+from fiasco_backend.db import room_cache as room_cache_module
+from fiasco_backend.db.room_cache import RoomCache
+from fiasco_backend.utils.memory import deep_sizeof
+
+
+def test_load_room_with_decimal_coordinates(monkeypatch):
+    async def get_room_elements(room):  # As DynamoDB returns the numbers
+        return [
+            {"element_id": "a", "room": room, "coordinates": [Decimal(5), Decimal(6)]},
+            {
+                "element_id": "b",
+                "room": room,
+                "coordinates": [Decimal("900.5"), Decimal(900), Decimal(1000), Decimal(1001)],
+            },
+            {"element_id": "c", "room": room},
+        ]
+
+    monkeypatch.setattr(room_cache_module, "get_room_elements", get_room_elements)
+
+    cache = RoomCache()
+
+    elements = asyncio.run(cache.get_viewport_elements("room", (0, 0, 10, 10)))
+
+    assert set(elements) == {"a", "c"}
+    assert elements["a"]["coordinates"] == [Decimal(5), Decimal(6)]
+    assert cache.rooms_count == 1
+
+
+def test_updated_element_size_is_tracked(monkeypatch):
+    async def get_room_elements(room):
+        return [{"element_id": "a", "room": room, "coordinates": [1, 2]}]
+
+    monkeypatch.setattr(room_cache_module, "get_room_elements", get_room_elements)
+
+    cache = RoomCache()
+    asyncio.run(cache.get_elements("room"))
+    state = cache._rooms["room"]
+
+    cache.upsert({"element_id": "a", "room": "room", "coordinates": [1, 2, 3, 4], "styles": {"color": "red"}})
+    cache.upsert({"element_id": "a", "room": "room", "player": "player-1"})
+    cache.upsert({"element_id": "b", "room": "room", "type": "card"})
+
+    assert state.sizes == {element_id: deep_sizeof(element) for element_id, element in state.elements.items()}
+    assert cache.size == state.size == sum(state.sizes.values())
+
+
+def test_over_limit_is_logged_once(monkeypatch, caplog):
+    monkeypatch.setattr(config, "room_cache_max_bytes", 0)
+    caplog.set_level(logging.INFO)
+    cache = RoomCache()
+    cache._size = 100
+
+    for _ in range(3):
+        cache.acquire("room")
+        cache.release("room")
+
+    cache._size = 0
+    cache.evict()
+    cache.evict()
+
+    assert [record.levelname for record in caplog.records] == ["WARNING", "INFO"]
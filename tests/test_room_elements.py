@@ -0,0 +1,84 @@
+import asyncio
+
+from fiasco_backend import config
+from fiasco_backend.db import element as element_module
+from fiasco_backend.db.element import get_room_elements
+
+
+class FakeTable:
+    """Table of the items of many rooms, read by pages of <page_size> items, as DynamoDB does by response size."""
+
+    def __init__(self, items, page_size):
+        self.items = items
+        self.page_size = page_size
+        self.requests = []
+
+    async def query(self, IndexName, KeyConditionExpression, **params):
+        room = KeyConditionExpression.get_expression()["values"][1]
+
+        return self._read([item for item in self.items if item["room"] == room], ("query", IndexName), params)
+
+    async def scan(self, FilterExpression, **params):
+        room = FilterExpression.get_expression()["values"][1]
+
+        # The filter is applied to each page read, so a page may have none of the room items
+        response = self._read(self.items, ("scan", None), params)
+        response["Items"] = [item for item in response["Items"] if item["room"] == room]
+
+        return response
+
+    def _read(self, items, request, params):
+        self.requests.append(request)
+
+        start = 0
+        if "ExclusiveStartKey" in params:
+            start = params["ExclusiveStartKey"]["index"] + 1
+
+        response = {"Items": items[start:start + self.page_size]}
+        if start + self.page_size < len(items):
+            response["LastEvaluatedKey"] = {"index": start + self.page_size - 1}
+
+        return response
+
+
+def make_items(rooms, elements):
+    """Items of the <elements> elements of each room, interleaved by room."""
+
+    return [{"room": f"room-{i}", "element_id": f"{i}-{j}"} for j in range(elements) for i in range(rooms)]
+
+
+def load_room_elements(monkeypatch, table, room="room-0"):
+    async def get_table(name):
+        return table
+
+    monkeypatch.setattr(element_module.dynamodb, "table", get_table)
+
+    return asyncio.run(get_room_elements(room))
+
+
+def test_room_elements_are_scanned_by_default(monkeypatch):
+    items = make_items(rooms=20, elements=5)
+    table = FakeTable(items, page_size=7)
+
+    elements = load_room_elements(monkeypatch, table, room="room-3")
+
+    assert elements == [item for item in items if item["room"] == "room-3"]
+    assert table.requests == [("scan", None)] * 15
+
+
+def test_room_index_is_queried(monkeypatch):
+    monkeypatch.setattr(config, "elements_room_index", "room-index")
+    items = make_items(rooms=20, elements=7)
+    table = FakeTable(items, page_size=3)
+
+    elements = load_room_elements(monkeypatch, table, room="room-3")
+
+    assert elements == [item for item in items if item["room"] == "room-3"]
+    assert table.requests == [("query", "room-index")] * 3
+
+
+def test_empty_room(monkeypatch):
+    table = FakeTable(make_items(rooms=2, elements=2), page_size=3)
+
+    assert load_room_elements(monkeypatch, table, room="room-5") == []
+    assert len(table.requests) == 2
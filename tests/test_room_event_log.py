@@ -0,0 +1,100 @@
+import asyncio
+
+from fiasco_backend.server.bus import MemoryBus, MemoryHub
+from fiasco_backend.server.websocket import Message
+from fiasco_backend.server.websocket.base.codecs import JsonCodec
+from fiasco_backend.server.websocket.connection_storages import PlayerStorage
+from fiasco_backend.server.websocket.connections import PlayerConnection
+from fiasco_backend.server.websocket.message_senders import PlayerMessageSender
+from fiasco_backend.server.websocket.message_senders import player as player_sender_module
+from fiasco_backend.server.websocket.message_senders.room_event_log import RoomEventLog
+
+
+class FakeResponse:
+    closed = False
+    codec = JsonCodec()
+
+
+def test_since_returns_messages_of_own_epoch_only():
+    log = RoomEventLog(size=10, ttl=60)
+    other = RoomEventLog(size=10, ttl=60)
+
+    epoch, seq = log.last_seq("room")
+    log.append("room", {"event": "a"})
+    log.append("room", {"event": "b"})
+
+    assert [message["event"] for message, _ in log.since("room", epoch=epoch, seq=seq)] == ["a", "b"]
+    assert log.since("room", epoch=epoch, seq=seq + 1) == [({"event": "b", "seq": seq + 2}, None)]
+
+    other_epoch, _ = other.last_seq("room")
+    assert log.since("room", epoch=other_epoch, seq=seq) is None
+
+
+def test_since_returns_none_for_dropped_messages():
+    log = RoomEventLog(size=2, ttl=60)
+
+    epoch, seq = log.last_seq("room")
+    for event in "abc":
+        log.append("room", {"event": event})
+
+    assert log.since("room", epoch=epoch, seq=seq) is None
+    assert [message["event"] for message, _ in log.since("room", epoch=epoch, seq=seq + 1)] == ["b", "c"]
+
+
+def test_nodes_number_room_messages_on_their_own():
+    hub = MemoryHub()
+    published = []
+
+    async def main():
+        buses = [MemoryBus(hub=hub), MemoryBus(hub=hub)]
+        senders = [PlayerMessageSender(PlayerStorage(), batch_tick=0, bus=bus) for bus in buses]
+        for bus in buses:
+            await bus.start()
+        for sender in senders:
+            sender.acquire_room("room")
+
+        buses[0].subscribe("room:room", lambda channel, message, node: published.append(message))
+
+        positions = [sender.get_room_seq("room") for sender in senders]
+
+        await senders[0].send_message(message=Message(event="hello", data={}), sender="player", room="room")
+        await asyncio.sleep(0)
+
+        return senders, positions
+
+    senders, positions = asyncio.run(main())
+
+    assert "seq" not in published[0]["data"]  # The bus message is not changed by the handlers
+
+    for sender, (epoch, seq) in zip(senders, positions):
+        messages = sender.get_room_messages("room", epoch=epoch, seq=seq)
+        assert [message["seq"] for message, _ in messages] == [seq + 1]
+
+    # A node does not resume from the numbers of another one
+    (epoch, seq), (other_epoch, _) = positions
+    assert senders[1].get_room_messages("room", epoch=epoch, seq=seq) is None
+
+
+def test_resent_messages_are_filtered_by_viewport(monkeypatch):
+    sent = []
+    monkeypatch.setattr(player_sender_module, "send_data", lambda data, connections: sent.append(data))
+
+    async def main():
+        storage = PlayerStorage()
+        connection = PlayerConnection(ws=FakeResponse(), room="room", player="player")
+        storage.add_connection(connection)
+        storage.set_viewport(connection, (0, 0, 100, 100))
+
+        sender = PlayerMessageSender(storage, batch_tick=0, bus=MemoryBus(hub=MemoryHub()))
+        sender.resend_messages(
+            messages=[
+                ({"event": "near", "seq": 1}, [[50, 50, 60, 60]]),
+                ({"event": "far", "seq": 2}, [[500, 500, 600, 600]]),
+                ({"event": "everywhere", "seq": 3}, None),
+            ],
+            connection=connection
+        )
+
+    asyncio.run(main())
+
+    assert [message["event"] for message in sent] == ["near", "everywhere"]
@@ -0,0 +1,80 @@
+import asyncio
+
+from fiasco_backend.utils.timer_wheel import TimerWheel
+
+
+def run_wheel(schedule, duration, tick=0.01, slots=8):
+    """Run the <schedule> function with the wheel for <duration> seconds; return the fired callback arguments."""
+
+    fired = []
+
+    async def main():
+        wheel = TimerWheel(tick=tick, slots=slots)
+        schedule(wheel, fired)
+        await asyncio.sleep(duration)
+        wheel.stop()
+
+    asyncio.run(main())
+
+    return fired
+
+
+def test_timers_expire_in_order():
+    def schedule(wheel, fired):
+        wheel.schedule(0.03, fired.append, "c")
+        wheel.schedule(0.01, fired.append, "a")
+        wheel.schedule(0.02, fired.append, "b")
+
+    assert run_wheel(schedule, duration=0.1) == ["a", "b", "c"]
+
+
+def test_timers_never_expire_early():
+    def schedule(wheel, fired):
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        wheel.schedule(0.05, lambda: fired.append(loop.time() - started_at))
+
+    fired = run_wheel(schedule, duration=0.15)
+
+    assert len(fired) == 1
+    assert fired[0] >= 0.05
+
+
+def test_cancelled_timer_does_not_fire():
+    def schedule(wheel, fired):
+        wheel.schedule(0.02, fired.append, "a").cancel()
+        wheel.schedule(0.02, fired.append, "b")
+
+    assert run_wheel(schedule, duration=0.1) == ["b"]
+
+
+def test_timer_beyond_wheel_turn_waits_rounds():
+    def schedule(wheel, fired):  # 8 slots of 10 ms, so 100 ms is a round and 2 slots ahead
+        wheel.schedule(0.1, fired.append, "late")
+        wheel.schedule(0.02, fired.append, "early")
+
+    assert run_wheel(schedule, duration=0.06) == ["early"]
+    assert run_wheel(schedule, duration=0.2) == ["early", "late"]
+
+
+def test_rescheduled_timer_moves_to_another_slot():
+    def schedule(wheel, fired):
+        def reschedule(count):
+            fired.append(count)
+            if count < 3:  # A turn and a slot ahead, so into another slot each time
+                wheel.schedule(0.09, reschedule, count + 1)
+
+        wheel.schedule(0.01, reschedule, 1)
+
+    assert run_wheel(schedule, duration=0.4) == [1, 2, 3]
+
+
+def test_wheel_stops_ticking_without_timers():
+    async def main():
+        wheel = TimerWheel(tick=0.01, slots=8)
+        wheel.schedule(0.01, lambda: None)
+        await asyncio.sleep(0.05)
+
+        return len(wheel), wheel._handle
+
+    assert asyncio.run(main()) == (0, None)
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from marshmallow import ValidationError
+
+from fiasco_backend.db.element import ElementSchema, load_element
+from fiasco_backend.server.websocket import Message
+from fiasco_backend.server.websocket.base.message import MessageSchema
+
+
+def outcome(load, data):
+    """The loaded value or the validation errors, to compare the fast and the schema paths."""
+
+    try:
+        return "loaded", load(data)
+    except ValidationError as e:
+        return "invalid", e.messages
+
+
+@pytest.mark.parametrize("msg", [
+    {"event": "upsert-element", "data": {"element_id": "a"}},
+    {"event": "delete-element"},
+    {"event": "upsert-element", "data": {}},
+    {"event": "upsert-element", "data": None},
+    {"event": "upsert-element", "data": []},
+    {"event": "upsert-element", "data": "a"},
+    {"event": 1, "data": {}},
+    {"event": None},
+    {"data": {}},
+    {"event": "upsert-element", "data": {}, "extra": 1},
+    {},
+    [],
+    "upsert-element",
+    None,
+    1,
+])
+def test_message_fast_path_is_as_schema(msg):
+    def load_by_schema(msg_str):
+        return Message(**MessageSchema().loads(msg_str))
+
+    assert outcome(Message.from_str, json.dumps(msg)) == outcome(load_by_schema, json.dumps(msg))
+
+
+def test_invalid_message_json():
+    with pytest.raises(json.JSONDecodeError):
+        Message.from_str("{")
+
+
+@pytest.mark.parametrize("data", [
+    {"element_id": "a", "room": "r"},
+    {"element_id": "a", "room": "r", "player": "p", "type": "card", "coordinates": [1, 2, 3, 4], "styles": {"z": 1}},
+    {"element_id": "a", "room": "r", "coordinates": []},
+    {"element_id": "a", "room": "r", "coordinates": [True, 1]},
+    {"element_id": "a", "room": "r", "coordinates": [1.5, 2]},
+    {"element_id": "a", "room": "r", "coordinates": [1.0, 2]},
+    {"element_id": "a", "room": "r", "coordinates": ["1", 2]},
+    {"element_id": "a", "room": "r", "coordinates": [None]},
+    {"element_id": "a", "room": "r", "coordinates": None},
+    {"element_id": "a", "room": "r", "coordinates": 1},
+    {"element_id": "a", "room": "r", "styles": None},
+    {"element_id": "a", "room": "r", "styles": []},
+    {"element_id": "a", "room": "r", "player": None},
+    {"element_id": "a", "room": "r", "type": 1},
+    {"element_id": "a", "room": "r", "unknown": {"x": 1}},
+    {"element_id": 1, "room": "r"},
+    {"element_id": "a"},
+    {"room": "r"},
+    {},
+])
+def test_element_fast_path_is_as_schema(data):
+    assert outcome(load_element, dict(data)) == outcome(ElementSchema().load, dict(data))
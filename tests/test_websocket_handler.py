@@ -0,0 +1,128 @@
+import asyncio
+import json
+
+import aiohttp
+import pytest
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from marshmallow import ValidationError
+
+from fiasco_backend.server.websocket import RateLimiter, WebSocketHandler, heartbeat_monitor
+from fiasco_backend.server.websocket.base.codecs import MsgPackCodec
+
+
+def test_replies_go_through_outbound_queue():
+    connections = []
+
+    async def listener(message, connection):
+        connections.append(connection)
+
+    async def main():
+        app = web.Application()
+        app.add_routes([web.get("/", WebSocketHandler(event_listeners=(listener, )))])
+
+        async with TestClient(TestServer(app)) as client:
+            ws = await client.ws_connect("/")
+            await ws.send_str(json.dumps({"event": "$forged"}))
+            await ws.send_str(json.dumps({"data": {}}))
+
+            replies = [await asyncio.wait_for(ws.receive_str(), timeout=1) for _ in range(2)]
+            sent_count = connections[0].outbound.sent_count
+
+            await ws.close()
+
+        return replies, sent_count
+
+    replies, sent_count = asyncio.run(main())
+
+    assert replies[0] == "Forbidden"
+    assert "event" in json.loads(replies[1])  # Validation errors by field
+    assert sent_count == 2
+
+
+def test_binary_message_of_invalid_type():
+    msgpack = pytest.importorskip("msgpack")
+
+    class FakeWebSocket:
+        codec = MsgPackCodec()
+
+    class FakeConnection:
+        ws = FakeWebSocket()
+
+    msg = aiohttp.WSMessage(type=aiohttp.WSMsgType.BINARY, data=msgpack.packb([1]), extra=None)
+
+    with pytest.raises(ValidationError) as e:
+        WebSocketHandler._decode_message(msg, connection=FakeConnection())
+
+    assert e.value.messages == ["Invalid input type."]
+
+
+def run_handler(handler, send):
+    """Connect to the <handler> and run the <send> coroutine function with the client socket."""
+
+    async def main():
+        app = web.Application()
+        app.add_routes([web.get("/", handler)])
+
+        async with TestClient(TestServer(app)) as client:
+            ws = await client.ws_connect("/")
+            result = await send(ws)
+            await ws.close()
+
+        return result
+
+    return asyncio.run(main())
+
+
+def test_failed_connect_is_torn_down():
+    connections = []
+    events = []
+
+    class FailingHandler(WebSocketHandler):
+
+        async def on_user_connected(self, connection):
+            connections.append(connection)
+            raise RuntimeError("Failed to connect")
+
+    async def listener(message, connection):
+        events.append(message.event)
+
+    async def send(ws):
+        return await asyncio.wait_for(ws.receive(), timeout=1)
+
+    msg = run_handler(FailingHandler(event_listeners=(listener, )), send)
+
+    assert msg.type == aiohttp.WSMsgType.CLOSE
+    assert heartbeat_monitor.watched_count == 0
+    assert connections[0].outbound.closed
+    assert events == [WebSocketHandler.EVENT_USER_DISCONNECTED]
+
+
+def test_messages_over_rate_limit_are_not_decoded(monkeypatch):
+    decoded = []
+    decode_message = WebSocketHandler._decode_message
+
+    def _decode_message(msg, connection):
+        decoded.append(msg.data)
+        return decode_message(msg, connection=connection)
+
+    monkeypatch.setattr(WebSocketHandler, "_decode_message", staticmethod(_decode_message))
+
+    async def listener(message, connection):
+        pass
+
+    async def send(ws):
+        for _ in range(3):
+            await ws.send_str("not json")
+
+        return [await asyncio.wait_for(ws.receive_str(), timeout=1) for _ in range(3)]
+
+    handler = WebSocketHandler(
+        event_listeners=(listener, ),
+        rate_limiter=RateLimiter(rules=("connection:*=0.001/2", ), max_throttled=10)
+    )
+    replies = run_handler(handler, send)
+
+    assert len(decoded) == 2
+    assert json.loads(replies[2])["data"]["error"] == WebSocketHandler.THROTTLED_ERROR